@@ -407,6 +407,7 @@ class ChatWindow(QWidget):
         
         # 连接搜索信号
         self.search_dialog.search_in_current_signal.connect(self.on_search_in_current)
+        self.search_dialog.refine_in_current_signal.connect(self.on_refine_in_current)
         self.search_dialog.search_globally_signal.connect(self.on_search_globally)
         self.search_dialog.navigate_signal.connect(self.on_navigate_to_match)
         
@@ -416,7 +417,21 @@ class ChatWindow(QWidget):
         """在当前对话中搜索"""
         self.search_text = search_text
         self.search_matches = self.chat_area.search_text_in_current(search_text)
-        
+        self._show_current_matches()
+    
+    def on_refine_in_current(self, search_text):
+        """在上一次的匹配结果中收窄搜索（新查询是上一次查询的延伸）"""
+        self.search_text = search_text
+        search_text_lower = search_text.lower()
+        self.search_matches = [
+            m for m in self.search_matches
+            if search_text_lower in m.get('content', '').lower()
+        ]
+        self._show_current_matches()
+    
+    def _show_current_matches(self):
+        """把当前匹配结果同步到搜索对话框并滚动到第一处"""
+        search_text = self.search_text
         if self.search_matches:
             # 找到匹配，更新对话框显示
             self.search_dialog.set_search_results(self.search_matches, 0)
@@ -7,11 +7,135 @@
 支持自动持久化、默认值合并、多模块间的配置共享。
 """
 
+import copy
 import json
+import logging
 import os
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Mapping, Optional, Tuple, Union
 import threading
+import time
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+# 配置持久化模式：none（依赖系统页缓存）/ periodic（间隔落盘）/ always（每次同步落盘）
+DURABILITY_MODES = ('none', 'periodic', 'always')
+# periodic 模式下两次 fsync 之间的最小间隔（秒）
+PERIODIC_FSYNC_INTERVAL = 5.0
+
+# 点号路径 -> 键元组 的缓存，避免每次 get/set 都 split 分配新列表
+_path_cache: Dict[str, Tuple[str, ...]] = {}
+
+
+def _split_key_path(key_path: Union[str, Tuple[str, ...]]) -> Tuple[str, ...]:
+    """将点号分隔的配置路径解析为键元组（带缓存，元组原样返回）"""
+    if isinstance(key_path, tuple):
+        return key_path
+    parts = _path_cache.get(key_path)
+    if parts is None:
+        parts = _path_cache.setdefault(key_path, tuple(key_path.split('.')))
+    return parts
+
+
+# 默认配置模板（模块加载时构建一次，使用时按需深拷贝，不可直接修改）
+_DEFAULT_CONFIG: Dict[str, Any] = {
+    "_version": "1.0.0",
+    "_description": "Unified configuration file for Agent Chat Application",
+    "_last_updated": "2025-10-20",
+    
+    "app": {
+        "name": "Agent Chat",
+        "version": "1.0.9",
+        "config_durability": "none",
+        "theme": {
+            "dark_mode_enabled": False,
+            "auto_dark_mode": False,
+            "custom_background_path": "",
+            "is_video_background": False
+        },
+        "ui": {
+            "collapse_threshold": 300,
+            "preview_length": 100,
+            "user_bubble_collapse_threshold": 300,
+            "user_and_agent_preview_length": 100
+        }
+    },
+    
+    "storage": {
+        "type": "file",
+        "file_storage": {
+            "base_path": "C:\\AgentData",
+            "auto_create_folder": True,
+            "folder_name": "AgentData",
+            "conversation_subfolder": "conversations"
+        },
+        "last_migration": None
+    },
+    
+    "api": {
+        "current_provider": "gemini",
+        "default_model": "gemini-2.5-flash",
+        "providers": {
+            "gemini": {
+                "api_key": "",
+                "api_url": "",
+                "model": "gemini-2.5-flash",
+                "display_name": "Gemini"
+            },
+            "deepseek": {
+                "api_key": "",
+                "api_url": "https://api.deepseek.com/v1",
+                "model": "deepseek-chat",
+                "display_name": "DeepSeek"
+            },
+            "claude": {
+                "api_key": "",
+                "api_url": "",
+                "model": "claude-3-sonnet",
+                "display_name": "Claude"
+            },
+            "gpt4": {
+                "api_key": "",
+                "api_url": "https://api.openai.com/v1",
+                "model": "gpt-4-turbo",
+                "display_name": "GPT-4"
+            }
+        }
+    },
+    
+    "search_engine": {
+        "enabled_engines": ["baidu"],
+        "primary_engine": "baidu",
+        "fallback_enabled": False,
+        "selection_order": ["baidu"]
+    },
+    
+    "sd_diffusion": {
+        "sampler_name": "DPM++ 2S a",
+        "scheduler": "Karras",
+        "steps": 50,
+        "cfg_scale": 8.0,
+        "seed": -1,
+        "width": 512,
+        "height": 512,
+        "model": "sd1.5\\sd_xl_base_1.0_0.9vae.safetensors",
+        "prompt": "",
+        "negative_prompt": "lowres, bad quality, deformed, blurry, worst quality"
+    }
+}
+
+
+class ConfigKeys:
+    """常用配置路径常量，热点调用方可直接传入元组跳过字符串解析"""
+    
+    DARK_MODE = ('app', 'theme', 'dark_mode_enabled')
+    AUTO_DARK_MODE = ('app', 'theme', 'auto_dark_mode')
+    CUSTOM_BACKGROUND = ('app', 'theme', 'custom_background_path')
+    IS_VIDEO_BACKGROUND = ('app', 'theme', 'is_video_background')
+    COLLAPSE_THRESHOLD = ('app', 'ui', 'collapse_threshold')
+    PREVIEW_LENGTH = ('app', 'ui', 'preview_length')
+
 
 class ConfigManager:
     """统一配置管理器"""
@@ -20,130 +144,64 @@ class ConfigManager:
     _lock = threading.Lock()
     
     def __new__(cls):
-        """单例模式确保全局只有一个配置实例"""
+        """单例模式确保全局只有一个配置实例，初始化只在首次创建时执行一次"""
         if cls._instance is None:
             with cls._lock:
                 if cls._instance is None:
-                    cls._instance = super(ConfigManager, cls).__new__(cls)
-                    cls._instance._initialized = False
+                    instance = super(ConfigManager, cls).__new__(cls)
+                    instance._bootstrap()
+                    cls._instance = instance
         return cls._instance
     
     def __init__(self):
-        """初始化配置管理器"""
-        if self._initialized:
-            return
-        
-        self._initialized = True
+        """初始化已在 __new__ 中完成，重复调用 ConfigManager() 不做任何工作"""
+        pass
+    
+    def _bootstrap(self):
+        """初始化配置管理器（仅由 __new__ 调用一次）"""
         self._config_file = os.path.join(os.path.dirname(__file__), 'config.json')
         self._config = {}
-        self._default_config = self._get_default_config()
+        # 配置文件变更令牌 (mtime_ns, size)，reload 时文件未变则跳过重新解析
+        self._file_token: Optional[Tuple[int, int]] = None
+        self._last_fsync_ts = 0.0
+        self._default_config = _DEFAULT_CONFIG
         self._load_config()
     
-    def _get_default_config(self) -> Dict[str, Any]:
-        """获取默认配置"""
-        return {
-            "_version": "1.0.0",
-            "_description": "Unified configuration file for Agent Chat Application",
-            "_last_updated": "2025-10-20",
-            
-            "app": {
-                "name": "Agent Chat",
-                "version": "1.0.9",
-                "theme": {
-                    "dark_mode_enabled": False,
-                    "auto_dark_mode": False,
-                    "custom_background_path": "",
-                    "is_video_background": False
-                },
-                "ui": {
-                    "collapse_threshold": 300,
-                    "preview_length": 100,
-                    "user_bubble_collapse_threshold": 300,
-                    "user_and_agent_preview_length": 100
-                }
-            },
-            
-            "storage": {
-                "type": "file",
-                "file_storage": {
-                    "base_path": "C:\\AgentData",
-                    "auto_create_folder": True,
-                    "folder_name": "AgentData",
-                    "conversation_subfolder": "conversations"
-                },
-                "last_migration": None
-            },
-            
-            "api": {
-                "current_provider": "gemini",
-                "default_model": "gemini-2.5-flash",
-                "providers": {
-                    "gemini": {
-                        "api_key": "",
-                        "api_url": "",
-                        "model": "gemini-2.5-flash",
-                        "display_name": "Gemini"
-                    },
-                    "deepseek": {
-                        "api_key": "",
-                        "api_url": "https://api.deepseek.com/v1",
-                        "model": "deepseek-chat",
-                        "display_name": "DeepSeek"
-                    },
-                    "claude": {
-                        "api_key": "",
-                        "api_url": "",
-                        "model": "claude-3-sonnet",
-                        "display_name": "Claude"
-                    },
-                    "gpt4": {
-                        "api_key": "",
-                        "api_url": "https://api.openai.com/v1",
-                        "model": "gpt-4-turbo",
-                        "display_name": "GPT-4"
-                    }
-                }
-            },
-            
-            "search_engine": {
-                "enabled_engines": ["baidu"],
-                "primary_engine": "baidu",
-                "fallback_enabled": False,
-                "selection_order": ["baidu"]
-            },
-            
-            "sd_diffusion": {
-                "sampler_name": "DPM++ 2S a",
-                "scheduler": "Karras",
-                "steps": 50,
-                "cfg_scale": 8.0,
-                "seed": -1,
-                "width": 512,
-                "height": 512,
-                "model": "sd1.5\\sd_xl_base_1.0_0.9vae.safetensors",
-                "prompt": "",
-                "negative_prompt": "lowres, bad quality, deformed, blurry, worst quality"
-            }
-        }
-    
     def _load_config(self):
         """从文件加载配置，如果不存在则使用默认配置"""
         try:
             if os.path.exists(self._config_file):
                 with open(self._config_file, 'r', encoding='utf-8') as f:
                     loaded_config = json.load(f)
-                # 合并配置：用文件中的配置覆盖默认配置
-                self._config = self._merge_config(self._default_config, loaded_config)
+                if loaded_config:
+                    # 合并配置：用文件中的配置覆盖默认配置
+                    self._config = self._merge_config(self._default_config, loaded_config)
+                else:
+                    # 文件中没有任何覆盖项，无需递归合并
+                    self._config = copy.deepcopy(self._default_config)
+                self._update_file_token()
             else:
-                self._config = self._default_config.copy()
+                self._config = copy.deepcopy(self._default_config)
                 self._save_config()
         except Exception as e:
-            print(f"[CONFIG] 加载配置文件失败: {e}，使用默认配置")
-            self._config = self._default_config.copy()
+            logger.exception("[CONFIG] 加载配置文件失败: %s，使用默认配置", e)
+            self._config = copy.deepcopy(self._default_config)
+    
+    def _stat_token(self) -> Optional[Tuple[int, int]]:
+        """获取配置文件的 (mtime_ns, size) 令牌，文件不存在时返回 None"""
+        try:
+            st = os.stat(self._config_file)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+    
+    def _update_file_token(self):
+        """记录当前配置文件的变更令牌"""
+        self._file_token = self._stat_token()
     
     def _merge_config(self, default: Dict, loaded: Dict) -> Dict:
-        """递归合并配置字典"""
-        result = default.copy()
+        """递归合并配置字典（结果不与默认配置共享嵌套字典）"""
+        result = copy.deepcopy(default)
         for key, value in loaded.items():
             if key in result and isinstance(result[key], dict) and isinstance(value, dict):
                 result[key] = self._merge_config(result[key], value)
@@ -151,27 +209,69 @@ class ConfigManager:
                 result[key] = value
         return result
     
+    def _diff(self, default: Dict, current: Dict) -> Dict:
+        """递归计算 current 相对 default 的差异，仅保留用户修改过或新增的键"""
+        delta = {}
+        for key, value in current.items():
+            if key not in default:
+                delta[key] = value
+                continue
+            default_value = default[key]
+            if isinstance(value, dict) and isinstance(default_value, dict):
+                sub_delta = self._diff(default_value, value)
+                if sub_delta:
+                    delta[key] = sub_delta
+            elif value != default_value:
+                delta[key] = value
+        return delta
+    
     def _save_config(self):
-        """保存配置到文件"""
+        """保存配置到文件（只写入与默认配置不同的部分，加载时再与默认值合并）"""
         try:
-            with open(self._config_file, 'w', encoding='utf-8') as f:
-                json.dump(self._config, f, indent=2, ensure_ascii=False)
-            print(f"[CONFIG] 配置已保存到 {self._config_file}")
+            payload = self._diff(self._default_config, self._config)
+            durability = self.get('app.config_durability', 'none')
+            if durability == 'always':
+                self._write_durable(payload)
+            elif durability == 'periodic' and time.monotonic() - self._last_fsync_ts > PERIODIC_FSYNC_INTERVAL:
+                self._write_durable(payload)
+            else:
+                with open(self._config_file, 'w', encoding='utf-8') as f:
+                    json.dump(payload, f, indent=2, ensure_ascii=False)
+            self._update_file_token()
+            logger.debug("[CONFIG] 配置已保存到 %s", self._config_file)
         except Exception as e:
-            print(f"[CONFIG] 保存配置文件失败: {e}")
+            logger.exception("[CONFIG] 保存配置文件失败: %s", e)
     
-    def get(self, key_path: str, default: Any = None) -> Any:
+    def _write_durable(self, payload: Dict):
+        """同步写入临时文件并 fsync，再原子替换配置文件"""
+        data = json.dumps(payload, indent=2, ensure_ascii=False).encode('utf-8')
+        tmp_path = self._config_file + '.tmp'
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_DSYNC', 0) | getattr(os, 'O_BINARY', 0)
+        fd = os.open(tmp_path, flags, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, self._config_file)
+        self._last_fsync_ts = time.monotonic()
+    
+    def get(self, key_path: Union[str, Tuple[str, ...]], default: Any = None) -> Any:
         """
         获取配置值
         
         Args:
             key_path: 配置路径，支持点号分隔（例：'app.theme.dark_mode_enabled'）
+                      或键元组（例：ConfigKeys.DARK_MODE）
             default: 默认值
         
         Returns:
             配置值
         """
-        keys = key_path.split('.')
+        keys = _split_key_path(key_path)
         value = self._config
         
         try:
@@ -181,16 +281,16 @@ class ConfigManager:
         except (KeyError, TypeError):
             return default
     
-    def set(self, key_path: str, value: Any, auto_save: bool = True):
+    def set(self, key_path: Union[str, Tuple[str, ...]], value: Any, auto_save: bool = True):
         """
         设置配置值
         
         Args:
-            key_path: 配置路径，支持点号分隔
+            key_path: 配置路径，支持点号分隔或键元组
             value: 要设置的值
             auto_save: 是否自动保存
         """
-        keys = key_path.split('.')
+        keys = _split_key_path(key_path)
         config = self._config
         
         # 递归创建嵌套字典
@@ -204,17 +304,20 @@ class ConfigManager:
         if auto_save:
             self._save_config()
     
-    def get_all(self) -> Dict[str, Any]:
-        """获取所有配置"""
-        return self._config.copy()
+    def get_all(self) -> Mapping[str, Any]:
+        """获取所有配置（只读视图，需要修改请使用 set() 或自行 dict(...) 复制）"""
+        return MappingProxyType(self._config)
     
     def reset_to_default(self):
         """重置为默认配置"""
-        self._config = self._default_config.copy()
+        self._config = copy.deepcopy(self._default_config)
         self._save_config()
     
     def reload(self):
-        """重新加载配置（从文件）"""
+        """重新加载配置（从文件），文件未变化时只需一次 stat"""
+        token = self._stat_token()
+        if token is not None and token == self._file_token:
+            return
         self._load_config()
 
 
@@ -240,7 +343,7 @@ def config_set(key_path: str, value: Any, auto_save: bool = True):
     get_config_manager().set(key_path, value, auto_save)
 
 
-def config_get_all() -> Dict[str, Any]:
+def config_get_all() -> Mapping[str, Any]:
     """快捷获取所有配置"""
     return get_config_manager().get_all()
 
@@ -6,58 +6,144 @@
 
 import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# 已转换文件索引（文件名 -> "size:mtime_ns"），再次运行时命中则只需一次 stat
+INDEX_FILENAME = ".converted.json"
+
+# 多线程转换时保证同一文件的输出不被其他线程打断
+_print_lock = threading.Lock()
+_index_lock = threading.Lock()
+
+
+def _stat_key(st):
+    """根据文件大小与修改时间生成文件标识
+
+    不使用 st_ino：Windows 上 DirEntry.stat() 的 st_ino 为 0，与 os.stat() 的结果对不上
+    """
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _file_key(path):
+    return _stat_key(os.stat(path))
+
+
+def _load_index(index_path):
+    """读取已转换文件索引，不存在或损坏时返回空字典"""
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        return index if isinstance(index, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_index(index_path, index):
+    """原子写入已转换文件索引"""
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, index_path)
+
+
+def _mark_done(index, filepath):
+    """将已是 JSONL 格式的文件记入索引"""
+    if index is None:
+        return
+    key = _file_key(filepath)
+    with _index_lock:
+        index[os.path.basename(filepath)] = key
+
+
+def _convert_one(filepath, index=None):
+    """转换单个文件，成功返回 1，跳过或失败返回 0"""
+    filename = os.path.basename(filepath)
+
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read().strip()
+
+        # 检查是否是数组格式（旧格式）
+        if not content.startswith('['):
+            # 已经是 JSONL 格式
+            _mark_done(index, filepath)
+            return 0
+
+        # 解析旧的数组格式
+        try:
+            messages = json.loads(content)
+        except json.JSONDecodeError as e:
+            with _print_lock:
+                print(f"📝 转换: {filename}")
+                print(f"   ⚠️  解析失败: {e}")
+            return 0
+
+        if not isinstance(messages, list):
+            with _print_lock:
+                print(f"📝 转换: {filename}")
+                print(f"   ⚠️  不是数组格式，跳过")
+            return 0
+
+        # 转换为JSONL格式：一次性拼接后单次写入临时文件，再原子替换原文件
+        payload = ''.join(json.dumps(msg, ensure_ascii=False) + '\n' for msg in messages)
+        tmp_path = filepath + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(tmp_path, filepath)
+        _mark_done(index, filepath)
+
+        with _print_lock:
+            print(f"📝 转换: {filename}")
+            print(f"   ✅ 转换完成，{len(messages)} 条消息")
+        return 1
+
+    except Exception as e:
+        with _print_lock:
+            print(f"📝 转换: {filename}")
+            print(f"   ❌ 错误: {e}")
+        return 0
+
 
 def convert_to_jsonl():
     """转换所有旧格式文件到JSONL格式"""
-    
+
     data_dir = "C:\\AgentData"
-    
+
     print("\n" + "="*70)
     print("数组JSON → JSONL 格式转换工具")
     print("="*70 + "\n")
-    
-    converted_count = 0
-    
-    for filename in os.listdir(data_dir):
-        if not filename.startswith("conv_") or not filename.endswith(".txt"):
-            continue
-        
-        filepath = os.path.join(data_dir, filename)
-        
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-            
-            # 检查是否是数组格式（旧格式）
-            if not content.startswith('['):
-                # 已经是 JSONL 格式
+
+    index_path = os.path.join(data_dir, INDEX_FILENAME)
+    index = _load_index(index_path)
+
+    # 使用 scandir：DirEntry 自带类型信息与完整路径，先过滤掉目录再做 I/O
+    paths = []
+    with os.scandir(data_dir) as it:
+        for entry in it:
+            if not entry.is_file():
                 continue
-            
-            print(f"📝 转换: {filename}")
-            
-            # 解析旧的数组格式
-            try:
-                messages = json.loads(content)
-            except json.JSONDecodeError as e:
-                print(f"   ⚠️  解析失败: {e}")
+            filename = entry.name
+            if not (filename.startswith("conv_") and filename.endswith(".txt")):
                 continue
-            
-            if not isinstance(messages, list):
-                print(f"   ⚠️  不是数组格式，跳过")
+            # 索引命中（大小与 mtime 均未变化）说明已转换过，跳过读取
+            if index.get(filename) == _stat_key(entry.stat()):
                 continue
-            
-            # 转换为JSONL格式
-            with open(filepath, 'w', encoding='utf-8') as f:
-                for msg in messages:
-                    json.dump(msg, f, ensure_ascii=False)
-                    f.write('\n')
-            
-            print(f"   ✅ 转换完成，{len(messages)} 条消息")
-            converted_count += 1
-            
-        except Exception as e:
-            print(f"   ❌ 错误: {e}")
-    
+            paths.append(entry.path)
+
+    # 各文件互不依赖且以 I/O 为主，用小线程池重叠磁盘等待
+    converted_count = 0
+    max_workers = min(8, os.cpu_count() or 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for ok in executor.map(partial(_convert_one, index=index), paths):
+            converted_count += ok
+
+    try:
+        _save_index(index_path, index)
+    except OSError as e:
+        print(f"⚠️  保存转换索引失败: {e}")
+
     print(f"\n{'='*70}")
     print(f"✅ 转换完成！共转换 {converted_count} 个文件")
     print(f"{'='*70}\n")
@@ -5,14 +5,280 @@
 """
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
-    QPushButton, QSlider, QComboBox, QTextEdit,
-    QSpinBox, QGroupBox, QMessageBox, QDoubleSpinBox
+    QPushButton, QSlider, QComboBox, QPlainTextEdit,
+    QSpinBox, QMessageBox, QDoubleSpinBox
 )
-from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtGui import QFont, QIntValidator
-import requests
+from PyQt6.QtCore import (
+    Qt, pyqtSignal, QUrl, QTimer, QSignalBlocker, QEvent, QStringListModel, QCoreApplication
+)
+from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply, QNetworkProxy
+import json
+import logging
+import os
+import re
+import time
+from pathlib import Path
 from sd_config import get_sd_config, save_sd_params
 
+logger = logging.getLogger(__name__)
+
+# SD WebUI 模型列表接口
+SD_MODELS_URL = "http://127.0.0.1:7860/sdapi/v1/sd-models"
+# 模型列表请求超时（毫秒）
+SD_MODELS_TIMEOUT_MS = 5000
+# 模型列表磁盘缓存及其有效期（秒）
+SD_MODELS_CACHE_PATH = Path.home() / ".cache" / "aysos" / "sd_models.json"
+SD_MODELS_CACHE_TTL = 600
+# 参数保存的合并延迟（毫秒），连续多次应用只写一次磁盘
+SAVE_PARAMS_DELAY_MS = 500
+# 模型下拉框中表示状态而非真实模型的占位文本
+_MODEL_SENTINELS = frozenset(("加载中...", "加载失败", "SD WebUI 未运行", "未找到模型"))
+# 单词匹配：以空白分隔且至少包含一个非逗号字符的片段（等价于去掉逗号后按空白切分）
+_WORD_RE = re.compile(r"\S*[^\s,]\S*")
+# 提示词单词计数的防抖间隔（毫秒），连续输入只触发一次重新计数
+WORD_COUNT_DEBOUNCE_MS = 120
+
+
+def _load_cached_models():
+    """读取未过期的模型列表缓存，不存在或已过期返回 None"""
+    try:
+        if time.time() - SD_MODELS_CACHE_PATH.stat().st_mtime >= SD_MODELS_CACHE_TTL:
+            return None
+        with open(SD_MODELS_CACHE_PATH, 'r', encoding='utf-8') as f:
+            models = json.load(f)
+        return models if isinstance(models, list) and models else None
+    except (OSError, ValueError):
+        return None
+
+
+def _save_cached_models(model_names):
+    """将模型名称列表写入磁盘缓存"""
+    try:
+        SD_MODELS_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = SD_MODELS_CACHE_PATH.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(model_names, f, ensure_ascii=False)
+        os.replace(tmp_path, SD_MODELS_CACHE_PATH)
+    except OSError as e:
+        logger.warning("保存模型列表缓存失败: %s", e)
+
+# ---- 样式表常量：模块加载时构建一次，每次打开面板复用同一字符串 ----
+
+# 对话框整体样式
+_DIALOG_QSS = """
+    QDialog {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 rgba(240, 248, 255, 1.0),
+            stop:1 rgba(230, 240, 255, 1.0));
+    }
+    QLabel {
+        color: #2c3e50;
+        font-size: 12px;
+    }
+    QPlainTextEdit {
+        background: white;
+        border: 2px solid #bdc3c7;
+        border-radius: 5px;
+        padding: 5px;
+        font-size: 11px;
+    }
+    QPlainTextEdit:focus {
+        border: 2px solid #3498db;
+    }
+    QComboBox {
+        background: white;
+        border: 2px solid #bdc3c7;
+        border-radius: 5px;
+        padding: 5px;
+        font-size: 11px;
+        min-height: 30px;
+    }
+    QComboBox:focus {
+        border: 2px solid #3498db;
+    }
+    QComboBox::drop-down {
+        border: none;
+        width: 20px;
+    }
+    QComboBox::down-arrow {
+        image: none;
+        border-left: 5px solid transparent;
+        border-right: 5px solid transparent;
+        border-top: 5px solid #2c3e50;
+        margin-right: 5px;
+    }
+    QSlider::groove:horizontal {
+        background: #bdc3c7;
+        height: 6px;
+        border-radius: 3px;
+    }
+    QSlider::handle:horizontal {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+            stop:0 #3498db, stop:1 #2980b9);
+        width: 16px;
+        height: 16px;
+        margin: -5px 0;
+        border-radius: 8px;
+        border: 2px solid white;
+    }
+    QSlider::handle:horizontal:hover {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+            stop:0 #5dade2, stop:1 #3498db);
+    }
+    QSlider::sub-page:horizontal {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+            stop:0 #3498db, stop:1 #5dade2);
+        border-radius: 3px;
+    }
+    QSpinBox {
+        background: white;
+        border: 2px solid #bdc3c7;
+        border-radius: 5px;
+        padding: 5px;
+        font-size: 11px;
+        min-height: 25px;
+    }
+    QSpinBox:focus {
+        border: 2px solid #3498db;
+    }
+    QLabel[class="field"] {
+        font-weight: bold;
+    }
+    QLabel[class="hint"] {
+        color: #7f8c8d;
+        font-size: 10px;
+    }
+    QSpinBox[class="value"], QDoubleSpinBox[class="value"] {
+        font-weight: bold;
+        color: #3498db;
+    }
+"""
+
+# 标题样式
+_TITLE_QSS = """
+    font-size: 16px;
+    font-weight: bold;
+    color: #2c3e50;
+    padding: 3px;
+"""
+
+# 正向提示词标题样式
+_POSITIVE_TITLE_QSS = """
+    font-weight: bold;
+    color: #3498db;
+    font-size: 12px;
+"""
+
+# 单词计数标签初始样式
+_WORD_COUNT_QSS = """
+    font-weight: bold;
+    color: #7f8c8d;
+    font-size: 11px;
+"""
+
+# 负向提示词标题样式
+_NEGATIVE_TITLE_QSS = """
+    font-weight: bold;
+    color: #e74c3c;
+    font-size: 12px;
+"""
+
+# 刷新模型按钮样式
+_REFRESH_BTN_QSS = """
+    QPushButton {
+        background: #3498db;
+        color: white;
+        border-radius: 5px;
+        font-size: 14px;
+    }
+    QPushButton:hover {
+        background: #2980b9;
+    }
+"""
+
+# 取消按钮样式
+_CANCEL_BTN_QSS = """
+    QPushButton {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+            stop:0 #95a5a6, stop:1 #7f8c8d);
+        color: white;
+        font-size: 12px;
+        font-weight: bold;
+        border-radius: 8px;
+        border: none;
+    }
+    QPushButton:hover {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+            stop:0 #7f8c8d, stop:1 #6c7a7b);
+    }
+"""
+
+# 应用按钮样式
+_APPLY_BTN_QSS = """
+    QPushButton {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+            stop:0 #27ae60, stop:1 #229954);
+        color: white;
+        font-size: 12px;
+        font-weight: bold;
+        border-radius: 8px;
+        border: none;
+    }
+    QPushButton:hover {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+            stop:0 #2ecc71, stop:1 #27ae60);
+    }
+"""
+
+# 单词计数标签的三种状态样式（正常 / 接近限制 / 超出限制）
+_WC_QSS_NORMAL = """
+    font-weight: bold;
+    color: #7f8c8d;
+    font-size: 12px;
+"""
+_WC_QSS_WARN = """
+    font-weight: bold;
+    color: #f39c12;
+    font-size: 12px;
+"""
+_WC_QSS_OVER = """
+    font-weight: bold;
+    color: #e74c3c;
+    font-size: 12px;
+"""
+
+
+# 待写入的参数与合并保存定时器（模块级，不随对话框销毁而丢失）
+_pending_save_params = None
+_save_timer = None
+
+
+def _flush_save():
+    """立即写入尚未保存的参数"""
+    global _pending_save_params
+    if _pending_save_params is None:
+        return
+    params, _pending_save_params = _pending_save_params, None
+    if _save_timer is not None:
+        _save_timer.stop()
+    logger.debug("[创作面板] 保存参数到配置...")
+    save_sd_params(params)
+
+
+def _schedule_save(params):
+    """延迟保存参数，短时间内的多次调用只写最后一次"""
+    global _pending_save_params, _save_timer
+    _pending_save_params = params
+    if _save_timer is None:
+        _save_timer = QTimer()
+        _save_timer.setSingleShot(True)
+        _save_timer.timeout.connect(_flush_save)
+        app = QCoreApplication.instance()
+        if app is not None:
+            # 退出前确保最后一次参数落盘
+            app.aboutToQuit.connect(_flush_save)
+    _save_timer.start(SAVE_PARAMS_DELAY_MS)
+
 
 class CreationPanel(QDialog):
     """创作控制面板"""
@@ -21,7 +287,7 @@ class CreationPanel(QDialog):
     params_applied = pyqtSignal(dict)
     
     # 采样器列表
-    SAMPLERS = [
+    SAMPLERS = (
         "DPM++ 2M",
         "DPM++ SDE",
         "DPM++ 2M SDE",
@@ -42,10 +308,10 @@ class CreationPanel(QDialog):
         "PLMS",
         "UniPC",
         "LCM"
-    ]
+    )
     
     # 调度器列表
-    SCHEDULERS = [
+    SCHEDULERS = (
         "自动",
         "Uniform",
         "Karras",
@@ -58,7 +324,25 @@ class CreationPanel(QDialog):
         "Normal",
         "DDIM",
         "Beta"
-    ]
+    )
+    
+    # 所有面板实例共享的下拉列表模型（首次使用时创建）
+    _sampler_model = None
+    _scheduler_model = None
+    
+    @classmethod
+    def _get_sampler_model(cls) -> QStringListModel:
+        """获取共享的采样器列表模型"""
+        if cls._sampler_model is None:
+            cls._sampler_model = QStringListModel(list(cls.SAMPLERS))
+        return cls._sampler_model
+    
+    @classmethod
+    def _get_scheduler_model(cls) -> QStringListModel:
+        """获取共享的调度器列表模型"""
+        if cls._scheduler_model is None:
+            cls._scheduler_model = QStringListModel(list(cls.SCHEDULERS))
+        return cls._scheduler_model
     
     def __init__(self, parent=None, current_params=None):
         """
@@ -70,6 +354,18 @@ class CreationPanel(QDialog):
         """
         super().__init__(parent)
         
+        # 异步获取模型列表，避免在 GUI 线程上阻塞等待 SD WebUI 响应
+        self._nam = QNetworkAccessManager(self)
+        # 🚨 绕过代理，直连本地 SD WebUI
+        self._nam.setProxy(QNetworkProxy(QNetworkProxy.ProxyType.NoProxy))
+        self._models_reply = None
+        # 模型列表返回后需要选中的模型
+        self._pending_model = None
+        
+        # 单词计数防抖定时器
+        self._pos_timer = self._create_debounce_timer(self._do_positive_wc)
+        self._neg_timer = self._create_debounce_timer(self._do_negative_wc)
+        
         # 加载保存的配置
         sd_config = get_sd_config()
         self.default_params = sd_config.get_all()
@@ -78,93 +374,35 @@ class CreationPanel(QDialog):
         if current_params:
             self.default_params.update(current_params)
         
-        self.init_ui()
-        self.load_params(self.default_params)
+        # 控件在首次显示时才构建，仅实例化面板（例如读取默认参数）时不付出构建开销
+        self._built = False
+        # 滑动条 -> (最小值, 最大值, 滚轮步进)
+        self._wheel_steps = {}
+        self._build_skeleton()
     
-    def init_ui(self):
-        """初始化UI - 紧凑布局优化版"""
+    def _build_skeleton(self):
+        """设置窗口基本属性（轻量，在 __init__ 中执行）"""
         self.setWindowTitle("创作控制面板")
         self.setFixedSize(600, 680)  # 🔧 减小高度（800->680）
         self.setModal(True)  # 模态对话框
-        
+    
+    def showEvent(self, event):
+        """首次显示时构建全部控件并加载参数"""
+        if not self._built:
+            # 构建期间暂停更新，布局与样式在结束后统一计算一次
+            self.setUpdatesEnabled(False)
+            try:
+                self._build_contents()
+                self.load_params(self.default_params)
+            finally:
+                self.setUpdatesEnabled(True)
+            self._built = True
+        super().showEvent(event)
+    
+    def _build_contents(self):
+        """构建面板控件 - 紧凑布局优化版"""
         # 设置窗口样式
-        self.setStyleSheet("""
-            QDialog {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 rgba(240, 248, 255, 1.0),
-                    stop:1 rgba(230, 240, 255, 1.0));
-            }
-            QLabel {
-                color: #2c3e50;
-                font-size: 12px;
-            }
-            QTextEdit {
-                background: white;
-                border: 2px solid #bdc3c7;
-                border-radius: 5px;
-                padding: 5px;
-                font-size: 11px;
-            }
-            QTextEdit:focus {
-                border: 2px solid #3498db;
-            }
-            QComboBox {
-                background: white;
-                border: 2px solid #bdc3c7;
-                border-radius: 5px;
-                padding: 5px;
-                font-size: 11px;
-                min-height: 30px;
-            }
-            QComboBox:focus {
-                border: 2px solid #3498db;
-            }
-            QComboBox::drop-down {
-                border: none;
-                width: 20px;
-            }
-            QComboBox::down-arrow {
-                image: none;
-                border-left: 5px solid transparent;
-                border-right: 5px solid transparent;
-                border-top: 5px solid #2c3e50;
-                margin-right: 5px;
-            }
-            QSlider::groove:horizontal {
-                background: #bdc3c7;
-                height: 6px;
-                border-radius: 3px;
-            }
-            QSlider::handle:horizontal {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #3498db, stop:1 #2980b9);
-                width: 16px;
-                height: 16px;
-                margin: -5px 0;
-                border-radius: 8px;
-                border: 2px solid white;
-            }
-            QSlider::handle:horizontal:hover {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #5dade2, stop:1 #3498db);
-            }
-            QSlider::sub-page:horizontal {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                    stop:0 #3498db, stop:1 #5dade2);
-                border-radius: 3px;
-            }
-            QSpinBox {
-                background: white;
-                border: 2px solid #bdc3c7;
-                border-radius: 5px;
-                padding: 5px;
-                font-size: 11px;
-                min-height: 25px;
-            }
-            QSpinBox:focus {
-                border: 2px solid #3498db;
-            }
-        """)
+        self.setStyleSheet(_DIALOG_QSS)
         
         main_layout = QVBoxLayout(self)
         main_layout.setSpacing(4)  # 🔧 进一步减小整体垂直间距（6->4）
@@ -172,12 +410,7 @@ class CreationPanel(QDialog):
         
         # 标题 - 更紧凑
         title = QLabel("🎨 创作控制面板")
-        title.setStyleSheet("""
-            font-size: 16px;
-            font-weight: bold;
-            color: #2c3e50;
-            padding: 3px;
-        """)  # 🔧 减小标题字体和padding（18px,10px -> 16px,3px）
+        title.setStyleSheet(_TITLE_QSS)  # 🔧 减小标题字体和padding（18px,10px -> 16px,3px）
         title.setAlignment(Qt.AlignmentFlag.AlignCenter)
         main_layout.addWidget(title)
         
@@ -192,23 +425,15 @@ class CreationPanel(QDialog):
         positive_container.setContentsMargins(0, 0, 0, 0)
         positive_header = QHBoxLayout()
         positive_title = QLabel("正向提示词")
-        positive_title.setStyleSheet("""
-            font-weight: bold;
-            color: #3498db;
-            font-size: 12px;
-        """)  # 🔧 减小字体（13px->12px）
+        positive_title.setStyleSheet(_POSITIVE_TITLE_QSS)  # 🔧 减小字体（13px->12px）
         self.positive_word_count = QLabel("0/75")
-        self.positive_word_count.setStyleSheet("""
-            font-weight: bold;
-            color: #7f8c8d;
-            font-size: 11px;
-        """)  # 🔧 减小字体（12px->11px）
+        self.positive_word_count.setStyleSheet(_WORD_COUNT_QSS)  # 🔧 减小字体（12px->11px）
         positive_header.addWidget(positive_title)
         positive_header.addStretch()
         positive_header.addWidget(self.positive_word_count)
         positive_container.addLayout(positive_header)
         
-        self.prompt_edit = QTextEdit()
+        self.prompt_edit = QPlainTextEdit()
         self.prompt_edit.setFixedHeight(60)  # 🔧 减小高度（70->60）
         self.prompt_edit.setPlaceholderText("输入正向提示词...")
         self.prompt_edit.textChanged.connect(self.update_positive_word_count)
@@ -220,23 +445,15 @@ class CreationPanel(QDialog):
         negative_container.setContentsMargins(0, 0, 0, 0)
         negative_header = QHBoxLayout()
         negative_title = QLabel("负向提示词")
-        negative_title.setStyleSheet("""
-            font-weight: bold;
-            color: #e74c3c;
-            font-size: 12px;
-        """)  # 🔧 减小字体（13px->12px）
+        negative_title.setStyleSheet(_NEGATIVE_TITLE_QSS)  # 🔧 减小字体（13px->12px）
         self.negative_word_count = QLabel("0/75")
-        self.negative_word_count.setStyleSheet("""
-            font-weight: bold;
-            color: #7f8c8d;
-            font-size: 11px;
-        """)  # 🔧 减小字体（12px->11px）
+        self.negative_word_count.setStyleSheet(_WORD_COUNT_QSS)  # 🔧 减小字体（12px->11px）
         negative_header.addWidget(negative_title)
         negative_header.addStretch()
         negative_header.addWidget(self.negative_word_count)
         negative_container.addLayout(negative_header)
         
-        self.negative_prompt_edit = QTextEdit()
+        self.negative_prompt_edit = QPlainTextEdit()
         self.negative_prompt_edit.setFixedHeight(60)  # 🔧 减小高度（70->60）
         self.negative_prompt_edit.setPlaceholderText("输入负向提示词...")
         self.negative_prompt_edit.textChanged.connect(self.update_negative_word_count)
@@ -249,43 +466,33 @@ class CreationPanel(QDialog):
         # 1.5 模型选择（新增）
         model_layout = QHBoxLayout()
         model_label = QLabel("选择模型:")
-        model_label.setStyleSheet("font-weight: bold;")
+        model_label.setProperty("class", "field")
         self.model_combo = QComboBox()
         self.model_combo.setPlaceholderText("加载中...")
         
         # 刷新按钮
-        refresh_model_btn = QPushButton("🔄")
-        refresh_model_btn.setFixedSize(35, 35)
-        refresh_model_btn.setToolTip("刷新模型列表")
-        refresh_model_btn.setStyleSheet("""
-            QPushButton {
-                background: #3498db;
-                color: white;
-                border-radius: 5px;
-                font-size: 14px;
-            }
-            QPushButton:hover {
-                background: #2980b9;
-            }
-        """)
-        refresh_model_btn.clicked.connect(self.refresh_models)
+        self.refresh_model_btn = QPushButton("🔄")
+        self.refresh_model_btn.setFixedSize(35, 35)
+        self.refresh_model_btn.setToolTip("刷新模型列表")
+        self.refresh_model_btn.setStyleSheet(_REFRESH_BTN_QSS)
+        self.refresh_model_btn.clicked.connect(self.refresh_models)
         
         model_layout.addWidget(model_label)
         model_layout.addWidget(self.model_combo, 1)
-        model_layout.addWidget(refresh_model_btn)
+        model_layout.addWidget(self.refresh_model_btn)
         main_layout.addLayout(model_layout)
         
-        # 自动加载模型列表
-        self.refresh_models()
+        # 自动加载模型列表（优先使用磁盘缓存，否则异步请求，结果返回前显示"加载中..."）
+        self.refresh_models(use_cache=True)
         
         # 2. 采样方式与调度类型（并排）
         sampler_layout = QHBoxLayout()
         
         # 采样方式
         sampler_label = QLabel("采样方式:")
-        sampler_label.setStyleSheet("font-weight: bold;")
+        sampler_label.setProperty("class", "field")
         self.sampler_combo = QComboBox()
-        self.sampler_combo.addItems(self.SAMPLERS)
+        self.sampler_combo.setModel(self._get_sampler_model())
         self.sampler_combo.setCurrentText("DPM++ 2M")
         
         sampler_layout.addWidget(sampler_label)
@@ -293,9 +500,9 @@ class CreationPanel(QDialog):
         
         # 调度类型
         scheduler_label = QLabel("调度类型:")
-        scheduler_label.setStyleSheet("font-weight: bold;")
+        scheduler_label.setProperty("class", "field")
         self.scheduler_combo = QComboBox()
-        self.scheduler_combo.addItems(self.SCHEDULERS)
+        self.scheduler_combo.setModel(self._get_scheduler_model())
         self.scheduler_combo.setCurrentText("Karras")
         
         sampler_layout.addWidget(scheduler_label)
@@ -303,128 +510,58 @@ class CreationPanel(QDialog):
         
         main_layout.addLayout(sampler_layout)
         
-        # 3. 迭代步数（可编辑）
-        steps_layout = QHBoxLayout()
-        steps_label = QLabel("迭代步数:")
-        steps_label.setStyleSheet("font-weight: bold;")
-        self.steps_slider = QSlider(Qt.Orientation.Horizontal)
-        self.steps_slider.setRange(1, 150)
-        self.steps_slider.setValue(20)
-        
-        # 可编辑的数值框（无按钮）
-        self.steps_spinbox = QSpinBox()
-        self.steps_spinbox.setRange(1, 150)
-        self.steps_spinbox.setValue(20)
-        self.steps_spinbox.setFixedWidth(60)
-        self.steps_spinbox.setStyleSheet("font-weight: bold; color: #3498db;")
-        self.steps_spinbox.setButtonSymbols(QSpinBox.ButtonSymbols.NoButtons)  # 移除加减按钮
-        
-        # 双向绑定
-        self.steps_slider.valueChanged.connect(self.steps_spinbox.setValue)
-        self.steps_spinbox.valueChanged.connect(self.steps_slider.setValue)
-        
-        # 鼠标滚轮支持（精度1）
-        self.steps_slider.wheelEvent = lambda e: self._handle_wheel(e, self.steps_slider, 1, 150, 1)
-        
-        steps_layout.addWidget(steps_label)
-        steps_layout.addWidget(self.steps_slider, 1)
-        steps_layout.addWidget(self.steps_spinbox)
+        # 3. 迭代步数（可编辑，滚轮精度1）
+        self.steps_slider, self.steps_spinbox, steps_layout = self._build_int_row(
+            "迭代步数:", 1, 150, 1, 20, 1)
         main_layout.addLayout(steps_layout)
         
-        # 4. 宽度滑动条（可编辑）
-        width_layout = QHBoxLayout()
-        width_label = QLabel("宽度:")
-        width_label.setStyleSheet("font-weight: bold;")
-        self.width_slider = QSlider(Qt.Orientation.Horizontal)
-        self.width_slider.setRange(256, 1024)
-        self.width_slider.setSingleStep(64)
-        self.width_slider.setValue(512)
-        
-        # 可编辑的数值框（无按钮）
-        self.width_spinbox = QSpinBox()
-        self.width_spinbox.setRange(256, 1024)
-        self.width_spinbox.setSingleStep(64)
-        self.width_spinbox.setValue(512)
-        self.width_spinbox.setFixedWidth(60)
-        self.width_spinbox.setStyleSheet("font-weight: bold; color: #3498db;")
-        self.width_spinbox.setButtonSymbols(QSpinBox.ButtonSymbols.NoButtons)  # 移除加减按钮
-        
-        # 双向绑定
-        self.width_slider.valueChanged.connect(self.width_spinbox.setValue)
-        self.width_spinbox.valueChanged.connect(self.width_slider.setValue)
-        
-        # 鼠标滚轮支持（精度1）
-        self.width_slider.wheelEvent = lambda e: self._handle_wheel(e, self.width_slider, 256, 1024, 1)
-        
-        width_layout.addWidget(width_label)
-        width_layout.addWidget(self.width_slider, 1)
-        width_layout.addWidget(self.width_spinbox)
+        # 4. 宽度滑动条（可编辑，滚轮精度1）
+        self.width_slider, self.width_spinbox, width_layout = self._build_int_row(
+            "宽度:", 256, 1024, 64, 512, 1)
         main_layout.addLayout(width_layout)
         
-        # 5. 高度滑动条（可编辑）
-        height_layout = QHBoxLayout()
-        height_label = QLabel("高度:")
-        height_label.setStyleSheet("font-weight: bold;")
-        self.height_slider = QSlider(Qt.Orientation.Horizontal)
-        self.height_slider.setRange(256, 1024)
-        self.height_slider.setSingleStep(64)
-        self.height_slider.setValue(512)
-        
-        # 可编辑的数值框（无按钮）
-        self.height_spinbox = QSpinBox()
-        self.height_spinbox.setRange(256, 1024)
-        self.height_spinbox.setSingleStep(64)
-        self.height_spinbox.setValue(512)
-        self.height_spinbox.setFixedWidth(60)
-        self.height_spinbox.setStyleSheet("font-weight: bold; color: #3498db;")
-        self.height_spinbox.setButtonSymbols(QSpinBox.ButtonSymbols.NoButtons)  # 移除加减按钮
-        
-        # 双向绑定
-        self.height_slider.valueChanged.connect(self.height_spinbox.setValue)
-        self.height_spinbox.valueChanged.connect(self.height_slider.setValue)
-        
-        # 鼠标滚轮支持（精度1）
-        self.height_slider.wheelEvent = lambda e: self._handle_wheel(e, self.height_slider, 256, 1024, 1)
-        
-        height_layout.addWidget(height_label)
-        height_layout.addWidget(self.height_slider, 1)
-        height_layout.addWidget(self.height_spinbox)
+        # 5. 高度滑动条（可编辑，滚轮精度1）
+        self.height_slider, self.height_spinbox, height_layout = self._build_int_row(
+            "高度:", 256, 1024, 64, 512, 1)
         main_layout.addLayout(height_layout)
         
         # 6. 提示词服从度滑动条（支持0.5精度）
         cfg_layout = QHBoxLayout()
         cfg_label = QLabel("提示词服从度:")
-        cfg_label.setStyleSheet("font-weight: bold;")
+        cfg_label.setProperty("class", "field")
         self.cfg_slider = QSlider(Qt.Orientation.Horizontal)
         self.cfg_slider.setRange(10, 300)  # 1.0-30.0, 步进0.1
         self.cfg_slider.setValue(70)  # 7.0
         
         # 可编辑的数值框（支持0.5精度，无按钮）
-        from PyQt6.QtWidgets import QDoubleSpinBox
         self.cfg_spinbox = QDoubleSpinBox()
         self.cfg_spinbox.setRange(1.0, 30.0)
         self.cfg_spinbox.setSingleStep(0.5)  # 步进0.5
         self.cfg_spinbox.setDecimals(1)
         self.cfg_spinbox.setValue(7.0)
         self.cfg_spinbox.setFixedWidth(60)
-        self.cfg_spinbox.setStyleSheet("font-weight: bold; color: #3498db;")
+        self.cfg_spinbox.setProperty("class", "value")
         self.cfg_spinbox.setButtonSymbols(QDoubleSpinBox.ButtonSymbols.NoButtons)  # 移除加减按钮
         
         # 双向绑定（需要转换，支持0.5精度）
+        # 滑动条以 0.1 为单位的整数表示，只在数值确实变化时写回对方，避免来回回弹
         def slider_to_spinbox(v):
-            # 滑动条值转为0.5的倍数
-            value = round(v / 10.0 * 2) / 2  # 四舍五入到0.5
-            self.cfg_spinbox.setValue(value)
+            # 滑动条值取整到5的倍数（即0.5），再换算为浮点显示
+            value = (v + 2) // 5 * 5 / 10.0
+            if value != self.cfg_spinbox.value():
+                self.cfg_spinbox.setValue(value)
         
         def spinbox_to_slider(v):
             # spinbox值转为滑动条值
-            self.cfg_slider.setValue(int(v * 10))
+            tenths = round(v * 10)
+            if tenths != self.cfg_slider.value():
+                self.cfg_slider.setValue(tenths)
         
         self.cfg_slider.valueChanged.connect(slider_to_spinbox)
         self.cfg_spinbox.valueChanged.connect(spinbox_to_slider)
         
         # 鼠标滚轮支持（精度0.5，即滑动条移动5）
-        self.cfg_slider.wheelEvent = lambda e: self._handle_wheel(e, self.cfg_slider, 10, 300, 5)
+        self._install_wheel_step(self.cfg_slider, 10, 300, 5)
         
         cfg_layout.addWidget(cfg_label)
         cfg_layout.addWidget(self.cfg_slider, 1)
@@ -434,13 +571,13 @@ class CreationPanel(QDialog):
         # 7. 随机数种子
         seed_layout = QHBoxLayout()
         seed_label = QLabel("随机数种子:")
-        seed_label.setStyleSheet("font-weight: bold;")
+        seed_label.setProperty("class", "field")
         self.seed_spinbox = QSpinBox()
         self.seed_spinbox.setRange(-1, 2147483647)
         self.seed_spinbox.setValue(-1)
         self.seed_spinbox.setSpecialValueText("随机")
         seed_info = QLabel("(-1 为随机)")
-        seed_info.setStyleSheet("color: #7f8c8d; font-size: 10px;")
+        seed_info.setProperty("class", "hint")
         
         seed_layout.addWidget(seed_label)
         seed_layout.addWidget(self.seed_spinbox, 1)
@@ -455,41 +592,13 @@ class CreationPanel(QDialog):
         # 取消按钮
         cancel_btn = QPushButton("取消")
         cancel_btn.setFixedSize(90, 36)  # 🔧 减小按钮尺寸（100x40 -> 90x36）
-        cancel_btn.setStyleSheet("""
-            QPushButton {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #95a5a6, stop:1 #7f8c8d);
-                color: white;
-                font-size: 12px;
-                font-weight: bold;
-                border-radius: 8px;
-                border: none;
-            }
-            QPushButton:hover {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #7f8c8d, stop:1 #6c7a7b);
-            }
-        """)
+        cancel_btn.setStyleSheet(_CANCEL_BTN_QSS)
         cancel_btn.clicked.connect(self.reject)
         
         # 应用按钮
         apply_btn = QPushButton("应用")
         apply_btn.setFixedSize(90, 36)  # 🔧 减小按钮尺寸（100x40 -> 90x36）
-        apply_btn.setStyleSheet("""
-            QPushButton {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #27ae60, stop:1 #229954);
-                color: white;
-                font-size: 12px;
-                font-weight: bold;
-                border-radius: 8px;
-                border: none;
-            }
-            QPushButton:hover {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #2ecc71, stop:1 #27ae60);
-            }
-        """)
+        apply_btn.setStyleSheet(_APPLY_BTN_QSS)
         apply_btn.clicked.connect(self.apply_params)
         
         buttons_layout.addWidget(cancel_btn)
@@ -499,6 +608,55 @@ class CreationPanel(QDialog):
         main_layout.addSpacing(5)  # 🔧 减小底部间距（10->5）
         main_layout.addLayout(buttons_layout)
     
+    def _build_int_row(self, label, lo, hi, step, default, wheel_step):
+        """
+        构建"标签 + 滑动条 + 数值框"的整数参数行，滑动条与数值框双向绑定
+        
+        Returns:
+            (slider, spinbox, layout)
+        """
+        layout = QHBoxLayout()
+        row_label = QLabel(label)
+        row_label.setProperty("class", "field")
+        slider = QSlider(Qt.Orientation.Horizontal)
+        slider.setRange(lo, hi)
+        slider.setSingleStep(step)
+        slider.setValue(default)
+        
+        # 可编辑的数值框（无按钮）
+        spinbox = QSpinBox()
+        spinbox.setRange(lo, hi)
+        spinbox.setSingleStep(step)
+        spinbox.setValue(default)
+        spinbox.setFixedWidth(60)
+        spinbox.setProperty("class", "value")
+        spinbox.setButtonSymbols(QSpinBox.ButtonSymbols.NoButtons)  # 移除加减按钮
+        
+        # 双向绑定
+        slider.valueChanged.connect(spinbox.setValue)
+        spinbox.valueChanged.connect(slider.setValue)
+        
+        self._install_wheel_step(slider, lo, hi, wheel_step)
+        
+        layout.addWidget(row_label)
+        layout.addWidget(slider, 1)
+        layout.addWidget(spinbox)
+        return slider, spinbox, layout
+    
+    def _install_wheel_step(self, slider, min_val, max_val, step):
+        """登记滑动条的滚轮精度，滚轮事件由 eventFilter 统一处理"""
+        self._wheel_steps[slider] = (min_val, max_val, step)
+        slider.installEventFilter(self)
+    
+    def eventFilter(self, obj, event):
+        """拦截滑动条的滚轮事件，按各自精度调整数值"""
+        if event.type() == QEvent.Type.Wheel:
+            wheel_step = self._wheel_steps.get(obj)
+            if wheel_step is not None:
+                self._handle_wheel(event, obj, *wheel_step)
+                return True
+        return super().eventFilter(obj, event)
+    
     def _handle_wheel(self, event, slider, min_val, max_val, step):
         """处理滚轮事件"""
         delta = event.angleDelta().y()
@@ -512,50 +670,87 @@ class CreationPanel(QDialog):
         slider.setValue(new_value)
         event.accept()
     
-    def refresh_models(self):
-        """从SD WebUI获取可用模型列表"""
+    def refresh_models(self, use_cache=False):
+        """
+        从SD WebUI异步获取可用模型列表
+        
+        Args:
+            use_cache: 为 True 且磁盘缓存未过期时直接使用缓存，不发起网络请求
+        """
+        if self._models_reply is not None:
+            return  # 已有请求在进行中
+        
+        if use_cache:
+            cached_models = _load_cached_models()
+            if cached_models:
+                self._populate_models(cached_models)
+                logger.debug("从缓存加载了 %d 个模型", len(cached_models))
+                return
+        
+        # 清空当前列表
+        self.model_combo.clear()
+        self.model_combo.addItem("加载中...")
+        self.refresh_model_btn.setEnabled(False)
+        
+        request = QNetworkRequest(QUrl(SD_MODELS_URL))
+        request.setTransferTimeout(SD_MODELS_TIMEOUT_MS)
+        self._models_reply = self._nam.get(request)
+        self._models_reply.finished.connect(self._on_models_reply)
+    
+    def _on_models_reply(self):
+        """模型列表请求完成后填充下拉列表"""
+        reply = self._models_reply
+        self._models_reply = None
+        self.refresh_model_btn.setEnabled(True)
+        
         try:
-            # 清空当前列表
             self.model_combo.clear()
-            self.model_combo.addItem("加载中...")
+            error = reply.error()
             
-            # 🚨 绕过代理，直连本地 SD WebUI
-            no_proxy = {'http': None, 'https': None}
+            if error == QNetworkReply.NetworkError.ConnectionRefusedError:
+                self.model_combo.addItem("SD WebUI 未运行")
+                logger.error("无法连接到 SD WebUI")
+                return
             
-            # 获取模型列表
-            response = requests.get(
-                "http://127.0.0.1:7860/sdapi/v1/sd-models",
-                timeout=5,
-                proxies=no_proxy
-            )
-            
-            if response.status_code == 200:
-                models = response.json()
-                self.model_combo.clear()
-                
-                if not models:
-                    self.model_combo.addItem("未找到模型")
-                    return
-                
-                # 添加模型到下拉列表
-                for model in models:
-                    model_name = model.get('title', model.get('model_name', '未知'))
-                    self.model_combo.addItem(model_name)
-                
-                print(f"[OK] 加载了 {len(models)} 个模型")
-            else:
-                self.model_combo.clear()
+            status = reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+            if error != QNetworkReply.NetworkError.NoError or status != 200:
                 self.model_combo.addItem("加载失败")
-                print(f"[ERROR] 获取模型列表失败: {response.status_code}")
-                
-        except requests.exceptions.ConnectionError:
-            self.model_combo.clear()
-            self.model_combo.addItem("SD WebUI 未运行")
-            print("[ERROR] 无法连接到 SD WebUI")
+                logger.error("获取模型列表失败: %s", status or reply.errorString())
+                return
+            
+            models = json.loads(bytes(reply.readAll()))
+            
+            if not models:
+                self.model_combo.addItem("未找到模型")
+                return
+            
+            model_names = [m.get('title') or m.get('model_name') or '未知' for m in models]
+            self._populate_models(model_names)
+            _save_cached_models(model_names)
+            
+            logger.debug("加载了 %d 个模型", len(models))
         except Exception as e:
             self.model_combo.clear()
             self.model_combo.addItem("加载失败")
-            print(f"[ERROR] 获取模型列表异常: {e}")
+            logger.error("获取模型列表异常: %s", e)
+        finally:
+            reply.deleteLater()
+    
+    def _populate_models(self, model_names):
+        """填充模型下拉列表，并选中之前请求的模型"""
+        # 一次性批量填充下拉列表，期间暂停重绘
+        self.model_combo.setUpdatesEnabled(False)
+        try:
+            self.model_combo.clear()
+            self.model_combo.addItems(model_names)
+        finally:
+            self.model_combo.setUpdatesEnabled(True)
+        
+        # 恢复在列表到达前请求选中的模型
+        if self._pending_model:
+            index = self.model_combo.findText(self._pending_model)
+            if index >= 0:
+                self.model_combo.setCurrentIndex(index)
     
     def load_params(self, params: dict):
         """加载参数到UI"""
@@ -570,13 +765,17 @@ class CreationPanel(QDialog):
         if scheduler in self.SCHEDULERS:
             self.scheduler_combo.setCurrentText(scheduler)
         
-        self.steps_spinbox.setValue(params.get("steps", 20))
-        self.cfg_spinbox.setValue(params.get("cfg_scale", 7.0))
+        # 屏蔽滑动条信号：数值框 → 滑动条 单向同步一次，不再回弹触发数值框
+        with QSignalBlocker(self.steps_slider), QSignalBlocker(self.cfg_slider), \
+                QSignalBlocker(self.width_slider), QSignalBlocker(self.height_slider):
+            self.steps_spinbox.setValue(params.get("steps", 20))
+            self.cfg_spinbox.setValue(params.get("cfg_scale", 7.0))
+            self.width_spinbox.setValue(params.get("width", 512))
+            self.height_spinbox.setValue(params.get("height", 512))
         self.seed_spinbox.setValue(params.get("seed", -1))
-        self.width_spinbox.setValue(params.get("width", 512))
-        self.height_spinbox.setValue(params.get("height", 512))
         
-        # 加载模型（如果有）
+        # 加载模型（如果有）；列表尚未返回时由 _on_models_reply 负责选中
+        self._pending_model = params.get("model") or None
         if params.get("model"):
             index = self.model_combo.findText(params["model"])
             if index >= 0:
@@ -584,6 +783,10 @@ class CreationPanel(QDialog):
     
     def get_params(self) -> dict:
         """获取当前UI的参数"""
+        if not self._built:
+            # 控件尚未构建，直接返回加载的参数
+            return dict(self.default_params)
+        
         params = {
             "prompt": self.prompt_edit.toPlainText().strip(),
             "negative_prompt": self.negative_prompt_edit.toPlainText().strip(),
@@ -598,7 +801,7 @@ class CreationPanel(QDialog):
         
         # 添加模型（如果不是错误消息）
         model_text = self.model_combo.currentText()
-        if model_text and model_text not in ["加载中...", "加载失败", "SD WebUI 未运行", "未找到模型"]:
+        if model_text and model_text not in _MODEL_SENTINELS:
             params["model"] = model_text
         
         return params
@@ -608,13 +811,8 @@ class CreationPanel(QDialog):
         params = self.get_params()
         
         # 验证提示词长度（75个单词限制）
-        def count_words(text):
-            if not text:
-                return 0
-            return len(text.replace(',', '').split())
-        
-        pos_words = count_words(params["prompt"])
-        neg_words = count_words(params["negative_prompt"])
+        pos_words = self.count_words(params["prompt"])
+        neg_words = self.count_words(params["negative_prompt"])
         
         if pos_words > 75:
             QMessageBox.warning(
@@ -632,9 +830,8 @@ class CreationPanel(QDialog):
             )
             return
         
-        # 保存参数到配置文件（自动持久化）
-        print("[创作面板] 保存参数到配置...")
-        save_sd_params(params)
+        # 保存参数到配置文件（自动持久化，延迟合并写入，不阻塞对话框关闭）
+        _schedule_save(params)
         
         # 发送信号
         self.params_applied.emit(params)
@@ -644,45 +841,46 @@ class CreationPanel(QDialog):
         """计算单词数量"""
         if not text:
             return 0
-        # 移除逗号，然后按空格分割
-        return len(text.replace(',', '').split())
+        # 单次扫描计数，不构造去逗号后的中间字符串和切分列表
+        return sum(1 for _ in _WORD_RE.finditer(text))
+    
+    @staticmethod
+    def _word_count_qss(word_count: int) -> str:
+        """根据单词数量选择预先构建好的计数标签样式"""
+        if word_count > 75:
+            return _WC_QSS_OVER  # 红色，超出限制
+        if word_count > 60:
+            return _WC_QSS_WARN  # 橙色，接近限制
+        return _WC_QSS_NORMAL  # 灰色，正常
+    
+    def _create_debounce_timer(self, slot):
+        """创建单次触发的防抖定时器"""
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.setInterval(WORD_COUNT_DEBOUNCE_MS)
+        timer.timeout.connect(slot)
+        return timer
     
     def update_positive_word_count(self):
+        """正向提示词变化时延迟更新单词计数"""
+        self._pos_timer.start()
+    
+    def update_negative_word_count(self):
+        """负向提示词变化时延迟更新单词计数"""
+        self._neg_timer.start()
+    
+    def _do_positive_wc(self):
         """更新正向提示词的单词计数"""
         text = self.prompt_edit.toPlainText()
         word_count = self.count_words(text)
         
-        # 根据数量设置颜色
-        if word_count > 75:
-            color = "#e74c3c"  # 红色，超出限制
-        elif word_count > 60:
-            color = "#f39c12"  # 橙色，接近限制
-        else:
-            color = "#7f8c8d"  # 灰色，正常
-        
         self.positive_word_count.setText(f"{word_count}/75")
-        self.positive_word_count.setStyleSheet(f"""
-            font-weight: bold;
-            color: {color};
-            font-size: 12px;
-        """)
+        self.positive_word_count.setStyleSheet(self._word_count_qss(word_count))
     
-    def update_negative_word_count(self):
+    def _do_negative_wc(self):
         """更新负向提示词的单词计数"""
         text = self.negative_prompt_edit.toPlainText()
         word_count = self.count_words(text)
         
-        # 根据数量设置颜色
-        if word_count > 75:
-            color = "#e74c3c"  # 红色，超出限制
-        elif word_count > 60:
-            color = "#f39c12"  # 橙色，接近限制
-        else:
-            color = "#7f8c8d"  # 灰色，正常
-        
         self.negative_word_count.setText(f"{word_count}/75")
-        self.negative_word_count.setStyleSheet(f"""
-            font-weight: bold;
-            color: {color};
-            font-size: 12px;
-        """)
\ No newline at end of file
+        self.negative_word_count.setStyleSheet(self._word_count_qss(word_count))
\ No newline at end of file
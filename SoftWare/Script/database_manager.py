@@ -1,20 +1,363 @@
+import hashlib
+import json
+import logging
+import os
 import pyodbc
+import queue
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# 可选依赖：附件列表的编码/解析依次优先 msgspec、orjson（C 实现），都未安装时退回标准库
+try:
+    import msgspec.json
+
+    _json_loads = msgspec.json.Decoder().decode
+    _msgspec_encode = msgspec.json.Encoder().encode
+    _JSON_DECODE_ERRORS = (ValueError, msgspec.DecodeError)
+
+    def _json_dumps(value):
+        return _msgspec_encode(value).decode('utf-8')
+except ImportError:
+    try:
+        import orjson
+
+        _json_loads = orjson.loads
+        _JSON_DECODE_ERRORS = (ValueError,)
+
+        def _json_dumps(value):
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    except ImportError:
+        _json_loads = json.loads
+        _JSON_DECODE_ERRORS = (ValueError,)
+
+        def _json_dumps(value):
+            return json.dumps(value, ensure_ascii=False)
+
+# 每次从驱动批量取回的行数（长对话分批读取，避免一次性物化全部 LONGTEXT）
+FETCH_ARRAYSIZE = 500
+
+# 连接池：每个 DSN 预建 POOL_MIN_SIZE 个连接，最多 POOL_MAX_SIZE 个
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = 4
+# 连接空闲超过该秒数后，取出时先用 SELECT 1 校验是否仍然可用
+POOL_VALIDATE_IDLE_SECONDS = 60.0
+# 连接池已满时等待归还的最长秒数，超时抛出 pyodbc.Error 而不是无限阻塞
+POOL_CHECKOUT_TIMEOUT = 30.0
+
+# 常用参数化语句（文本固定，驱动可复用已准备好的执行计划）
+SQL_INSERT_CONVERSATION = 'INSERT INTO conversations (id, title) VALUES (?, ?)'
+SQL_UPDATE_CONV_TITLE = 'UPDATE conversations SET title = ? WHERE id = ?'
+SQL_DELETE_CONVERSATION = 'DELETE FROM conversations WHERE id = ?'
+SQL_SELECT_ALL_CONVS = 'SELECT id, title, created_at FROM conversations ORDER BY created_at DESC'
+SQL_INSERT_MESSAGE = 'INSERT INTO messages (conversation_id, role, content, files) VALUES (?, ?, ?, ?)'
+SQL_SELECT_HISTORY_BASE = 'SELECT role, content, files FROM messages WHERE conversation_id = ?'
+SQL_SELECT_HISTORY = SQL_SELECT_HISTORY_BASE + ' ORDER BY id ASC'
+SQL_SELECT_MESSAGE_IDS = 'SELECT id FROM messages WHERE conversation_id = ? ORDER BY id ASC'
+SQL_DELETE_MSG_BY_ID = 'DELETE FROM messages WHERE id = ?'
+SQL_CLEAR_MESSAGES = 'DELETE FROM messages WHERE conversation_id = ?'
+# IN (...) 批量删除时单条语句的最大参数个数（SQL Server 上限 2100）
+DELETE_IN_CHUNK_SIZE = 2000
+
+# 会话消息 ID 列表的短期缓存：界面连续删除时复用，最多保留若干个会话
+IDS_CACHE_MAX_AGE = 2.0
+IDS_CACHE_SIZE = 64
+SQL_DELETE_MSGS_GE_ID = 'DELETE FROM messages WHERE conversation_id = ? AND id >= ?'
+# 最新对话：只让服务端返回一行（未知数据库不加限制，仅 fetchone）
+SQL_LATEST_CONV_TOP = 'SELECT TOP 1 id, title, created_at FROM conversations ORDER BY created_at DESC'
+SQL_LATEST_CONV_LIMIT = 'SELECT id, title, created_at FROM conversations ORDER BY created_at DESC LIMIT 1'
+SQL_LATEST_CONV_PLAIN = 'SELECT id, title, created_at FROM conversations ORDER BY created_at DESC'
+
+# 直接让服务端定位会话中第 N 条消息的 ID（只返回一个整数）
+SQL_NTH_ID_OFFSET_FETCH = 'SELECT id FROM messages WHERE conversation_id = ? ORDER BY id ASC OFFSET ? ROWS FETCH NEXT 1 ROWS ONLY'
+SQL_NTH_ID_LIMIT = 'SELECT id FROM messages WHERE conversation_id = ? ORDER BY id ASC LIMIT 1 OFFSET ?'
+
+# 按会话内序号（ROW_NUMBER，从 1 开始）在服务端一次性删除单条消息
+SQL_DELETE_BY_RN_SQLSERVER = (
+    'DELETE m FROM messages m JOIN ('
+    'SELECT id, ROW_NUMBER() OVER (ORDER BY id) AS rn FROM messages WHERE conversation_id = ?'
+    ') x ON m.id = x.id WHERE x.rn = ? AND m.conversation_id = ?'
+)
+SQL_DELETE_BY_RN_GENERIC = (
+    'DELETE FROM messages WHERE id IN (SELECT id FROM ('
+    'SELECT id, ROW_NUMBER() OVER (ORDER BY id) AS rn FROM messages WHERE conversation_id = ?'
+    ') t WHERE rn = ?)'
+)
+
+
+class _Dialect:
+    """数据库方言（整数常量，连接时判定一次，之后只做整数比较）"""
+    
+    OTHER = 0
+    ACCESS = 1
+    SQLSERVER = 2
+    MYSQL = 3
+    POSTGRES = 4
+    SQLITE = 5
+    
+    # 支持 LIMIT/OFFSET 类分页的方言
+    WINDOWED = frozenset({SQLSERVER, MYSQL, POSTGRES, SQLITE})
+    # 各版本均支持 ROW_NUMBER 窗口函数的方言
+    # （MySQL < 8.0、MariaDB < 10.2、SQLite < 3.25 不支持，不能放进来）
+    ROW_NUMBER = frozenset({SQLSERVER, POSTGRES})
+
+
+# SQL_DBMS_NAME 中的关键字 -> 方言（按顺序匹配）
+_DIALECT_MARKERS = (
+    ('ACCESS', _Dialect.ACCESS),
+    ('SQL SERVER', _Dialect.SQLSERVER),
+    ('MYSQL', _Dialect.MYSQL),
+    ('MARIADB', _Dialect.MYSQL),
+    ('POSTGRE', _Dialect.POSTGRES),
+    ('SQLITE', _Dialect.SQLITE),
+)
+
+
+def _detect_dialect(upper_dbms):
+    """根据 SQL_DBMS_NAME 判断数据库方言"""
+    for marker, dialect in _DIALECT_MARKERS:
+        if marker in upper_dbms:
+            return dialect
+    return _Dialect.OTHER
+
+
+class _PooledConn:
+    """池中的一个连接，以及该连接上每条固定 SQL 的专属游标"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        # 每种语句使用专属游标，连接生命周期内保持，避免反复准备/释放语句
+        self.cursors = {}
+        self.last_used = time.monotonic()
+
+    def cursor(self, sql=None, fast_executemany=False):
+        """获取某条固定 SQL 专用的游标（首次使用时创建）；sql 为 None 时返回新游标
+
+        fast_executemany 仅用于 SQL Server 上的批量插入游标，其他驱动开启后可能出错或更慢
+        """
+        cursor = self.cursors.get(sql) if sql is not None else None
+        if cursor is None:
+            cursor = self.conn.cursor()
+            cursor.arraysize = FETCH_ARRAYSIZE
+            if fast_executemany:
+                # 批量插入时一次性发送全部参数（旧版 pyodbc 不支持，忽略即可）
+                try:
+                    cursor.fast_executemany = True
+                except (AttributeError, pyodbc.Error):
+                    pass
+            if sql is not None:
+                self.cursors[sql] = cursor
+        return cursor
+
+    def fetchone(self, sql, params=()):
+        """用专属游标执行最多返回一行的查询，读完结果集后返回该行（无结果时为 None）
+
+        专属游标随连接复用，不能带着未读结果归还：不支持 MARS 的 SQL Server 连接上
+        有未读完的结果集时，其他语句会报 "Connection is busy"
+        """
+        cursor = self.cursor(sql)
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        return rows[0] if rows else None
+
+    def close(self):
+        try:
+            self.conn.close()
+        except pyodbc.Error:
+            pass
+
+
+class _ConnPool:
+    """按 DSN 复用的线程安全连接池，避免每次操作都重新登录数据源"""
+
+    def __init__(self, conn_str, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE):
+        self.conn_str = conn_str
+        self.max_size = max_size
+        self._idle = queue.LifoQueue()
+        self._size = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        for _ in range(min_size):
+            self._size += 1
+            try:
+                self._idle.put(self._open())
+            except pyodbc.Error:
+                self._size -= 1
+                raise
+
+    def _open(self):
+        # 自动提交：单条语句无需额外的提交往返，多语句流程使用 _transaction() 显式批量提交
+        return _PooledConn(pyodbc.connect(self.conn_str, autocommit=True))
+
+    def _validate(self, pooled):
+        try:
+            cursor = pooled.conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except pyodbc.Error:
+            return False
+
+    def checkout(self):
+        """取出一个可用连接：优先复用空闲连接，未达上限时新建，否则等待归还"""
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_open = self._size < self.max_size
+                    if can_open:
+                        self._size += 1
+                if can_open:
+                    try:
+                        return self._open()
+                    except pyodbc.Error:
+                        with self._lock:
+                            self._size -= 1
+                        raise
+                try:
+                    pooled = self._idle.get(timeout=POOL_CHECKOUT_TIMEOUT)
+                except queue.Empty:
+                    raise pyodbc.Error('HYT00', f'等待连接池空闲连接超时（{POOL_CHECKOUT_TIMEOUT:g} 秒）') from None
+            
+            if time.monotonic() - pooled.last_used <= POOL_VALIDATE_IDLE_SECONDS or self._validate(pooled):
+                return pooled
+            # 连接已失效（如服务端超时断开），丢弃后重新获取
+            pooled.close()
+            with self._lock:
+                self._size -= 1
+
+    def checkin(self, pooled):
+        """归还连接：清理未结束的事务并恢复自动提交；连接池已关闭时直接关闭连接"""
+        try:
+            if not pooled.conn.autocommit:
+                pooled.conn.rollback()
+                pooled.conn.autocommit = True
+        except pyodbc.Error:
+            pooled.close()
+            with self._lock:
+                self._size -= 1
+            return
+        pooled.last_used = time.monotonic()
+        with self._lock:
+            # 与 close() 互斥，保证关闭后不会再有连接放回空闲队列
+            if not self._closed:
+                self._idle.put(pooled)
+                return
+            self._size -= 1
+        pooled.close()
+
+    def close(self):
+        """关闭全部空闲连接；仍被借出的连接在归还时关闭"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            pooled.close()
+            with self._lock:
+                self._size -= 1
+
+    @contextmanager
+    def acquire(self):
+        pooled = self.checkout()
+        try:
+            yield pooled
+        finally:
+            self.checkin(pooled)
+
+
+# 表结构校验结果缓存：同一 DSN + 数据库版本校验通过后，后续启动跳过元数据查询与 ALTER
+SCHEMA_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'aysos', 'schema')
+# 表结构检查逻辑变化时递增，使旧缓存失效
+SCHEMA_CACHE_VERSION = 'v3'
+
+
+def _schema_cache_path(dsn_name, dbms_name, dbms_ver):
+    key = hashlib.sha1(f'{dsn_name}|{dbms_name}|{dbms_ver}|{SCHEMA_CACHE_VERSION}'.encode('utf-8')).hexdigest()
+    return os.path.join(SCHEMA_CACHE_DIR, f'{key}.json')
+
+
+def _load_schema_cache(path):
+    """读取表结构缓存，不存在或损坏时返回 None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else None
+    except (OSError, ValueError):
+        return None
+
+
+def _drop_schema_cache(path):
+    """删除失效的表结构缓存"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _save_schema_cache(path, data):
+    """原子写入表结构缓存，失败时忽略（下次启动重新检查即可）"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError as ex:
+        logger.warning("[数据库] 写入表结构缓存失败: %s", ex)
+
+
+# DSN 连接串 -> 连接池
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(conn_str):
+    """获取（首次时创建）某个 DSN 的连接池"""
+    with _pools_lock:
+        pool = _pools.get(conn_str)
+        if pool is None:
+            pool = _pools[conn_str] = _ConnPool(conn_str)
+        return pool
+
+
+def close_pool(dsn_name):
+    """关闭并移除某个 DSN 的连接池（不再使用该 DSN 时调用，释放连接以及 Access 数据库文件的锁）"""
+    with _pools_lock:
+        pool = _pools.pop(f'DSN={dsn_name};', None)
+    if pool is not None:
+        pool.close()
+
 
 class DatabaseManager:
     def __init__(self, dsn_name):
         self.dsn_name = dsn_name
         self.conn_str = f'DSN={dsn_name};'
+        # 数据库方言，连接后在 _create_tables 中确定
+        self._dialect = _Dialect.OTHER
+        # conversation_id -> (获取时间, ID 列表)，写入/删除该会话消息时失效
+        self._ids_cache = OrderedDict()
+        self._ids_cache_lock = threading.Lock()
         try:
-            self.conn = pyodbc.connect(self.conn_str)
-            self.cursor = self.conn.cursor()
-            self._create_tables()
+            self.pool = _get_pool(self.conn_str)
+            # 管理器不常驻连接：建表时临时借用一个，用完立即归还，其余操作同样按需从池中取用
+            with self.pool.acquire() as pooled:
+                self._create_tables(pooled)
+            self._prepare_statements()
         except pyodbc.Error as ex:
             sqlstate = ex.args[0]
             if sqlstate == '28000':
-                print("认证失败：DSN 中的用户名或密码错误。")
+                logger.error("认证失败：DSN 中的用户名或密码错误。")
             else:
-                print(f"数据库连接失败：{ex}")
+                logger.error("数据库连接失败：%s", ex)
             raise  # 重新抛出异常，让调用者处理
     
     @staticmethod
@@ -40,24 +383,44 @@ class DatabaseManager:
         except Exception as ex:
             return False, f"连接失败：{str(ex)}"
     
-    def _create_tables(self):
-        """初始化数据表结构，并确保字段类型满足需求"""
+    def _create_tables(self, pooled):
+        """初始化数据表结构，并确保字段类型满足需求（使用调用方借出的连接 pooled）"""
+        conn = pooled.conn
+        cursor = pooled.cursor()
         dbms_name = ""
         try:
-            dbms_name = (self.conn.getinfo(pyodbc.SQL_DBMS_NAME) or "").strip()
+            dbms_name = (conn.getinfo(pyodbc.SQL_DBMS_NAME) or "").strip()
             if dbms_name:
-                print(f"[数据库] 当前数据源: {dbms_name}")
+                logger.info("[数据库] 当前数据源: %s", dbms_name)
         except Exception as exc:
-            print(f"[数据库] 无法获取数据源类型: {exc}")
+            logger.warning("[数据库] 无法获取数据源类型: %s", exc)
         upper_dbms = dbms_name.upper()
+        self._dialect = _detect_dialect(upper_dbms)
+
+        dbms_ver = ""
+        try:
+            dbms_ver = (conn.getinfo(pyodbc.SQL_DBMS_VER) or "").strip()
+        except Exception:
+            pass
+        cache_path = _schema_cache_path(self.dsn_name, dbms_name, dbms_ver)
+        cached = _load_schema_cache(cache_path)
+        if cached and cached.get('schema_ok'):
+            # 缓存只用来跳过耗时的 DDL 与元数据检查，表是否存在每次都确认（表可能被删除或数据库被重建）
+            if self._tables_exist(cursor):
+                logger.debug("[数据库] 表结构已校验（缓存），content 类型: %s", cached.get('content_type'))
+                return
+            logger.info("[数据库] 表结构缓存已失效，重新检查")
+            _drop_schema_cache(cache_path)
+        schema_ok = False
+        content_type = None
 
         # SQL Server 专用的建表语句在其他数据库会失败，故做防护
         def execute_safe(sql: str):
             try:
-                self.cursor.execute(sql)
+                cursor.execute(sql)
             except pyodbc.Error as ex:
-                if 'SQL SERVER' in upper_dbms:
-                    print(f"[数据库] SQL Server 语句执行失败: {ex}")
+                if self._dialect == _Dialect.SQLSERVER:
+                    logger.warning("[数据库] SQL Server 语句执行失败: %s", ex)
 
         # 兼容旧版本：尝试执行 SQL Server 风格的建表/加列语句
         execute_safe('''
@@ -85,14 +448,14 @@ class DatabaseManager:
         ''')
 
         # 针对非 SQL Server 数据库，使用 ODBC 元数据判断表/列是否存在
+        # 一次 columns() 调用取回全部列信息，表是否存在与 content 列类型都从中判断
+        by_table = None
         try:
-            existing_tables = set()
-            for tbl in self.cursor.tables(tableType='TABLE'):
-                if tbl.table_name:
-                    existing_tables.add(tbl.table_name.lower())
+            by_table = self._load_columns_by_table(cursor)
+            existing_tables = set(by_table)
 
             if 'conversations' not in existing_tables:
-                if 'ACCESS' in upper_dbms:
+                if self._dialect == _Dialect.ACCESS:
                     create_sql = '''CREATE TABLE conversations (
                         id TEXT(36) PRIMARY KEY,
                         title TEXT(255),
@@ -104,11 +467,11 @@ class DatabaseManager:
                         title VARCHAR(255) NOT NULL,
                         created_at DATETIME
                     )'''
-                print("[数据库] 创建 conversations 表")
-                self.cursor.execute(create_sql)
+                logger.info("[数据库] 创建 conversations 表")
+                cursor.execute(create_sql)
 
             if 'messages' not in existing_tables:
-                if 'ACCESS' in upper_dbms:
+                if self._dialect == _Dialect.ACCESS:
                     create_sql = '''CREATE TABLE messages (
                         id AUTOINCREMENT PRIMARY KEY,
                         conversation_id TEXT(36),
@@ -124,33 +487,39 @@ class DatabaseManager:
                         content TEXT,
                         files TEXT
                     )'''
-                print("[数据库] 创建 messages 表")
-                self.cursor.execute(create_sql)
+                logger.info("[数据库] 创建 messages 表")
+                cursor.execute(create_sql)
+                # 新建的表需要重新读取列信息
+                by_table = None
 
         except pyodbc.Error as ex:
-            print(f"[数据库] 检查/创建表结构时出错: {ex}")
+            logger.warning("[数据库] 检查/创建表结构时出错: %s", ex)
+
+        # 历史读取/按序号删除都按 conversation_id 过滤并按 id 排序，会话列表按 created_at 倒序
+        self._create_index(cursor, 'idx_msg_conv_id', 'messages', 'conversation_id, id')
+        self._create_index(cursor, 'idx_conv_created_at', 'conversations', 'created_at DESC')
 
         # 确保 messages.content 字段支持长文本
         try:
             content_column = None
             try:
-                for col in self.cursor.columns(table='messages'):
-                    if col.column_name and col.column_name.lower() == 'content':
-                        content_column = col
-                        break
+                if by_table is None:
+                    by_table = self._load_columns_by_table(cursor)
+                content_column = by_table.get('messages', {}).get('content')
             except pyodbc.Error as ex:
-                print(f"[数据库] 无法获取列信息: {ex}")
+                logger.warning("[数据库] 无法获取列信息: %s", ex)
 
             if content_column:
                 type_name = (content_column.type_name or '').upper()
+                content_type = type_name
                 column_size = content_column.column_size
-                print(f"[数据库检查] messages.content 类型: {type_name}({column_size if column_size else 'MAX'})")
+                logger.debug("[数据库检查] messages.content 类型: %s(%s)", type_name, column_size if column_size else 'MAX')
 
                 needs_upgrade = False
                 if type_name in {'VARCHAR', 'NVARCHAR', 'CHAR', 'NCHAR', 'VARWCHAR', 'LONGVARCHAR', 'TEXT'}:
                     if column_size is None:
                         # TEXT 但大小未知，保守处理：Access 的 LONGTEXT 会返回 None，此时无需升级
-                        needs_upgrade = type_name not in {'TEXT'} or ('ACCESS' not in upper_dbms)
+                        needs_upgrade = type_name not in {'TEXT'} or self._dialect != _Dialect.ACCESS
                     else:
                         needs_upgrade = column_size < 2000
                 elif type_name in {'MEMO', 'LONGTEXT', 'NTEXT'}:
@@ -159,55 +528,156 @@ class DatabaseManager:
                     needs_upgrade = True
 
                 if needs_upgrade:
-                    if 'ACCESS' in upper_dbms:
+                    if self._dialect == _Dialect.ACCESS:
                         alter_sql = 'ALTER TABLE messages ALTER COLUMN content LONGTEXT'
-                    elif 'MYSQL' in upper_dbms:
+                    elif self._dialect == _Dialect.MYSQL:
                         alter_sql = 'ALTER TABLE messages MODIFY content LONGTEXT'
-                    elif 'SQL SERVER' in upper_dbms or 'MICROSOFT SQL SERVER' in upper_dbms:
+                    elif self._dialect == _Dialect.SQLSERVER:
                         alter_sql = 'ALTER TABLE messages ALTER COLUMN content NVARCHAR(MAX)'
-                    elif 'POSTGRE' in upper_dbms:
+                    elif self._dialect == _Dialect.POSTGRES:
                         alter_sql = 'ALTER TABLE messages ALTER COLUMN content TYPE TEXT'
                     else:
                         alter_sql = 'ALTER TABLE messages ALTER COLUMN content TEXT'
 
-                    print(f"⚠️ content 字段容量不足，正在执行: {alter_sql}")
+                    logger.warning("[数据库] content 字段容量不足，正在执行: %s", alter_sql)
                     try:
-                        self.cursor.execute(alter_sql)
-                        print("[OK] content 字段已升级为长文本类型")
+                        cursor.execute(alter_sql)
+                        logger.info("[数据库] content 字段已升级为长文本类型")
+                        schema_ok = True
                     except pyodbc.Error as ex:
-                        print(f"❌ content 字段升级失败: {ex}")
+                        logger.error("[数据库] content 字段升级失败: %s", ex)
                 else:
-                    print("[OK] content 字段类型符合要求")
+                    logger.debug("[数据库] content 字段类型符合要求")
+                    schema_ok = True
             else:
-                print("⚠️ 未找到 messages.content 列的信息")
+                logger.warning("[数据库] 未找到 messages.content 列的信息")
         except Exception as ex:
-            print(f"⚠️ 检查/升级 content 字段发生异常: {ex}")
+            logger.warning("[数据库] 检查/升级 content 字段发生异常: %s", ex)
+
+        # 仅在表结构确认无误时缓存，失败或未知的情况下次启动继续检查
+        if schema_ok:
+            _save_schema_cache(cache_path, {'schema_ok': True, 'content_type': content_type})
+
+    def _prepare_statements(self):
+        """按方言预先生成各方法使用的 SQL 文本，热点方法中不再分支拼接"""
+        if self._dialect in (_Dialect.SQLSERVER, _Dialect.ACCESS):
+            self._sql_latest_conv = SQL_LATEST_CONV_TOP
+        elif self._dialect in _Dialect.WINDOWED:
+            self._sql_latest_conv = SQL_LATEST_CONV_LIMIT
+        else:
+            self._sql_latest_conv = SQL_LATEST_CONV_PLAIN
+        
+        self._sql_delete_by_rn = SQL_DELETE_BY_RN_SQLSERVER if self._dialect == _Dialect.SQLSERVER else SQL_DELETE_BY_RN_GENERIC
+        
+        if self._dialect == _Dialect.SQLSERVER:
+            self._sql_nth_id = SQL_NTH_ID_OFFSET_FETCH
+        elif self._dialect in _Dialect.WINDOWED:
+            self._sql_nth_id = SQL_NTH_ID_LIMIT
+        else:
+            self._sql_nth_id = None
+
+    @staticmethod
+    def _tables_exist(cursor):
+        """用不返回任何行的查询确认两张表都存在"""
+        try:
+            for table in ('conversations', 'messages'):
+                cursor.execute(f'SELECT 1 FROM {table} WHERE 1=0')
+                cursor.fetchall()
+            return True
+        except pyodbc.Error:
+            return False
+
+    def _load_columns_by_table(self, cursor):
+        """一次性读取数据源的全部列元数据，返回 {表名: {列名: 列信息}}（均为小写）"""
+        by_table = {}
+        for col in cursor.columns():
+            if col.table_name and col.column_name:
+                by_table.setdefault(col.table_name.lower(), {})[col.column_name.lower()] = col
+        return by_table
 
-        self.conn.commit()
+    def _create_index(self, cursor, name, table, columns):
+        """创建索引（已存在时忽略）"""
+        if self._dialect == _Dialect.SQLSERVER:
+            sql = (f"IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = N'{name}' AND object_id = Object_ID(N'{table}')) "
+                   f"CREATE INDEX {name} ON {table} ({columns})")
+        elif self._dialect in (_Dialect.POSTGRES, _Dialect.SQLITE):
+            sql = f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})'
+        else:
+            # Access / MySQL 不支持 IF NOT EXISTS，重复创建的报错直接忽略
+            sql = f'CREATE INDEX {name} ON {table} ({columns})'
+        try:
+            cursor.execute(sql)
+        except pyodbc.Error as ex:
+            if self._dialect == _Dialect.SQLSERVER:
+                logger.warning("[数据库] 创建索引 %s 失败: %s", name, ex)
+
+    @staticmethod
+    @contextmanager
+    def _transaction(pooled):
+        """在块内临时关闭自动提交，结束时统一提交，异常时回滚"""
+        conn = pooled.conn
+        conn.autocommit = False
+        try:
+            yield
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.autocommit = True
 
     def create_new_conversation(self, title="新对话"):
-        new_id = str(uuid.uuid4())
-        self.cursor.execute('INSERT INTO conversations (id, title) VALUES (?, ?)', (new_id, title))
-        self.conn.commit()
-        return new_id
+        return self.create_new_conversations([title])[0]
+
+    def create_new_conversations(self, titles):
+        """批量创建对话（ID 在本地生成，一次往返、一次提交），返回新对话 ID 列表"""
+        uuid4 = uuid.uuid4
+        ids = [str(uuid4()) for _ in titles]
+        if not ids:
+            return ids
+        with self.pool.acquire() as pooled, self._transaction(pooled):
+            cursor = pooled.cursor(SQL_INSERT_CONVERSATION, fast_executemany=self._dialect == _Dialect.SQLSERVER)
+            cursor.executemany(SQL_INSERT_CONVERSATION, list(zip(ids, titles)))
+        return ids
     
     def update_conversation_title(self, conversation_id, new_title):
-        self.cursor.execute('UPDATE conversations SET title = ? WHERE id = ?', (new_title, conversation_id))
-        self.conn.commit()
+        with self.pool.acquire() as pooled:
+            pooled.cursor(SQL_UPDATE_CONV_TITLE).execute(SQL_UPDATE_CONV_TITLE, (new_title, conversation_id))
 
     def delete_conversation(self, conversation_id):
         # ON DELETE CASCADE 会自动删除messages表中所有相关的记录
-        self.cursor.execute('DELETE FROM conversations WHERE id = ?', (conversation_id,))
-        self.conn.commit()
+        with self.pool.acquire() as pooled:
+            pooled.cursor(SQL_DELETE_CONVERSATION).execute(SQL_DELETE_CONVERSATION, (conversation_id,))
+        self._invalidate_ids(conversation_id)
 
     def get_all_conversations(self):
-        self.cursor.execute('SELECT id, title, created_at FROM conversations ORDER BY created_at DESC')
-        return self.cursor.fetchall()
+        with self.pool.acquire() as pooled:
+            cursor = pooled.cursor(SQL_SELECT_ALL_CONVS)
+            cursor.execute(SQL_SELECT_ALL_CONVS)
+            return cursor.fetchall()
+    
+    def get_all_conversations_fast(self):
+        """获取所有对话，按列返回 (ids, titles, created_ats) 三个并行元组，供侧边栏等只需渲染列表的场景使用"""
+        with self.pool.acquire() as pooled:
+            cursor = pooled.cursor(SQL_SELECT_ALL_CONVS)
+            cursor.execute(SQL_SELECT_ALL_CONVS)
+            rows = cursor.fetchall()
+        if not rows:
+            return (), (), ()
+        ids, titles, created_ats = zip(*rows)
+        return ids, titles, created_ats
     
     def get_latest_conversation(self):
         """获取最新的对话"""
-        self.cursor.execute('SELECT id, title, created_at FROM conversations ORDER BY created_at DESC')
-        result = self.cursor.fetchone()
+        with self.pool.acquire() as pooled:
+            if self._sql_latest_conv is SQL_LATEST_CONV_PLAIN:
+                # 无法在服务端限制行数：用临时游标只取首行，关闭游标丢弃其余结果
+                cursor = pooled.cursor()
+                cursor.execute(SQL_LATEST_CONV_PLAIN)
+                result = cursor.fetchone()
+                cursor.close()
+            else:
+                result = pooled.fetchone(self._sql_latest_conv)
         return result if result else None
 
     def add_message(self, conversation_id, role, content, file_paths=None):
@@ -219,123 +689,313 @@ class DatabaseManager:
             content: 消息内容
             file_paths: 附件文件路径列表（可选）
         """
-        import json
+        self.add_messages(conversation_id, [(role, content, file_paths)])
+
+    def add_messages(self, conversation_id, entries):
+        """批量添加消息到数据库（一次往返、一次提交）
         
-        # 将文件路径列表转换为JSON字符串
-        files_json = json.dumps(file_paths, ensure_ascii=False) if file_paths else None
+        Args:
+            conversation_id: 对话ID
+            entries: (role, content, file_paths) 元组列表，file_paths 可为 None
+        """
+        json_dumps = _json_dumps
+        rows = [
+            (conversation_id, role, content, json_dumps(file_paths) if file_paths else None)
+            for role, content, file_paths in entries
+        ]
+        if not rows:
+            return
         
-        self.cursor.execute(
-            'INSERT INTO messages (conversation_id, role, content, files) VALUES (?, ?, ?, ?)', 
-            (conversation_id, role, content, files_json)
-        )
-        self.conn.commit()
-
-    def get_history(self, conversation_id):
-        if not conversation_id:
-            return []
-        import json
+        with self.pool.acquire() as pooled, self._transaction(pooled):
+            cursor = pooled.cursor(SQL_INSERT_MESSAGE, fast_executemany=self._dialect == _Dialect.SQLSERVER)
+            cursor.executemany(SQL_INSERT_MESSAGE, rows)
+        self._invalidate_ids(conversation_id)
+
+    def _history_query(self, conversation_id, role, limit, offset):
+        """构造历史查询，尽量把角色过滤与分页下推到数据库
+
+        Returns:
+            (sql, params, 是否可缓存游标, 需在客户端完成的切片 slice 或 None)
+        """
+        params = [conversation_id]
+        if role is None:
+            sql = SQL_SELECT_HISTORY_BASE
+        else:
+            sql = SQL_SELECT_HISTORY_BASE + ' AND role = ?'
+            params.append(role)
+        sql += ' ORDER BY id ASC'
+        if limit is None and not offset:
+            return sql, params, True, None
+        
+        dialect = self._dialect
+        if dialect == _Dialect.SQLSERVER:
+            sql += ' OFFSET ? ROWS'
+            params.append(offset)
+            if limit is not None:
+                sql += ' FETCH NEXT ? ROWS ONLY'
+                params.append(limit)
+            return sql, params, True, None
+        if dialect in _Dialect.WINDOWED:
+            if limit is not None:
+                sql += ' LIMIT ? OFFSET ?'
+                params += [limit, offset]
+            elif dialect == _Dialect.POSTGRES:
+                sql += ' OFFSET ?'
+                params.append(offset)
+            elif dialect == _Dialect.MYSQL:
+                # MySQL 的 OFFSET 必须搭配 LIMIT
+                sql += ' LIMIT 18446744073709551615 OFFSET ?'
+                params.append(offset)
+            else:
+                sql += ' LIMIT -1 OFFSET ?'
+                params.append(offset)
+            return sql, params, True, None
         
-        self.cursor.execute(
-            'SELECT role, content, files FROM messages WHERE conversation_id = ? ORDER BY id ASC', 
-            (conversation_id,)
-        )
+        # Access 不支持 OFFSET，只能用 TOP 限制上界，起始偏移在客户端跳过；未知数据库全部在客户端切片
+        window = slice(offset, None if limit is None else offset + limit)
+        if dialect == _Dialect.ACCESS and limit is not None:
+            sql = sql.replace('SELECT ', f'SELECT TOP {int(offset) + int(limit)} ', 1)
+            return sql, params, False, window
+        return sql, params, True, window
+
+    def get_history(self, conversation_id, role=None, limit=None, offset=0):
+        """获取对话历史
+        
+        Args:
+            conversation_id: 对话ID
+            role: 仅返回该角色的消息（可选）
+            limit: 最多返回的消息条数（可选）
+            offset: 跳过前 offset 条消息
+        """
+        if not conversation_id or limit == 0:
+            return []
         
+        sql, params, cacheable, window = self._history_query(conversation_id, role, limit, offset)
         messages = []
-        for row in self.cursor.fetchall():
-            message = {'role': row.role, 'content': row.content}
-            # 【新增】解析附件信息
-            if row.files:
-                try:
-                    message['files'] = json.loads(row.files)
-                except:
-                    pass
-            messages.append(message)
+        # 热循环中使用局部变量，省去每行的全局/属性查找
+        messages_append = messages.append
+        json_loads = _json_loads
+        with self.pool.acquire() as pooled:
+            cursor = pooled.cursor(sql if cacheable else None)
+            cursor.execute(sql, params)
+            fetchmany = cursor.fetchmany
+            arraysize = cursor.arraysize
+            
+            while True:
+                rows = fetchmany(arraysize)
+                if not rows:
+                    break
+                for row in rows:
+                    message = {'role': row.role, 'content': row.content}
+                    # 【新增】解析附件信息（绝大多数消息无附件，直接跳过）
+                    files = row.files
+                    if files:
+                        try:
+                            message['files'] = json_loads(files)
+                        except _JSON_DECODE_ERRORS:
+                            pass
+                    messages_append(message)
         
+        if window is not None:
+            return messages[window]
         return messages
 
-    def delete_messages_from_index(self, conversation_id, start_index):
-        """删除从指定索引开始的所有消息（优化兼容性 - 两步法）"""
-        try:
-            # 步骤 1: 获取所有消息的 ID 列表（按插入顺序排序）
-            self.cursor.execute(
-                'SELECT id FROM messages WHERE conversation_id = ? ORDER BY id ASC', 
-                (conversation_id,)
-            )
-            all_ids = [row[0] for row in self.cursor.fetchall()]
-            
-            # 检查索引是否有效
-            if start_index >= len(all_ids):
-                print(f"[数据库] 起始索引 {start_index} 超出消息总数 {len(all_ids)}，无需删除")
-                return
-            
-            if start_index < 0:
-                print(f"[数据库] 起始索引 {start_index} 无效（不能为负数）")
-                return
-            
-            # 获取要删除的第一条消息的数据库 ID
-            start_db_id = all_ids[start_index]
+    def _delete_by_row_number(self, pooled, conversation_id, row_number):
+        """在服务端按会话内序号（从 1 开始）删除单条消息（单条语句），返回影响行数"""
+        sql = self._sql_delete_by_rn
+        if self._dialect == _Dialect.SQLSERVER:
+            params = (conversation_id, row_number, conversation_id)
+        else:
+            params = (conversation_id, row_number)
+        cursor = pooled.cursor(sql)
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+    def _nth_message_id(self, pooled, conversation_id, index):
+        """获取会话中第 index 条（从 0 开始）消息的数据库 ID，不存在时返回 None
+
+        支持 OFFSET 的数据库由服务端直接返回该 ID；Access 不支持 OFFSET，用 TOP 只取前 index+1 行；
+        其他未知数据库退回读取全部 ID
+        """
+        if self._sql_nth_id is not None:
+            row = pooled.fetchone(self._sql_nth_id, (conversation_id, index))
+            return row[0] if row else None
+        
+        if self._dialect == _Dialect.ACCESS:
+            # Access 的 TOP 不接受参数占位符，index 已保证为非负整数
+            # 语句文本随 index 变化，不放入专属游标缓存
+            sql = f'SELECT TOP {int(index) + 1} id FROM messages WHERE conversation_id = ? ORDER BY id ASC'
+            cursor = pooled.cursor()
+            cursor.execute(sql, (conversation_id,))
+            rows = cursor.fetchall()
+            if index >= len(rows):
+                return None
+            return rows[index][0]
+        
+        ids = self._fetch_ids(pooled, conversation_id)
+        return ids[index] if index < len(ids) else None
+
+    def _fetch_ids(self, pooled, conversation_id, max_age=IDS_CACHE_MAX_AGE):
+        """按插入顺序获取会话全部消息的数据库 ID（max_age 秒内重复获取直接使用缓存，结果不可修改）"""
+        now = time.monotonic()
+        with self._ids_cache_lock:
+            cached = self._ids_cache.get(conversation_id)
+            if cached is not None and now - cached[0] <= max_age:
+                self._ids_cache.move_to_end(conversation_id)
+                return cached[1]
+        
+        cursor = pooled.cursor(SQL_SELECT_MESSAGE_IDS)
+        cursor.execute(SQL_SELECT_MESSAGE_IDS, (conversation_id,))
+        ids = [row[0] for row in cursor.fetchall()]
+        
+        with self._ids_cache_lock:
+            self._ids_cache[conversation_id] = (now, ids)
+            self._ids_cache.move_to_end(conversation_id)
+            while len(self._ids_cache) > IDS_CACHE_SIZE:
+                self._ids_cache.popitem(last=False)
+        return ids
+
+    def _invalidate_ids(self, conversation_id):
+        """会话消息发生变化后丢弃其 ID 缓存"""
+        with self._ids_cache_lock:
+            self._ids_cache.pop(conversation_id, None)
+
+    def _delete_ids(self, pooled, db_ids):
+        """按数据库 ID 删除消息：单条直接按主键删除，多条分块使用 IN (?, ...)，返回影响行数"""
+        if len(db_ids) == 1:
+            cursor = pooled.cursor(SQL_DELETE_MSG_BY_ID)
+            cursor.execute(SQL_DELETE_MSG_BY_ID, (db_ids[0],))
+            return cursor.rowcount
+        
+        affected_rows = 0
+        # IN 列表长度不固定，使用临时游标，不放入专属游标缓存
+        cursor = pooled.cursor()
+        for start in range(0, len(db_ids), DELETE_IN_CHUNK_SIZE):
+            chunk = db_ids[start:start + DELETE_IN_CHUNK_SIZE]
+            cursor.execute(f"DELETE FROM messages WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            affected_rows += cursor.rowcount
+        return affected_rows
+
+    def _delete_from_index(self, pooled, conversation_id, start_index):
+        """删除从 start_index 开始的消息，返回影响行数；没有可删除的消息时返回 None
+
+        先让服务端给出起点 ID，再按 (conversation_id, id) 索引做范围删除，两次往返、传输量恒定
+        """
+        with self._transaction(pooled):
+            # 步骤 1: 获取要删除的第一条消息的数据库 ID
+            start_db_id = self._nth_message_id(pooled, conversation_id, start_index)
+            if start_db_id is None:
+                return None
             
-            print(f"[数据库] 准备删除对话 {conversation_id} 从索引 {start_index}（ID={start_db_id}）开始的 {len(all_ids) - start_index} 条消息")
+            logger.debug("[数据库] 准备删除对话 %s 从索引 %d（ID=%s）开始的消息", conversation_id, start_index, start_db_id)
             
             # 步骤 2: 删除 ID 大于等于该 ID 的所有消息
-            self.cursor.execute(
-                'DELETE FROM messages WHERE conversation_id = ? AND id >= ?',
-                (conversation_id, start_db_id)
-            )
-            
-            affected_rows = self.cursor.rowcount
-            self.conn.commit()
+            cursor = pooled.cursor(SQL_DELETE_MSGS_GE_ID)
+            cursor.execute(SQL_DELETE_MSGS_GE_ID, (conversation_id, start_db_id))
+            return cursor.rowcount
+
+    def delete_messages_from_index(self, conversation_id, start_index):
+        """删除从指定索引开始的所有消息（定位起点 ID + 范围删除，在同一事务中完成）"""
+        if start_index < 0:
+            logger.warning("[数据库] 起始索引 %d 无效（不能为负数）", start_index)
+            return
+        
+        try:
+            with self.pool.acquire() as pooled:
+                affected_rows = self._delete_from_index(pooled, conversation_id, start_index)
+            if affected_rows is None:
+                logger.debug("[数据库] 起始索引 %d 超出消息总数，无需删除", start_index)
+                return
             
-            print(f"[数据库] ✅ 已删除 {affected_rows} 条消息（从索引 {start_index} 开始）")
+            logger.debug("[数据库] 已删除 %d 条消息（从索引 %d 开始）", affected_rows, start_index)
             
         except Exception as e:
-            print(f"[数据库] ❌ 删除消息失败: {e}")
-            import traceback
-            traceback.print_exc()
-            self.conn.rollback()
+            logger.exception("[数据库] 删除消息失败: %s", e)
+        finally:
+            self._invalidate_ids(conversation_id)
 
     def delete_message_by_index(self, conversation_id, message_index):
-        """删除指定索引的单条消息（优化兼容性 - 两步法）"""
+        """删除指定索引的单条消息
+
+        SQL Server / PostgreSQL 用 ROW_NUMBER 在服务端一次删除；其他数据库先定位 ID 再按主键删除
+        """
+        logger.debug("[数据库] 删除消息: 对话ID=%s, 索引=%d", conversation_id, message_index)
+        if message_index < 0:
+            logger.warning("[数据库] 索引 %d 无效", message_index)
+            return
+        
         try:
-            print(f"[数据库] 删除消息: 对话ID={conversation_id}, 索引={message_index}")
-            
-            # 步骤 1: 获取所有消息的 ID 列表（按插入顺序排序）
-            self.cursor.execute(
-                'SELECT id FROM messages WHERE conversation_id = ? ORDER BY id ASC', 
-                (conversation_id,)
-            )
-            all_ids = [row[0] for row in self.cursor.fetchall()]
-            
-            print(f"[数据库] 删除前消息总数: {len(all_ids)}")
-            
-            # 检查索引是否有效
-            if message_index >= len(all_ids) or message_index < 0:
-                print(f"[数据库] ❌ 索引 {message_index} 无效，消息总数 {len(all_ids)}")
-                return
-            
-            # 获取要删除的消息的数据库 ID
-            db_id_to_delete = all_ids[message_index]
-            
-            print(f"[数据库] 准备删除消息 ID={db_id_to_delete}（索引={message_index}）")
-            
-            # 步骤 2: 根据唯一 ID 进行删除
-            self.cursor.execute('DELETE FROM messages WHERE id = ?', (db_id_to_delete,))
-            
-            affected_rows = self.cursor.rowcount
-            self.conn.commit()
+            with self.pool.acquire() as pooled:
+                if self._dialect in _Dialect.ROW_NUMBER:
+                    # ROW_NUMBER 从 1 开始
+                    affected_rows = self._delete_by_row_number(pooled, conversation_id, message_index + 1)
+                else:
+                    # 步骤 1: 获取要删除的消息的数据库 ID
+                    db_id_to_delete = self._nth_message_id(pooled, conversation_id, message_index)
+                    if db_id_to_delete is None:
+                        logger.warning("[数据库] 索引 %d 无效，超出消息总数", message_index)
+                        return
+                    
+                    logger.debug("[数据库] 准备删除消息 ID=%s（索引=%d）", db_id_to_delete, message_index)
+                    
+                    # 步骤 2: 根据唯一 ID 进行删除
+                    affected_rows = self._delete_ids(pooled, [db_id_to_delete])
             
-            print(f"[数据库] 删除操作影响行数: {affected_rows}")
+            logger.debug("[数据库] 删除操作影响行数: %d", affected_rows)
             
             if affected_rows > 0:
-                print(f"[数据库] ✅ 消息（索引 {message_index}）已成功删除")
+                logger.debug("[数据库] 消息（索引 %d）已成功删除", message_index)
             else:
-                print(f"[数据库] ⚠️ 消息（ID {db_id_to_delete}）删除失败，未影响任何行")
+                logger.warning("[数据库] 消息（索引 %d）删除失败，未影响任何行", message_index)
             
         except Exception as e:
-            print(f"[数据库] ❌ 删除单条消息失败: {e}")
-            import traceback
-            traceback.print_exc()
-            self.conn.rollback()
+            logger.exception("[数据库] 删除单条消息失败: %s", e)
+        finally:
+            self._invalidate_ids(conversation_id)
+
+    def clear_messages(self, conversation_id):
+        """删除对话的全部消息但保留对话本身，返回影响行数"""
+        try:
+            with self.pool.acquire() as pooled, self._transaction(pooled):
+                cursor = pooled.cursor(SQL_CLEAR_MESSAGES)
+                cursor.execute(SQL_CLEAR_MESSAGES, (conversation_id,))
+                affected_rows = cursor.rowcount
+            logger.debug("[数据库] 已清空对话 %s 的 %d 条消息", conversation_id, affected_rows)
+            return affected_rows
+        finally:
+            self._invalidate_ids(conversation_id)
+
+    def delete_messages_by_indices(self, conversation_id, indices):
+        """一次删除多条指定索引的消息（只读取一次 ID 列表，按 IN 分块删除，单次提交）
+        
+        Args:
+            conversation_id: 对话ID
+            indices: 要删除的消息索引列表（从 0 开始，越界的索引会被忽略）
+        
+        Returns:
+            实际删除的消息条数
+        """
+        if not indices:
+            return 0
+        
+        try:
+            with self.pool.acquire() as pooled, self._transaction(pooled):
+                ids = self._fetch_ids(pooled, conversation_id)
+                count = len(ids)
+                to_delete = [ids[i] for i in sorted(set(indices)) if 0 <= i < count]
+                if not to_delete:
+                    logger.warning("[数据库] 索引 %s 均无效，消息总数 %d", indices, count)
+                    return 0
+                affected_rows = self._delete_ids(pooled, to_delete)
+            logger.debug("[数据库] 已批量删除 %d 条消息", affected_rows)
+            return affected_rows
+        except Exception as e:
+            logger.exception("[数据库] 批量删除消息失败: %s", e)
+            return 0
+        finally:
+            self._invalidate_ids(conversation_id)
 
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        """释放管理器状态；连接均已归还并留在池中，同一 DSN 重新创建管理器时无需再次登录"""
+        with self._ids_cache_lock:
+            self._ids_cache.clear()
\ No newline at end of file
@@ -1,18 +1,24 @@
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, 
                             QMessageBox, QWidget, QListWidget, QListWidgetItem, QCheckBox, 
-                            QFileDialog, QFrame, QSizePolicy, QSpacerItem, QScrollArea, QApplication)
-from PyQt6.QtCore import Qt, QTimer, QSize, QRectF, pyqtSignal
-from PyQt6.QtGui import QPixmap, QPainter, QColor
+                            QFileDialog, QFrame, QSizePolicy, QSpacerItem, QScrollArea,
+                            QStackedWidget, QSpinBox, QPlainTextEdit)
+from PyQt6.QtCore import (Qt, QTimer, QSize, QRectF, QSignalBlocker, QObject, QRunnable,
+                          QThreadPool, pyqtSignal, pyqtSlot)
+from PyQt6.QtGui import QPixmap, QPainter, QColor, QImage, QImageReader
 import os
 import json
+import struct
 import datetime
+import logging
+from functools import lru_cache, partial
+from types import MappingProxyType
 
+from chat_area import CollapsibleBubbleLabel
 from api_config import (
     load_api_config, 
     update_api_config, 
     mask_sensitive_value, 
     get_current_provider_name,
-    get_current_provider_config,
     set_gemini_api_key
 )
 
@@ -23,7 +29,436 @@ try:
 except ImportError:
     PIL_AVAILABLE = False
 
-class ChatConfigDialog(QDialog):
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=32)
+def _mask(value):
+    """掩码结果只取决于原值，按原值缓存；保存新凭据时清空，避免旧密钥常驻缓存"""
+    return mask_sensitive_value(value)
+
+
+# 主题切换后重设样式表的合并延迟（毫秒），连续切换只按最终状态重设一次
+THEME_RESTYLE_DELAY_MS = 80
+# 界面设置（折叠阈值、预览长度）写盘的合并延迟（毫秒），按住微调按钮时只写最后一次
+SAVE_UI_SETTINGS_DELAY_MS = 250
+# 搜索框边输入边搜索的防抖间隔（毫秒），连续输入只在停顿后搜索一次
+SEARCH_DEBOUNCE_MS = 150
+
+# config.json 解析结果缓存：文件 (mtime_ns, size) 未变时直接复用，免去重复打开与解析
+_CONFIG_CACHE = {'stamp': None, 'data': None}
+
+# 背景文件支持的扩展名及文件选择框过滤器
+_BG_IMAGE_EXTS = frozenset(('.png', '.jpg', '.jpeg'))
+_BG_VIDEO_EXTS = frozenset(('.mp4', '.avi', '.mov', '.mkv'))
+_BG_FILE_FILTER = (
+    "背景文件 (*.png *.jpg *.jpeg *.mp4 *.avi *.mov *.mkv);;"
+    "图片文件 (*.png *.jpg *.jpeg);;"
+    "视频文件 (*.mp4 *.avi *.mov *.mkv)"
+)
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# JPEG 帧头标记（SOF0-SOF15，除去 DHT/JPG/DAC 三个非帧头标记）
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _read_image_dims(path):
+    """只读文件头获取 PNG/JPEG 的 (宽, 高)，不解码像素；无法识别时返回 None"""
+    with open(path, 'rb') as f:
+        head = f.read(24)
+        if head.startswith(_PNG_SIGNATURE) and head[12:16] == b'IHDR':
+            return struct.unpack('>II', head[16:24])
+        if not head.startswith(b'\xff\xd8'):
+            return None
+        # 逐段跳过 JPEG 标记段，直到遇到帧头
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            if marker[1] == 0xFF:
+                # 填充字节，回退一位继续寻找标记
+                f.seek(-1, os.SEEK_CUR)
+                continue
+            if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+                # 无长度字段的独立标记
+                continue
+            length_bytes = f.read(2)
+            if len(length_bytes) < 2:
+                return None
+            length = struct.unpack('>H', length_bytes)[0]
+            if length < 2:
+                return None
+            if marker[1] in _JPEG_SOF_MARKERS:
+                segment = f.read(5)
+                if len(segment) < 5:
+                    return None
+                height, width = struct.unpack('>HH', segment[1:5])
+                return width, height
+            f.seek(length - 2, os.SEEK_CUR)
+
+# 强调色按钮配色：强调名 -> {bg, hover, text}
+_DARK_ACCENTS = MappingProxyType({
+    "success": MappingProxyType({"bg": "#2f2f2f", "hover": "#393939", "text": "#f5f5f5"}),
+    "info": MappingProxyType({"bg": "#2f2f2f", "hover": "#3b3b3b", "text": "#f5f5f5"}),
+    "warning": MappingProxyType({"bg": "#34302a", "hover": "#3f3932", "text": "#f5f5f5"}),
+    "danger": MappingProxyType({"bg": "#3a2b2b", "hover": "#453333", "text": "#f5f5f5"}),
+})
+
+_LIGHT_ACCENTS = MappingProxyType({
+    "success": MappingProxyType({"bg": "#4CAF50", "hover": "#45a049", "text": "#ffffff"}),
+    "info": MappingProxyType({"bg": "#2196F3", "hover": "#1976D2", "text": "#ffffff"}),
+    "warning": MappingProxyType({"bg": "#FF9800", "hover": "#F57C00", "text": "#ffffff"}),
+    "danger": MappingProxyType({"bg": "#f44336", "hover": "#da190b", "text": "#ffffff"}),
+})
+
+# 设置对话框配色（每种模式一份，模块加载时构建，只读共享）
+_DARK_PALETTE = MappingProxyType({
+    "dialog_bg": "#181818",
+    "right_bg": "#181818",
+    "left_bg": "#1f1f1f",
+    "left_border": "#2a2a2a",
+    "text_primary": "#f0f0f0",
+    "text_secondary": "#b3b3b3",
+    "text_muted": "#909090",
+    "divider": "#2a2a2a",
+    "card_bg": "#1f1f1f",
+    "card_alt_bg": "#1d1d1d",
+    "card_border": "#2d2d2d",
+    "button_bg": "#2b2b2b",
+    "button_text": "#f5f5f5",
+    "button_border": "#3a3a3a",
+    "button_hover": "#343434",
+    "highlight": "#3a3a3a",
+    "highlight_text": "#ffffff",
+    "highlight_hover": "#2e2e2e",
+    "input_bg": "#222222",
+    "input_border": "#333333",
+    "accent_success": _DARK_ACCENTS["success"],
+    "accent_info": _DARK_ACCENTS["info"],
+    "accent_warning": _DARK_ACCENTS["warning"],
+    "accent_danger": _DARK_ACCENTS["danger"],
+})
+
+_LIGHT_PALETTE = MappingProxyType({
+    "dialog_bg": "#ffffff",
+    "right_bg": "#ffffff",
+    "left_bg": "#f5f5f5",
+    "left_border": "#dddddd",
+    "text_primary": "#333333",
+    "text_secondary": "#666666",
+    "text_muted": "#888888",
+    "divider": "#dddddd",
+    "card_bg": "#fdfdfd",
+    "card_alt_bg": "#f9f9f9",
+    "card_border": "#e4e4e4",
+    "button_bg": "#f7f7f7",
+    "button_text": "#333333",
+    "button_border": "#cccccc",
+    "button_hover": "#e0e0e0",
+    "highlight": "#4CAF50",
+    "highlight_text": "#ffffff",
+    "highlight_hover": "#e0e0e0",
+    "input_bg": "#ffffff",
+    "input_border": "#cccccc",
+    "accent_success": _LIGHT_ACCENTS["success"],
+    "accent_info": _LIGHT_ACCENTS["info"],
+    "accent_warning": _LIGHT_ACCENTS["warning"],
+    "accent_danger": _LIGHT_ACCENTS["danger"],
+})
+
+
+# 小型输入/选择对话框共用的样式表模板，按钮通过 accent / size 动态属性区分
+_THEMED_DIALOG_QSS_TEMPLATE = """
+    QDialog {{ background-color: {dialog_bg}; color: {text_primary}; }}
+    QLabel {{ color: {text_primary}; font-size: 14px; margin: 5px; }}
+    QLabel#titleLabel {{ font-size: 16px; font-weight: bold; margin: 10px; }}
+    QLineEdit {{
+        background-color: {input_bg};
+        color: {text_primary};
+        border: 1px solid {input_border};
+        padding: 6px;
+        font-size: 14px;
+    }}
+    QPushButton {{
+        background-color: {button_bg};
+        color: {button_text};
+        border: 1px solid {button_border};
+        padding: 8px 15px;
+        border-radius: 3px;
+    }}
+    QPushButton:hover {{ background-color: {button_hover}; }}
+    QPushButton[accent="success"] {{ background-color: {success_bg}; color: {success_text}; border: none; }}
+    QPushButton[accent="success"]:hover {{ background-color: {success_hover}; }}
+    QPushButton[accent="info"] {{ background-color: {info_bg}; color: {info_text}; border: none; }}
+    QPushButton[accent="info"]:hover {{ background-color: {info_hover}; }}
+    QPushButton[accent="danger"] {{ background-color: {danger_bg}; color: {danger_text}; border: none; }}
+    QPushButton[accent="danger"]:hover {{ background-color: {danger_hover}; }}
+    QPushButton[size="large"] {{
+        padding: 12px 20px;
+        border-radius: 6px;
+        font-size: 14px;
+        font-weight: bold;
+    }}
+"""
+
+
+def _compose_themed_dialog_qss(palette, accents):
+    """用配色表展开小型对话框样式表模板"""
+    colors = {key: value for key, value in palette.items() if isinstance(value, str)}
+    for accent, accent_colors in accents.items():
+        for key, value in accent_colors.items():
+            colors[f"{accent}_{key}"] = value
+    return _THEMED_DIALOG_QSS_TEMPLATE.format(**colors)
+
+
+# 两种模式的完整样式表在导入时展开一次，对话框实例化时直接取用
+_THEMED_DIALOG_QSS = {
+    False: _compose_themed_dialog_qss(_LIGHT_PALETTE, _LIGHT_ACCENTS),
+    True: _compose_themed_dialog_qss(_DARK_PALETTE, _DARK_ACCENTS),
+}
+
+
+@lru_cache(maxsize=64)
+def _build_button_style(is_dark, accent, padding, radius, font_size, bold, selector="QPushButton"):
+    """生成按钮 QSS，相同参数只拼接一次"""
+    palette = _DARK_PALETTE if is_dark else _LIGHT_PALETTE
+    accent_colors = (_DARK_ACCENTS if is_dark else _LIGHT_ACCENTS).get(accent)
+
+    if accent_colors and not is_dark:
+        bg = accent_colors["bg"]
+        hover = accent_colors["hover"]
+        text_color = accent_colors["text"]
+        border = "none"
+    else:
+        bg = palette["button_bg"]
+        hover = palette["button_hover"]
+        text_color = palette["button_text"]
+        border = f"1px solid {palette['button_border']}"
+
+    font_weight = "font-weight: bold;" if bold else ""
+
+    return f"""
+        {selector} {{
+            background-color: {bg};
+            color: {text_color};
+            border: {border};
+            padding: {padding};
+            border-radius: {radius}px;
+            font-size: {font_size};
+            {font_weight}
+        }}
+        {selector}:hover {{
+            background-color: {hover};
+        }}
+    """
+
+
+@lru_cache(maxsize=2)
+def _build_settings_qss(is_dark):
+    """生成设置对话框的整份 QSS（每种模式只构建一次，由对话框统一设置）"""
+    palette = _DARK_PALETTE if is_dark else _LIGHT_PALETTE
+    return f"""
+        QDialog#SettingsDialog {{
+            background-color: {palette['dialog_bg']};
+            color: {palette['text_primary']};
+        }}
+        QDialog#SettingsDialog QLabel {{
+            color: {palette['text_primary']};
+        }}
+        QWidget#settingsNav {{
+            background-color: {palette['left_bg']};
+            border-right: 1px solid {palette['left_border']};
+        }}
+        QListWidget#parentList {{
+            background-color: transparent;
+            border: none;
+            font-size: 14px;
+        }}
+        QListWidget#parentList::item {{
+            padding: 12px;
+            border-bottom: 1px solid {palette['divider']};
+            color: {palette['text_primary']};
+        }}
+        QListWidget#parentList::item:selected {{
+            background-color: {palette['highlight']};
+            color: {palette['highlight_text']};
+        }}
+        QListWidget#parentList::item:hover {{
+            background-color: {palette['highlight_hover']};
+        }}
+        QWidget#settingsContainer, QWidget#settingsContent {{
+            background-color: {palette['right_bg']};
+        }}
+        QScrollArea#settingsScroll {{
+            border: none;
+            background-color: {palette['right_bg']};
+        }}
+        QScrollArea#settingsScroll > QWidget > QWidget {{
+            background-color: {palette['right_bg']};
+        }}
+        QFrame[class="card"], QFrame[class="card_alt"] {{
+            border: 1px solid {palette['card_border']};
+            border-radius: 8px;
+            padding: 14px;
+            margin: 8px 0;
+            background-color: {palette['card_bg']};
+        }}
+        QFrame[class="card_alt"] {{
+            background-color: {palette['card_alt_bg']};
+        }}
+        QLabel[class="title"] {{
+            font-size: 16px;
+            font-weight: bold;
+            color: {palette['text_primary']};
+            margin-bottom: 15px;
+        }}
+        QLabel[class="section"] {{
+            font-size: 14px;
+            font-weight: bold;
+            color: {palette['text_primary']};
+        }}
+        QLabel[class="option"] {{
+            font-size: 14px;
+            color: {palette['text_primary']};
+        }}
+        QLabel[class="field"] {{
+            font-size: 13px;
+            color: {palette['text_primary']};
+            margin-bottom: 5px;
+        }}
+        QLabel[class="hint"] {{
+            font-size: 12px;
+            color: {palette['text_muted']};
+        }}
+        QLabel[class="note"] {{
+            font-size: 11px;
+            color: {palette['text_muted']};
+        }}
+        QLabel[class="caption"] {{
+            font-size: 11px;
+            color: {palette['text_secondary']};
+        }}
+        QLabel#providerInfoLabel {{
+            font-size: 14px;
+            color: {palette['text_secondary']};
+            margin-bottom: 10px;
+            background: {palette['card_bg']};
+            padding: 8px;
+            border-radius: 4px;
+        }}
+        QLabel#storageStatusLabel {{
+            font-size: 12px;
+            color: {palette['text_secondary']};
+            padding: 5px;
+        }}
+        QSpinBox {{
+            background: {palette['input_bg']};
+            border: 1px solid {palette['input_border']};
+            padding: 6px;
+            border-radius: 4px;
+            color: {palette['text_primary']};
+        }}
+        QLineEdit {{
+            background-color: {palette['input_bg']};
+            border: 1px solid {palette['input_border']};
+            padding: 8px;
+            font-size: 12px;
+            border-radius: 4px;
+            color: {palette['text_primary']};
+        }}
+        QLineEdit:focus {{
+            border: 1px solid {palette['highlight']};
+        }}
+    """ + _build_button_style(
+        is_dark, "info", "8px 15px", 4, "12px", False, "QPushButton#bgPathButton"
+    ) + _build_button_style(
+        is_dark, "info", "10px 15px", 6, "13px", True, "QPushButton#fileConfigButton"
+    )
+
+
+# 设置对话框内提示框的样式表（深色取面板配色，浅色为系统风格），导入时按模式各展开一次
+_SETTINGS_MESSAGE_QSS_TEMPLATE = """
+    QMessageBox {{
+        background-color: {bg};
+        color: {fg};
+    }}
+    QPushButton {{
+        background-color: {btn_bg};
+        color: {btn_fg};
+        border: 1px solid {btn_border};
+        padding: 5px 15px;
+        border-radius: 4px;
+        min-width: 60px;
+    }}
+    QPushButton:hover {{
+        background-color: {btn_hover};
+    }}
+"""
+
+_SETTINGS_MESSAGE_QSS = {
+    False: _SETTINGS_MESSAGE_QSS_TEMPLATE.format(
+        bg="white", fg="black", btn_bg="#f0f0f0", btn_fg="black",
+        btn_border="#cccccc", btn_hover="#e0e0e0",
+    ),
+    True: _SETTINGS_MESSAGE_QSS_TEMPLATE.format(
+        bg=_DARK_PALETTE['card_bg'],
+        fg=_DARK_PALETTE['text_primary'],
+        btn_bg=_DARK_PALETTE['button_bg'],
+        btn_fg=_DARK_PALETTE['button_text'],
+        btn_border=_DARK_PALETTE['button_border'],
+        btn_hover=_DARK_PALETTE['button_hover'],
+    ),
+}
+
+
+class ThemedDialogMixin:
+    """小型对话框的主题混入：统一检测父窗口深色模式并套用共享样式表"""
+
+    def _find_theme_manager(self):
+        theme_manager = getattr(self, 'theme_manager', None)
+        if theme_manager is None:
+            theme_manager = getattr(self.parent(), 'theme_manager', None)
+        return theme_manager
+
+    def is_dark_theme(self):
+        theme_manager = self._find_theme_manager()
+        return bool(theme_manager and getattr(theme_manager, 'dark_mode_enabled', False))
+
+    @staticmethod
+    def _theme_qss(is_dark):
+        """按模式返回对话框样式表，子类可替换为自己的缓存构建函数"""
+        return _THEMED_DIALOG_QSS[is_dark]
+
+    def apply_theme(self, *_):
+        """只替换样式表，控件在 _build_ui 中只构建一次；模式记录在 _is_dark 供控件取用"""
+        self._is_dark = self.is_dark_theme()
+        self.setStyleSheet(self._theme_qss(self._is_dark))
+
+    def init_theme(self):
+        """套用当前主题，并在主题切换时跟随更新"""
+        self.apply_theme()
+        theme_manager = self._find_theme_manager()
+        if theme_manager is not None and hasattr(theme_manager, 'theme_changed'):
+            theme_manager.theme_changed.connect(self.apply_theme)
+            self._theme_source = theme_manager
+
+    def done(self, result):
+        """关闭时断开主题信号，避免主题管理器一直引用已关闭的对话框
+
+        调用方在 exec() 返回后仍会读取对话框上的结果，因此不使用 WA_DeleteOnClose
+        """
+        theme_manager = getattr(self, '_theme_source', None)
+        if theme_manager is not None:
+            self._theme_source = None
+            try:
+                theme_manager.theme_changed.disconnect(self.apply_theme)
+            except TypeError:
+                pass
+        super().done(result)
+
+
+class ChatConfigDialog(ThemedDialogMixin, QDialog):
     """聊天记录配置对话框"""
     def __init__(self, parent=None):
         super().__init__(parent, Qt.WindowType.Window)
@@ -31,22 +466,16 @@ class ChatConfigDialog(QDialog):
         self.setFixedSize(500, 500)
         self.config_result = None  # 'dsn', 'file', None
         
-        self.apply_theme()
+        self._build_ui()
+        self.init_theme()
 
-    def apply_theme(self):
-        # 自动检测父窗口主题
-        is_dark = False
-        parent = self.parent()
-        if parent and hasattr(parent, 'theme_manager'):
-            is_dark = getattr(parent.theme_manager, 'dark_mode_enabled', False)
-        self.setStyleSheet("background-color: %s; color: %s;" % ("#222" if is_dark else "white", "white" if is_dark else "black"))
-        
+    def _build_ui(self):
         layout = QVBoxLayout(self)
         layout.setSpacing(20)
         
         # 标题
         title_label = QLabel("选择聊天记录存储方式：")
-        title_label.setStyleSheet("color: black; font-size: 16px; font-weight: bold; margin: 10px;")
+        title_label.setObjectName("titleLabel")
         title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(title_label)
         
@@ -56,35 +485,15 @@ class ChatConfigDialog(QDialog):
         
         # 配置DSN按钮
         self.dsn_button = QPushButton('配置DSN', self)
-        self.dsn_button.setStyleSheet("""
-            QPushButton { 
-                background-color: #4CAF50; 
-                color: white; 
-                border: none; 
-                padding: 12px 20px; 
-                border-radius: 6px; 
-                # 已移除无效CSS和未闭合花括号
-            }
-        """)
+        self.dsn_button.setProperty("accent", "success")
+        self.dsn_button.setProperty("size", "large")
         self.dsn_button.clicked.connect(self.choose_dsn)
         button_layout.addWidget(self.dsn_button)
         
         # 不使用DSN按钮
         self.file_button = QPushButton('不使用DSN（文件存储）', self)
-        self.file_button.setStyleSheet("""
-            QPushButton { 
-                background-color: #2196F3; 
-                color: white; 
-                border: none; 
-                padding: 12px 20px; 
-                border-radius: 6px; 
-                font-size: 14px;
-                font-weight: bold;
-            }
-            QPushButton:hover { 
-                background-color: #1976D2; 
-            }
-        """)
+        self.file_button.setProperty("accent", "info")
+        self.file_button.setProperty("size", "large")
         self.file_button.clicked.connect(self.choose_file)
         button_layout.addWidget(self.file_button)
         
@@ -92,26 +501,16 @@ class ChatConfigDialog(QDialog):
         
         # 取消按钮
         cancel_button = QPushButton('取消', self)
-        cancel_button.setStyleSheet("""
-            QPushButton { 
-                background-color: #f44336; 
-                color: white; 
-                border: none; 
-                padding: 8px 15px; 
-                border-radius: 3px; 
-                font-size: 12px;
-            }
-            QPushButton:hover { 
-                background-color: #da190b; 
-            }
-        """)
+        cancel_button.setProperty("accent", "danger")
         cancel_button.clicked.connect(self.reject)
         layout.addWidget(cancel_button)
         
+    @pyqtSlot()
     def choose_dsn(self):
         self.config_result = 'dsn'
         self.accept()
         
+    @pyqtSlot()
     def choose_file(self):
         self.config_result = 'file'
         self.accept()
@@ -120,48 +519,58 @@ class ChatConfigDialog(QDialog):
         """获取用户选择的结果"""
         return self.config_result
 
-class DSNConfigDialog(QDialog):
+class _TextResultDialog(ThemedDialogMixin, QDialog):
+    """单行文本输入对话框基类：确认时去除首尾空白保存到 result_text，子类需提供 line_edit"""
+
+    # 是否允许以空文本确认
+    allow_empty = False
+    result_text = ''
+
+    @pyqtSlot()
+    def accept(self):
+        self.result_text = self.line_edit.text().strip()
+        if self.result_text or self.allow_empty:
+            super().accept()
+        else:
+            self.line_edit.setFocus()
+
+
+class DSNConfigDialog(_TextResultDialog):
     """DSN配置对话框"""
     def __init__(self, parent=None):
         super().__init__(parent, Qt.WindowType.Window)
         self.setWindowTitle('配置DSN名称')
         self.setFixedSize(400, 160)
-        self.dsn_name = ''
         
-        self.apply_theme()
+        self._build_ui()
+        self.init_theme()
 
-    def apply_theme(self):
-        is_dark = False
-        parent = self.parent()
-        if parent and hasattr(parent, 'theme_manager'):
-            is_dark = getattr(parent.theme_manager, 'dark_mode_enabled', False)
-        self.setStyleSheet("background-color: %s; color: %s;" % ("#222" if is_dark else "white", "white" if is_dark else "black"))
-        
+    def _build_ui(self):
         layout = QVBoxLayout(self)
         layout.setSpacing(15)
         
         # 标题
         title_label = QLabel("配置DSN名称")
-        title_label.setStyleSheet("color: black; font-size: 16px; font-weight: bold; margin: 10px;")
+        title_label.setObjectName("titleLabel")
         title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(title_label)
         
         # 输入框
         self.line_edit = QLineEdit(self)
         self.line_edit.setPlaceholderText("请输入DSN名称...")
-        self.line_edit.setStyleSheet("background-color: white; color: black; border: 1px solid #ccc; padding: 8px; font-size: 14px;")
-        self.line_edit.returnPressed.connect(self.accept)
         layout.addWidget(self.line_edit)
         
         # 按钮区域
         button_layout = QHBoxLayout()
         ok_button = QPushButton('确定', self)
+        # 作为默认按钮响应输入框中的回车，不再另接 returnPressed，避免一次回车触发两次 accept
+        ok_button.setDefault(True)
         ok_button.clicked.connect(self.accept)
         cancel_button = QPushButton('取消', self)
         cancel_button.clicked.connect(self.reject)
         
-        ok_button.setStyleSheet("""QPushButton { background-color: #4CAF50; color: white; border: none; padding: 8px 15px; border-radius: 3px; }QPushButton:hover { background-color: #45a049; }""")
-        cancel_button.setStyleSheet("""QPushButton { background-color: #f44336; color: white; border: none; padding: 8px 15px; border-radius: 3px; }QPushButton:hover { background-color: #da190b; }""")
+        ok_button.setProperty("accent", "success")
+        cancel_button.setProperty("accent", "danger")
 
         button_layout.addWidget(ok_button)
         button_layout.addWidget(cancel_button)
@@ -169,13 +578,33 @@ class DSNConfigDialog(QDialog):
         
         # 设置焦点到输入框
         self.line_edit.setFocus()
-        
-    def accept(self):
-        self.dsn_name = self.line_edit.text().strip()
-        if self.dsn_name:
-            super().accept()
-        else:
-            self.line_edit.setFocus()
+
+    @property
+    def dsn_name(self):
+        return self.result_text
+
+    def get_dsn_name(self):
+        """获取用户输入的DSN名称"""
+        return self.result_text
+
+# 连接结果提示框样式
+_CONNECTION_RESULT_QSS = """
+    QMessageBox {
+        background-color: white;
+        color: black;
+    }
+    QPushButton {
+        background-color: #f0f0f0;
+        border: 1px solid #ccc;
+        padding: 5px 15px;
+        border-radius: 3px;
+        min-width: 60px;
+    }
+    QPushButton:hover {
+        background-color: #e0e0e0;
+    }
+"""
+
 
 def show_connection_result(parent, success, message):
     """显示连接结果对话框"""
@@ -193,130 +622,84 @@ def show_connection_result(parent, success, message):
     ok_button = msg_box.button(QMessageBox.StandardButton.Ok)
     ok_button.setText("确定")
     
-    msg_box.setStyleSheet("""
-        QMessageBox {
-            background-color: white;
-            color: black;
-        }
-        QPushButton {
-            background-color: #f0f0f0;
-            border: 1px solid #ccc;
-            padding: 5px 15px;
-            border-radius: 3px;
-            min-width: 60px;
-        }
-        QPushButton:hover {
-            background-color: #e0e0e0;
-        }
-    """)
+    msg_box.setStyleSheet(_CONNECTION_RESULT_QSS)
     
     msg_box.exec()
 
-class CustomPromptDialog(QDialog):
+class CustomPromptDialog(_TextResultDialog):
     """自定义提示词对话框"""
+
+    allow_empty = True
+
     def __init__(self, parent=None):
         super().__init__(parent, Qt.WindowType.Window)
         self.setWindowTitle('自定义提示词')
         self.setFixedSize(400, 100)
-        self.prompt = ''
         
-        self.apply_theme()
+        self._build_ui()
+        self.init_theme()
 
-    def apply_theme(self):
-        is_dark = False
-        parent = self.parent()
-        if parent and hasattr(parent, 'theme_manager'):
-            is_dark = getattr(parent.theme_manager, 'dark_mode_enabled', False)
-        self.setStyleSheet("background-color: %s; color: %s;" % ("#222" if is_dark else "white", "white" if is_dark else "black"))
-        
+    def _build_ui(self):
         layout = QVBoxLayout(self)
         self.line_edit = QLineEdit(self)
         self.line_edit.setPlaceholderText("请输入您的提示词...")
-        self.line_edit.setStyleSheet("background-color: white; color: black; border: 1px solid #ccc;")
         self.line_edit.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.line_edit.returnPressed.connect(self.accept)
         layout.addWidget(self.line_edit)
         
         button_layout = QHBoxLayout()
         ok_button = QPushButton('确定', self)
+        # 作为默认按钮响应输入框中的回车，不再另接 returnPressed，避免一次回车触发两次 accept
+        ok_button.setDefault(True)
         ok_button.clicked.connect(self.accept)
         cancel_button = QPushButton('取消', self)
         cancel_button.clicked.connect(self.reject)
-        
-        ok_button.setStyleSheet("""QPushButton { background-color: #f0f0f0; border: 1px solid #bbb; }QPushButton:pressed { background-color: #e0e0e0; }""")
-        cancel_button.setStyleSheet("""QPushButton { background-color: #f0f0f0; border: 1px solid #bbb; }QPushButton:pressed { background-color: #e0e0e0; }""")
 
         button_layout.addWidget(ok_button)
         button_layout.addWidget(cancel_button)
         layout.addLayout(button_layout)
-        
-    def accept(self):
-        self.prompt = self.line_edit.text().strip()
-        super().accept()
 
-class RenameDialog(QDialog):
+    @property
+    def prompt(self):
+        return self.result_text
+
+class RenameDialog(_TextResultDialog):
     """重命名对话框"""
     def __init__(self, current_title, parent=None):
         super().__init__(parent, Qt.WindowType.Window)
         self.setWindowTitle('重命名对话')
         self.setFixedSize(400, 150)
-        self.new_title = ''
         self.current_title = current_title
         self.theme_manager = None
         if parent and hasattr(parent, 'theme_manager'):
             self.theme_manager = parent.theme_manager
         
-        self.apply_theme()
-
-    def apply_theme(self):
-        is_dark = bool(self.theme_manager and getattr(self.theme_manager, 'dark_mode_enabled', False))
-        dialog_bg = "#181818" if is_dark else "white"
-        text_color = "#f0f0f0" if is_dark else "black"
-        input_bg = "#222222" if is_dark else "white"
-        input_border = "#333333" if is_dark else "#cccccc"
-        button_bg_primary = "#2f2f2f" if is_dark else "#4CAF50"
-        button_hover_primary = "#3a3a3a" if is_dark else "#45a049"
-        button_bg_secondary = "#3a2b2b" if is_dark else "#f44336"
-        button_hover_secondary = "#453333" if is_dark else "#da190b"
+        self._build_ui()
+        self.init_theme()
 
-        self.setStyleSheet(f"background-color: {dialog_bg}; color: {text_color};")
-        
+    def _build_ui(self):
         layout = QVBoxLayout(self)
         
         # 提示标签
         label = QLabel("请输入新的对话名称：")
-        label.setStyleSheet(f"color: {text_color}; font-size: 14px; margin: 5px;")
         layout.addWidget(label)
         
         # 输入框
         self.line_edit = QLineEdit(self)
         self.line_edit.setText(self.current_title)
         self.line_edit.selectAll()  # 选中所有文本
-        self.line_edit.setStyleSheet(
-            f"background-color: {input_bg}; color: {text_color}; border: 1px solid {input_border}; padding: 5px; font-size: 14px;"
-        )
-        self.line_edit.returnPressed.connect(self.accept)
         layout.addWidget(self.line_edit)
         
         # 按钮
         button_layout = QHBoxLayout()
         ok_button = QPushButton('确定', self)
+        # 作为默认按钮响应输入框中的回车，不再另接 returnPressed，避免一次回车触发两次 accept
+        ok_button.setDefault(True)
         ok_button.clicked.connect(self.accept)
         cancel_button = QPushButton('取消', self)
         cancel_button.clicked.connect(self.reject)
         
-        ok_button.setStyleSheet(
-            f"""
-            QPushButton {{ background-color: {button_bg_primary}; color: white; border: none; padding: 8px 15px; border-radius: 3px; }}
-            QPushButton:hover {{ background-color: {button_hover_primary}; }}
-        """
-        )
-        cancel_button.setStyleSheet(
-            f"""
-            QPushButton {{ background-color: {button_bg_secondary}; color: white; border: none; padding: 8px 15px; border-radius: 3px; }}
-            QPushButton:hover {{ background-color: {button_hover_secondary}; }}
-        """
-        )
+        ok_button.setProperty("accent", "success")
+        cancel_button.setProperty("accent", "danger")
 
         button_layout.addWidget(ok_button)
         button_layout.addWidget(cancel_button)
@@ -324,13 +707,40 @@ class RenameDialog(QDialog):
         
         # 设置焦点到输入框
         self.line_edit.setFocus()
-        
-    def accept(self):
-        self.new_title = self.line_edit.text().strip()
-        if self.new_title:
-            super().accept()
-        else:
-            self.line_edit.setFocus()
+
+    @property
+    def new_title(self):
+        return self.result_text
+
+# 删除确认框样式（深色 / 浅色）
+_DELETE_QSS_DARK = """
+    QMessageBox {
+        background-color: #222;
+        color: white;
+    }
+    QPushButton {
+        background-color: #444;
+        color: white;
+    }
+    QPushButton:hover {
+        background-color: #333;
+    }
+"""
+
+_DELETE_QSS_LIGHT = """
+    QMessageBox {
+        background-color: white;
+        color: black;
+    }
+    QPushButton {
+        background-color: #f0f0f0;
+        color: black;
+    }
+    QPushButton:hover {
+        background-color: #e0e0e0;
+    }
+"""
+
 
 def show_delete_confirmation(parent, conv_title):
     """显示删除确认对话框"""
@@ -350,25 +760,7 @@ def show_delete_confirmation(parent, conv_title):
     is_dark = False
     if parent and hasattr(parent, 'theme_manager'):
         is_dark = getattr(parent.theme_manager, 'dark_mode_enabled', False)
-    msg_box.setStyleSheet("""
-        QMessageBox {
-            background-color: %s;
-            color: %s;
-        }
-        QPushButton {
-            background-color: %s;
-            color: %s;
-        }
-        QPushButton:hover {
-            background-color: %s;
-        }
-    """ % (
-        "#222" if is_dark else "white",
-        "white" if is_dark else "black",
-        "#444" if is_dark else "#f0f0f0",
-        "white" if is_dark else "black",
-        "#333" if is_dark else "#e0e0e0"
-    ))
+    msg_box.setStyleSheet(_DELETE_QSS_DARK if is_dark else _DELETE_QSS_LIGHT)
     
     return msg_box.exec() == QMessageBox.StandardButton.Yes
 
@@ -376,11 +768,23 @@ def show_delete_confirmation(parent, conv_title):
 class ToggleSwitch(QCheckBox):
     """自绘胶囊切换开关"""
 
+    # 绘制用颜色（类级常量，重绘时不再重复构造）
+    _TRACK_ON = QColor("#3DC06C")
+    _TRACK_OFF = QColor("#D8D8D8")
+    _TRACK_DISABLED = QColor("#BEBEBE")
+    _KNOB = QColor("#FFFFFF")
+    _KNOB_EDGE = QColor(0, 0, 0, 20)
+
+    # 渲染结果缓存：(宽, 高, 边距, 设备像素比, 选中, 启用) -> QPixmap，所有开关实例共享
+    _pixmap_cache = {}
+
     def __init__(self, parent=None, width=58, height=30, margin=3):
         super().__init__(parent)
         self._width = width
         self._height = height
         self._margin = margin
+        self._radius = height / 2
+        self._knob_diameter = height - margin * 2
         self.setFixedSize(self._width, self._height)
         self.setCursor(Qt.CursorShape.PointingHandCursor)
         self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
@@ -389,33 +793,73 @@ class ToggleSwitch(QCheckBox):
         return QSize(self._width, self._height)
 
     def paintEvent(self, event):
+        checked = self.isChecked()
+        enabled = self.isEnabled()
+        dpr = self.devicePixelRatioF()
+        key = (self._width, self._height, self._margin, dpr, checked, enabled)
+        pixmap = self._pixmap_cache.get(key)
+        if pixmap is None:
+            pixmap = self._pixmap_cache[key] = self._render(checked, enabled, dpr)
+
         painter = QPainter(self)
+        painter.drawPixmap(0, int((self.height() - self._height) / 2), pixmap)
+        painter.end()
+
+    def _render(self, checked, enabled, dpr):
+        """按状态绘制开关图像（按设备像素比渲染，高分屏下保持清晰）"""
+        pixmap = QPixmap(round(self._width * dpr), round(self._height * dpr))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter(pixmap)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
 
-        track_rect = QRectF(0, (self.height() - self._height) / 2, self._width, self._height)
+        track_rect = QRectF(0, 0, self._width, self._height)
         painter.setPen(Qt.PenStyle.NoPen)
 
-        if self.isEnabled():
-            track_color = QColor("#3DC06C") if self.isChecked() else QColor("#D8D8D8")
+        if enabled:
+            track_color = self._TRACK_ON if checked else self._TRACK_OFF
         else:
-            track_color = QColor("#BEBEBE")
+            track_color = self._TRACK_DISABLED
 
         painter.setBrush(track_color)
-        painter.drawRoundedRect(track_rect, self._height / 2, self._height / 2)
+        painter.drawRoundedRect(track_rect, self._radius, self._radius)
 
-        knob_diameter = self._height - self._margin * 2
-        if self.isChecked():
+        knob_diameter = self._knob_diameter
+        if checked:
             knob_x = track_rect.right() - knob_diameter - self._margin
         else:
             knob_x = track_rect.left() + self._margin
 
         knob_rect = QRectF(knob_x, track_rect.top() + self._margin, knob_diameter, knob_diameter)
-        painter.setBrush(QColor("#FFFFFF"))
+        painter.setBrush(self._KNOB)
         painter.drawEllipse(knob_rect)
 
         # 细边框与投影
-        painter.setPen(QColor(0, 0, 0, 20))
+        painter.setPen(self._KNOB_EDGE)
         painter.drawEllipse(knob_rect)
+        painter.end()
+        return pixmap
+
+
+class _ApiConfigLoaderSignals(QObject):
+    loaded = pyqtSignal(dict)
+
+
+class _ApiConfigLoader(QRunnable):
+    """在线程池中读取 API 配置，读取结果通过信号回到界面线程"""
+
+    def __init__(self):
+        super().__init__()
+        self.signals = _ApiConfigLoaderSignals()
+
+    def run(self):
+        try:
+            config = load_api_config() or {}
+        except Exception as e:
+            logger.warning("[设置] 读取 API 配置失败: %s", e)
+            config = {}
+        self.signals.loaded.emit(config)
 
 
 class SettingsDialog(QDialog):
@@ -442,18 +886,24 @@ class SettingsDialog(QDialog):
         elif hasattr(parent, 'theme_manager'):
             self.theme_manager = parent.theme_manager
 
-        if self.theme_manager:
-            self.theme_manager.theme_changed.connect(self.on_theme_manager_dark_mode_changed)
+        self._restyle_timer = QTimer(self)
+        self._restyle_timer.setSingleShot(True)
+        self._restyle_timer.setInterval(THEME_RESTYLE_DELAY_MS)
+        self._restyle_timer.timeout.connect(self.apply_base_theme_styles)
+        # 当前已应用样式表对应的模式，None 表示尚未应用
+        self._applied_dark = None
 
-        self.dark_mode_switch = None
-        self.auto_mode_switch = None
+        # 待写入 config.json 的界面设置，由定时器合并为一次读改写
+        self._pending_ui_settings = {}
+        self._ui_settings_save_timer = QTimer(self)
+        self._ui_settings_save_timer.setSingleShot(True)
+        self._ui_settings_save_timer.setInterval(SAVE_UI_SETTINGS_DELAY_MS)
+        self._ui_settings_save_timer.timeout.connect(self._flush_ui_settings)
 
         # API 配置状态
         self.api_key_value = ""
         self.api_url_value = ""
         self.api_model_value = ""
-        self._suppress_api_events = False
-        self._load_api_config()
 
         # UI 组件引用
         self.left_widget = None
@@ -461,28 +911,45 @@ class SettingsDialog(QDialog):
 
         self.init_ui()
         self.apply_base_theme_styles()
+        self._load_api_config()
+
+        # 页面（包括深色模式开关）构建完成后再跟随主题变化
+        if self.theme_manager:
+            self.theme_manager.theme_changed.connect(self.on_theme_manager_dark_mode_changed)
 
     def _load_api_config(self):
-        config = load_api_config()
+        """异步读取 API 配置，对话框先行显示，读取完成后再填充输入框"""
+        # 保留加载器引用，保证信号对象在回调前不被回收
+        self._api_config_loader = _ApiConfigLoader()
+        self._api_config_loader.signals.loaded.connect(self._on_api_config_loaded)
+        QThreadPool.globalInstance().start(self._api_config_loader)
+
+    @pyqtSlot(dict)
+    def _on_api_config_loaded(self, config):
+        self._api_config_loader = None
         self.api_key_value = config.get('api_key', '') or ""
         self.api_url_value = config.get('api_url', '') or ""
         self.api_model_value = config.get('model', '') or ""
 
-    def _refresh_api_inputs(self):
-        masked_key = mask_sensitive_value(self.api_key_value)
-        masked_url = mask_sensitive_value(self.api_url_value)
+        # 与 api_config.get_current_provider_config 的取值规则一致，但直接使用同一份配置，不再重复读取文件
+        current_provider = config.get('current_provider') or 'deepseek'
+        providers = config.get('providers') or {}
+        provider_config = providers.get(current_provider) or providers.get('deepseek') or {}
+        self.refresh_for_provider(current_provider, provider_config.get('display_name', current_provider))
+        self._refresh_api_inputs()
 
-        if hasattr(self, 'api_key_input') and self.api_key_input:
-            self._suppress_api_events = True
-            self.api_key_input.setText(masked_key)
-            self.api_key_input.setCursorPosition(len(masked_key))
-            self._suppress_api_events = False
+    def _refresh_api_inputs(self):
+        self._set_masked_text(getattr(self, 'api_key_input', None), _mask(self.api_key_value))
+        self._set_masked_text(getattr(self, 'api_url_input', None), _mask(self.api_url_value))
 
-        if hasattr(self, 'api_url_input') and self.api_url_input:
-            self._suppress_api_events = True
-            self.api_url_input.setText(masked_url)
-            self.api_url_input.setCursorPosition(len(masked_url))
-            self._suppress_api_events = False
+    @staticmethod
+    def _set_masked_text(line_edit, masked):
+        # 显示内容未变化时跳过 setText，避免无谓的重排与重绘
+        if line_edit is None or line_edit.text() == masked:
+            return
+        with QSignalBlocker(line_edit):
+            line_edit.setText(masked)
+            line_edit.setCursorPosition(len(masked))
 
     def is_dark_mode_enabled(self):
         if self.theme_manager:
@@ -490,173 +957,62 @@ class SettingsDialog(QDialog):
         return False
 
     def get_theme_palette(self):
-        if self.is_dark_mode_enabled():
-            return {
-                "dialog_bg": "#181818",
-                "right_bg": "#181818",
-                "left_bg": "#1f1f1f",
-                "left_border": "#2a2a2a",
-                "text_primary": "#f0f0f0",
-                "text_secondary": "#b3b3b3",
-                "text_muted": "#909090",
-                "divider": "#2a2a2a",
-                "card_bg": "#1f1f1f",
-                "card_alt_bg": "#1d1d1d",
-                "card_border": "#2d2d2d",
-                "button_bg": "#2b2b2b",
-                "button_text": "#f5f5f5",
-                "button_border": "#3a3a3a",
-                "button_hover": "#343434",
-                "highlight": "#3a3a3a",
-                "highlight_text": "#ffffff",
-                "highlight_hover": "#2e2e2e",
-                "input_bg": "#222222",
-                "input_border": "#333333",
-                "accent_success": {"bg": "#2f2f2f", "hover": "#393939", "text": "#f5f5f5"},
-                "accent_info": {"bg": "#2f2f2f", "hover": "#3b3b3b", "text": "#f5f5f5"},
-                "accent_warning": {"bg": "#34302a", "hover": "#3f3932", "text": "#f5f5f5"},
-            }
-        return {
-            "dialog_bg": "#ffffff",
-            "right_bg": "#ffffff",
-            "left_bg": "#f5f5f5",
-            "left_border": "#dddddd",
-            "text_primary": "#333333",
-            "text_secondary": "#666666",
-            "text_muted": "#888888",
-            "divider": "#dddddd",
-            "card_bg": "#fdfdfd",
-            "card_alt_bg": "#f9f9f9",
-            "card_border": "#e4e4e4",
-            "button_bg": "#f7f7f7",
-            "button_text": "#333333",
-            "button_border": "#cccccc",
-            "button_hover": "#e0e0e0",
-            "highlight": "#4CAF50",
-            "highlight_text": "#ffffff",
-            "highlight_hover": "#e0e0e0",
-            "input_bg": "#ffffff",
-            "input_border": "#cccccc",
-            "accent_success": {"bg": "#4CAF50", "hover": "#45a049", "text": "#ffffff"},
-            "accent_info": {"bg": "#2196F3", "hover": "#1976D2", "text": "#ffffff"},
-            "accent_warning": {"bg": "#FF9800", "hover": "#F57C00", "text": "#ffffff"},
-        }
+        return _DARK_PALETTE if self.is_dark_mode_enabled() else _LIGHT_PALETTE
 
     @staticmethod
     def _config_path():
         return os.path.join(os.path.dirname(__file__), 'config.json')
 
+    @staticmethod
+    def _config_stamp(path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+
     def _read_config(self):
+        """读取 config.json；文件未变化时直接返回缓存（只读视图，嵌套字典同样不得原地修改）"""
+        path = self._config_path()
         try:
-            with open(self._config_path(), 'r', encoding='utf-8') as f:
-                return json.load(f)
+            stamp = self._config_stamp(path)
+            if _CONFIG_CACHE['stamp'] != stamp:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                _CONFIG_CACHE.update(stamp=stamp, data=data)
+            return MappingProxyType(_CONFIG_CACHE['data'])
         except FileNotFoundError:
-            print("[设置] 警告: config.json 未找到，使用默认值")
+            logger.warning("[设置] config.json 未找到，使用默认值")
         except Exception as e:
-            print(f"[设置] 读取 config.json 失败: {e}")
-        return {}
+            logger.warning("[设置] 读取 config.json 失败: %s", e)
+        return MappingProxyType({})
 
     def _write_config(self, config_data):
+        """写入 config.json；写入后 config_data 成为新的缓存，调用方不应再修改"""
+        path = self._config_path()
         try:
-            with open(self._config_path(), 'w', encoding='utf-8') as f:
+            with open(path, 'w', encoding='utf-8') as f:
                 json.dump(config_data, f, indent=2, ensure_ascii=False)
+            _CONFIG_CACHE.update(stamp=self._config_stamp(path), data=config_data)
         except Exception as e:
-            print(f"[设置] 写入 config.json 失败: {e}")
-
-    def _ensure_ui_section(self, config_data):
-        app_section = config_data.setdefault('app', {})
-        return app_section.setdefault('ui', {})
-
-    def build_button_style(self, *, padding="10px 15px", radius=6, font_size="13px", bold=False, accent=None):
-        palette = self.get_theme_palette()
-        accent_colors = None
-        if accent == "success":
-            accent_colors = palette["accent_success"]
-        elif accent == "info":
-            accent_colors = palette["accent_info"]
-        elif accent == "warning":
-            accent_colors = palette["accent_warning"]
-
-        if accent_colors and not self.is_dark_mode_enabled():
-            bg = accent_colors["bg"]
-            hover = accent_colors["hover"]
-            text_color = accent_colors["text"]
-            border = "none"
-        else:
-            bg = palette["button_bg"]
-            hover = palette["button_hover"]
-            text_color = palette["button_text"]
-            border = f"1px solid {palette['button_border']}"
-
-        font_weight = "font-weight: bold;" if bold else ""
-
-        return f"""
-            QPushButton {{
-                background-color: {bg};
-                color: {text_color};
-                border: {border};
-                padding: {padding};
-                border-radius: {radius}px;
-                font-size: {font_size};
-                {font_weight}
-            }}
-            QPushButton:hover {{
-                background-color: {hover};
-            }}
-        """
+            _CONFIG_CACHE.update(stamp=None, data=None)
+            logger.exception("[设置] 写入 config.json 失败: %s", e)
 
-    def apply_base_theme_styles(self):
-        palette = self.get_theme_palette()
-        self.setStyleSheet(f"""
-            QDialog#SettingsDialog {{
-                background-color: {palette['dialog_bg']};
-                color: {palette['text_primary']};
-            }}
-            QDialog#SettingsDialog QLabel {{
-                color: {palette['text_primary']};
-            }}
-        """)
+    @staticmethod
+    def _with_ui_settings(config_data, updates):
+        """返回合并了界面设置的新配置：只复制 app.ui 路径上的字典，其余部分与缓存共享"""
+        config = dict(config_data)
+        app_section = dict(config.get('app') or {})
+        ui_section = dict(app_section.get('ui') or {})
+        ui_section.update(updates)
+        app_section['ui'] = ui_section
+        config['app'] = app_section
+        return config
 
-        if self.left_widget:
-            self.left_widget.setStyleSheet(f"background-color: {palette['left_bg']}; border-right: 1px solid {palette['left_border']};")
-
-        if self.parent_list:
-            self.parent_list.setStyleSheet(f"""
-                QListWidget {{
-                    background-color: transparent;
-                    border: none;
-                    font-size: 14px;
-                }}
-                QListWidget::item {{
-                    padding: 12px;
-                    border-bottom: 1px solid {palette['divider']};
-                    color: {palette['text_primary']};
-                }}
-                QListWidget::item:selected {{
-                    background-color: {palette['highlight']};
-                    color: {palette['highlight_text']};
-                }}
-                QListWidget::item:hover {{
-                    background-color: {palette['highlight_hover']};
-                }}
-            """)
-
-        if self.right_widget:
-            self.right_widget.setStyleSheet(f"background-color: {palette['right_bg']};")
-
-        if self.right_container:
-            self.right_container.setStyleSheet(f"background-color: {palette['right_bg']};")
-
-        if self.scroll_area:
-            self.scroll_area.setStyleSheet(f"""
-                QScrollArea {{
-                    border: none;
-                    background-color: {palette['right_bg']};
-                }}
-                QScrollArea > QWidget > QWidget {{
-                    background-color: {palette['right_bg']};
-                }}
-            """)
+    def apply_base_theme_styles(self):
+        is_dark = self.is_dark_mode_enabled()
+        # 主题未变化（如信号回响同一状态）时不重设样式表，避免整棵控件树重新解析样式
+        if is_dark == self._applied_dark:
+            return
+        self._applied_dark = is_dark
+        self.setStyleSheet(_build_settings_qss(is_dark))
         
     def init_ui(self):
         """初始化UI"""
@@ -666,12 +1022,14 @@ class SettingsDialog(QDialog):
         
         # 左区域（父项功能） - 宽度比例 2
         self.left_widget = QWidget()
+        self.left_widget.setObjectName("settingsNav")
         self.left_widget.setFixedWidth(200)  # 700 * 2/7 = 200
         left_layout = QVBoxLayout(self.left_widget)
         left_layout.setContentsMargins(10, 10, 10, 10)
         
         # 父项列表
         self.parent_list = QListWidget()
+        self.parent_list.setObjectName("parentList")
         
         # 添加父项 - 确保不重复添加
         self.parent_list.clear()  # 先清空列表防止重复
@@ -681,163 +1039,66 @@ class SettingsDialog(QDialog):
         self.parent_list.addItem(general_item)
         self.parent_list.addItem(chat_record_item)
         self.parent_list.addItem(api_item)
-        self.parent_list.currentItemChanged.connect(self.on_parent_item_changed)
         
         left_layout.addWidget(self.parent_list)
         
-        # 右区域（子项功能） - 宽度比例 3，添加滚动区域
+        # 右区域（子项功能） - 宽度比例 3，每个父项对应一个常驻页面
         self.right_container = QWidget()
+        self.right_container.setObjectName("settingsContainer")
         self.right_container.setFixedWidth(500)  # 700 * 3/7 = 300
         
-        # 创建滚动区域
-        self.scroll_area = QScrollArea(self.right_container)
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-        
-        # 滚动内容容器
-        self.right_widget = QWidget()
-        self.right_layout = QVBoxLayout(self.right_widget)
-        self.right_layout.setContentsMargins(15, 15, 15, 15)
-        
-        # 将内容容器放入滚动区域
-        self.scroll_area.setWidget(self.right_widget)
+        # 页面只构建一次，顺序与父项列表的行一致，切换父项时仅切换当前页
+        self.stack = QStackedWidget()
+        self.stack.addWidget(self._wrap_page(self.build_general_page()))
+        self.stack.addWidget(self._wrap_page(self.build_chat_record_page()))
+        self.stack.addWidget(self._wrap_page(self.build_api_page()))
+        self.parent_list.currentRowChanged.connect(self.stack.setCurrentIndex)
         
         # 右侧容器布局
         right_layout = QVBoxLayout(self.right_container)
         right_layout.setContentsMargins(0, 0, 0, 0)
-        right_layout.addWidget(self.scroll_area)
+        right_layout.addWidget(self.stack)
         
         layout.addWidget(self.left_widget)
         layout.addWidget(self.right_container)
         
-        # 初始化显示第一个父项的子项 - 在布局完成后进行
-        QTimer.singleShot(100, self.init_default_view)
+        # 页面已全部构建，直接选中第一个父项
+        self.init_default_view()
     
     def init_default_view(self):
         """初始化默认视图 - 显示第一个父项的子项"""
-        print("初始化默认视图...")
-        
         if self.parent_list.count() > 0:
             # 设置第一项为选中状态
             self.parent_list.setCurrentRow(0)
-
-            # 如果信号尚未渲染内容，主动触发一次
-            if self.right_layout and self.right_layout.count() == 0:
-                current_item = self.parent_list.currentItem()
-                if current_item:
-                    self.switch_to_parent_content(current_item.text())
-
-            print("默认视图初始化完成")
         else:
-            print("警告: 父项列表为空")
+            logger.warning("[设置] 父项列表为空")
     
-    def on_parent_item_changed(self, current, previous):
-        """父项切换事件 - 改进的切换逻辑"""
-        if current is None:
-            print("父项切换: current为None，跳过处理")
-            return
-        
-        current_text = current.text()
-        previous_text = previous.text() if previous else "None"
-        print(f"父项切换: {previous_text} -> {current_text}")
-        
-        # 防止重复调用
-        if previous and current_text == previous_text:
-            print("重复调用，跳过处理")
-            return
-        
-        # 立即显示对应的子项内容，无需清空和延迟
-        self.switch_to_parent_content(current_text)
-        
-    def switch_to_parent_content(self, parent_name):
-        """切换到指定父项的内容"""
-        print(f"立即切换到: {parent_name}")
-        
-        # 清空当前内容
-        self.clear_right_area()
-        
-        # 立即显示对应内容，不使用延迟
-        if parent_name == "通用设置":
-            self.show_general_settings()
-        elif parent_name == "聊天记录管理":
-            self.show_chat_record_settings()
-        elif parent_name == "API":
-            self.show_api_settings()
-        else:
-            print(f"未知的父项: {parent_name}")
-        
-        # 强制更新UI
-        if hasattr(self, 'right_widget') and self.right_widget:
-            self.right_widget.update()
-        if hasattr(self, 'scroll_area') and self.scroll_area:
-            self.scroll_area.update()
-        QApplication.processEvents()
-    
-    def clear_right_area(self):
-        """清空右区域 - 安全版本"""
-        if self.right_layout is None:
-            print("警告: right_layout 不存在，跳过清理")
-            return
-            
-        initial_count = self.right_layout.count()
-        if initial_count == 0:
-            print("右区域已经为空，跳过清理")
-            return
-            
-        print(f"清理右区域，当前有 {initial_count} 个组件")
-        
-        # 安全地清理所有组件
-        try:
-            while self.right_layout.count() > 0:
-                item = self.right_layout.takeAt(0)
-                if item and item.widget():
-                    widget = item.widget()
-                    widget.setParent(None)
-                    widget.deleteLater()
-            print("右区域清理完成")
-        except Exception as e:
-            print(f"清理过程中发生错误: {e}")
-            # 如果清理失败，保持当前布局并记录错误
-            pass
-
-        if hasattr(self, 'dark_mode_switch'):
-            self.dark_mode_switch = None
-        if hasattr(self, 'auto_mode_switch'):
-            self.auto_mode_switch = None
+    @staticmethod
+    def _wrap_page(page):
+        """将页面放入独立的滚动区域，各页面按自身内容高度滚动"""
+        page.setObjectName("settingsContent")
+        scroll_area = QScrollArea()
+        scroll_area.setObjectName("settingsScroll")
+        scroll_area.setWidgetResizable(True)
+        scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
+        scroll_area.setWidget(page)
+        return scroll_area
     
-    def show_general_settings(self):
-        """显示通用设置子项"""
-        print("=== 开始显示通用设置 ===")
-        
-        # 检查布局是否存在
-        if self.right_layout is None:
-            print("错误: right_layout 不存在，无法显示通用设置")
-            return
-        
-        # 确保内容区域干净
-        if self.right_layout.count() > 0:
-            self.clear_right_area()
-
-        # 重置控件引用，避免使用过期组件
-        self.dark_mode_switch = None
-        self.auto_mode_switch = None
-
-        palette = self.get_theme_palette()
+    def build_general_page(self):
+        """构建通用设置页面"""
+        page = QWidget()
+        page_layout = QVBoxLayout(page)
+        page_layout.setContentsMargins(15, 15, 15, 15)
 
         # 标题
         title_label = QLabel("通用设置")
-        title_label.setStyleSheet(
-            f"font-size: 16px; font-weight: bold; color: {palette['text_primary']}; margin-bottom: 10px;"
-        )
-        self.right_layout.addWidget(title_label)
-        print("✓ 已添加通用设置标题")
+        title_label.setProperty("class", "title")
+        page_layout.addWidget(title_label)
 
         # 深色模式与自动模式配置
         dark_mode_frame = QFrame()
-        dark_mode_frame.setStyleSheet(
-            f"border: 1px solid {palette['card_border']}; border-radius: 8px; padding: 14px; margin: 8px 0; background-color: {palette['card_bg']};"
-        )
+        dark_mode_frame.setProperty("class", "card")
         dark_mode_layout = QVBoxLayout(dark_mode_frame)
         dark_mode_layout.setSpacing(12)
 
@@ -846,9 +1107,7 @@ class SettingsDialog(QDialog):
         dark_toggle_row.setContentsMargins(0, 0, 0, 0)
 
         dark_mode_label = QLabel("深色模式")
-        dark_mode_label.setStyleSheet(
-            f"font-size: 14px; color: {palette['text_primary']};"
-        )
+        dark_mode_label.setProperty("class", "option")
         dark_toggle_row.addWidget(dark_mode_label)
         dark_toggle_row.addStretch()
 
@@ -862,9 +1121,7 @@ class SettingsDialog(QDialog):
         dark_mode_layout.addLayout(dark_toggle_row)
 
         dark_mode_hint = QLabel("启用后界面将使用深色主题，适合低光环境。")
-        dark_mode_hint.setStyleSheet(
-            f"font-size: 12px; color: {palette['text_muted']};"
-        )
+        dark_mode_hint.setProperty("class", "hint")
         dark_mode_hint.setWordWrap(True)
         dark_mode_layout.addWidget(dark_mode_hint)
 
@@ -873,9 +1130,7 @@ class SettingsDialog(QDialog):
         mode_layout.setContentsMargins(0, 0, 0, 0)
 
         mode_label = QLabel("跟随系统时间自动切换")
-        mode_label.setStyleSheet(
-            f"font-size: 14px; color: {palette['text_primary']};"
-        )
+        mode_label.setProperty("class", "option")
         mode_layout.addWidget(mode_label)
         mode_layout.addStretch()
 
@@ -890,40 +1145,30 @@ class SettingsDialog(QDialog):
         dark_mode_layout.addLayout(mode_layout)
 
         auto_mode_hint = QLabel("开启后将根据系统时间自动切换深浅色主题。")
-        auto_mode_hint.setStyleSheet(
-            f"font-size: 12px; color: {palette['text_muted']};"
-        )
+        auto_mode_hint.setProperty("class", "hint")
         auto_mode_hint.setWordWrap(True)
         dark_mode_layout.addWidget(auto_mode_hint)
 
-        self.right_layout.addWidget(dark_mode_frame)
+        page_layout.addWidget(dark_mode_frame)
 
         # 自定义背景设置
         bg_frame = QFrame()
-        bg_frame.setStyleSheet(
-            f"border: 1px solid {palette['card_border']}; border-radius: 8px; padding: 14px; margin: 8px 0; background-color: {palette['card_bg']};"
-        )
+        bg_frame.setProperty("class", "card")
         bg_layout = QVBoxLayout(bg_frame)
         bg_layout.setSpacing(10)
         
         bg_label = QLabel("自定义背景")
-        bg_label.setStyleSheet(
-            f"font-size: 14px; font-weight: bold; color: {palette['text_primary']};"
-        )
+        bg_label.setProperty("class", "section")
         bg_layout.addWidget(bg_label)
         
         self.bg_path_button = QPushButton("选择背景路径")
-        self.bg_path_button.setStyleSheet(
-            self.build_button_style(padding="8px 15px", radius=4, font_size="12px", accent="info")
-        )
+        self.bg_path_button.setObjectName("bgPathButton")
         self.bg_path_button.clicked.connect(self.choose_background)
         bg_layout.addWidget(self.bg_path_button)
         
         # 显示当前背景路径
         self.bg_path_label = QLabel("未选择背景")
-        self.bg_path_label.setStyleSheet(
-            f"font-size: 11px; color: {palette['text_secondary']}; margin-top: 5px;"
-        )
+        self.bg_path_label.setProperty("class", "caption")
         self.bg_path_label.setWordWrap(True)
         
         # 设置当前背景状态
@@ -934,47 +1179,35 @@ class SettingsDialog(QDialog):
             
         bg_layout.addWidget(self.bg_path_label)
         
-        self.right_layout.addWidget(bg_frame)
+        page_layout.addWidget(bg_frame)
         
         # 文本折叠设置
         collapse_frame = QFrame()
-        collapse_frame.setStyleSheet(
-            f"border: 1px solid {palette['card_border']}; border-radius: 8px; padding: 14px; margin: 8px 0; background-color: {palette['card_bg']};"
-        )
+        collapse_frame.setProperty("class", "card")
         collapse_layout = QVBoxLayout(collapse_frame)
         collapse_layout.setSpacing(10)
         
         collapse_label = QLabel("长文本折叠设置")
-        collapse_label.setStyleSheet(
-            f"font-size: 14px; font-weight: bold; color: {palette['text_primary']};"
-        )
+        collapse_label.setProperty("class", "section")
         collapse_layout.addWidget(collapse_label)
         
         collapse_hint = QLabel("当 Agent 回复超过设定字符数时，自动显示展开/收起按钮")
-        collapse_hint.setStyleSheet(
-            f"font-size: 12px; color: {palette['text_muted']};"
-        )
+        collapse_hint.setProperty("class", "hint")
         collapse_hint.setWordWrap(True)
         collapse_layout.addWidget(collapse_hint)
         
         # 阈值输入框
         threshold_row = QHBoxLayout()
         threshold_label = QLabel("折叠阈值（字符数）:")
-        threshold_label.setStyleSheet(
-            f"font-size: 13px; color: {palette['text_primary']};"
-        )
+        threshold_label.setProperty("class", "field")
         threshold_row.addWidget(threshold_label)
         
-        from PyQt6.QtWidgets import QSpinBox
         self.collapse_threshold_spinbox = QSpinBox()
         self.collapse_threshold_spinbox.setMinimum(100)
         self.collapse_threshold_spinbox.setMaximum(5000)
         self.collapse_threshold_spinbox.setSingleStep(50)
         self.collapse_threshold_spinbox.setValue(self.load_collapse_threshold())
         self.collapse_threshold_spinbox.valueChanged.connect(self.save_collapse_threshold)
-        self.collapse_threshold_spinbox.setStyleSheet(
-            f"QSpinBox {{ background: {palette['input_bg']}; border: 1px solid {palette['input_border']}; padding: 6px; border-radius: 4px; color: {palette['text_primary']}; }}"
-        )
         threshold_row.addWidget(self.collapse_threshold_spinbox)
         threshold_row.addStretch()
         
@@ -983,9 +1216,7 @@ class SettingsDialog(QDialog):
         # 预览长度输入框
         preview_row = QHBoxLayout()
         preview_label = QLabel("收起时显示字符数:")
-        preview_label.setStyleSheet(
-            f"font-size: 13px; color: {palette['text_primary']};"
-        )
+        preview_label.setProperty("class", "field")
         preview_row.addWidget(preview_label)
         
         self.preview_length_spinbox = QSpinBox()
@@ -994,102 +1225,79 @@ class SettingsDialog(QDialog):
         self.preview_length_spinbox.setSingleStep(50)
         self.preview_length_spinbox.setValue(self.load_preview_length())
         self.preview_length_spinbox.valueChanged.connect(self.save_preview_length)
-        self.preview_length_spinbox.setStyleSheet(
-            f"QSpinBox {{ background: {palette['input_bg']}; border: 1px solid {palette['input_border']}; padding: 6px; border-radius: 4px; color: {palette['text_primary']}; }}"
-        )
         preview_row.addWidget(self.preview_length_spinbox)
         preview_row.addStretch()
         
         collapse_layout.addLayout(preview_row)
         
-        self.right_layout.addWidget(collapse_frame)
+        page_layout.addWidget(collapse_frame)
         
         # 添加弹性空间
-        self.right_layout.addStretch()
-
-        print("=== 通用设置界面构建完成 ===")
+        page_layout.addStretch()
+        return page
     
-    def show_chat_record_settings(self):
-        """显示聊天记录管理子项"""
-        print("=== 开始显示聊天记录管理 ===")
+    def build_chat_record_page(self):
+        """构建聊天记录管理页面"""
+        page = QWidget()
+        page_layout = QVBoxLayout(page)
+        page_layout.setContentsMargins(15, 15, 15, 15)
         
-        # 检查布局是否存在
-        if self.right_layout is None:
-            print("错误: right_layout 不存在，无法显示聊天记录管理")
-            return
-        
-        palette = self.get_theme_palette()
-
         # 标题
         title_label = QLabel("聊天记录管理")
-        title_label.setStyleSheet(
-            f"font-size: 16px; font-weight: bold; color: {palette['text_primary']}; margin-bottom: 15px;"
-        )
-        self.right_layout.addWidget(title_label)
+        title_label.setProperty("class", "title")
+        page_layout.addWidget(title_label)
         
         # 本地存储路径选择
         storage_frame = QFrame()
-        storage_frame.setStyleSheet(
-            f"border: 1px solid {palette['card_border']}; border-radius: 8px; padding: 14px; margin: 8px 0; background-color: {palette['card_bg']};"
-        )
+        storage_frame.setProperty("class", "card")
         storage_layout = QVBoxLayout(storage_frame)
         storage_layout.setSpacing(12)
         
         storage_label = QLabel("本地存储路径")
-        storage_label.setStyleSheet(
-            f"font-size: 14px; font-weight: bold; color: {palette['text_primary']}; margin-bottom: 8px;"
-        )
+        storage_label.setProperty("class", "section")
         storage_layout.addWidget(storage_label)
         
         # 文件存储按钮
         self.file_config_button = QPushButton("📁 选择本地存储路径")
-        self.file_config_button.setStyleSheet(
-            self.build_button_style(padding="10px 15px", radius=6, font_size="13px", bold=True, accent="info")
-        )
+        self.file_config_button.setObjectName("fileConfigButton")
         self.file_config_button.clicked.connect(self.handle_file_config)
         storage_layout.addWidget(self.file_config_button)
         
         file_hint = QLabel("选择本地文件夹存储聊天记录，数据保存在本地。")
-        file_hint.setStyleSheet(
-            f"font-size: 11px; color: {palette['text_secondary']}; margin-left: 10px;"
-        )
+        file_hint.setProperty("class", "caption")
         storage_layout.addWidget(file_hint)
         
-        self.right_layout.addWidget(storage_frame)
+        page_layout.addWidget(storage_frame)
         
         # 存储状态显示
         status_frame = QFrame()
-        status_frame.setStyleSheet(
-            f"border: 1px solid {palette['card_border']}; border-radius: 8px; padding: 14px; margin: 8px 0; background-color: {palette['card_alt_bg']};"
-        )
+        status_frame.setProperty("class", "card_alt")
         status_layout = QVBoxLayout(status_frame)
         
         status_label = QLabel("当前存储状态")
-        status_label.setStyleSheet(
-            f"font-size: 14px; font-weight: bold; color: {palette['text_primary']}; margin-bottom: 8px;"
-        )
+        status_label.setProperty("class", "section")
         status_layout.addWidget(status_label)
         
         self.storage_status_label = QLabel("正在检测存储配置...")
-        self.storage_status_label.setStyleSheet(
-            f"font-size: 12px; color: {palette['text_secondary']}; padding: 5px;"
-        )
+        self.storage_status_label.setObjectName("storageStatusLabel")
         status_layout.addWidget(self.storage_status_label)
         
         # 更新存储状态显示
         self.update_storage_status()
         
-        self.right_layout.addWidget(status_frame)
+        page_layout.addWidget(status_frame)
         
         # 添加弹性空间
-        self.right_layout.addStretch()
+        page_layout.addStretch()
         
-        print("=== 聊天记录管理界面构建完成 ===")
+        return page
     
+    @pyqtSlot()
     def handle_dsn_config(self):
         """处理DSN配置"""
         self.chat_config_dsn_signal.emit()
         
+    @pyqtSlot()
     def handle_file_config(self):
         """处理文件存储配置"""
         self.chat_config_file_signal.emit()
@@ -1107,171 +1315,103 @@ class SettingsDialog(QDialog):
         msg_box.setText("数据迁移功能将在存储配置完成后提供。\n请先配置您需要的存储方式。")
         msg_box.setIcon(QMessageBox.Icon.Information)
         msg_box.setStandardButtons(QMessageBox.StandardButton.Ok)
-        palette = self.get_theme_palette()
-        is_dark = self.is_dark_mode_enabled()
-        msg_box.setStyleSheet("""
-            QMessageBox {{
-                background-color: {bg};
-                color: {fg};
-            }}
-            QPushButton {{
-                background-color: {btn_bg};
-                color: {btn_fg};
-                border: 1px solid {btn_border};
-                padding: 5px 15px;
-                border-radius: 4px;
-                min-width: 60px;
-            }}
-            QPushButton:hover {{
-                background-color: {btn_hover};
-            }}
-        """.format(
-            bg=palette['card_bg'] if is_dark else "white",
-            fg=palette['text_primary'] if is_dark else "black",
-            btn_bg=palette['button_bg'] if is_dark else "#f0f0f0",
-            btn_fg=palette['button_text'] if is_dark else "black",
-            btn_border=palette['button_border'] if is_dark else "#cccccc",
-            btn_hover=palette['button_hover'] if is_dark else "#e0e0e0"
-        ))
+        msg_box.setStyleSheet(_SETTINGS_MESSAGE_QSS[self.is_dark_mode_enabled()])
         msg_box.exec()
     
-    def show_api_settings(self):
-        """显示API设置子项"""
-        palette = self.get_theme_palette()
+    def build_api_page(self):
+        """构建API设置页面"""
+        page = QWidget()
+        page_layout = QVBoxLayout(page)
+        page_layout.setContentsMargins(15, 15, 15, 15)
+        
         # 标题
         title_label = QLabel("API设置")
-        title_label.setStyleSheet(
-            f"font-size: 16px; font-weight: bold; color: {palette['text_primary']}; margin-bottom: 15px;"
-        )
-        self.right_layout.addWidget(title_label)
+        title_label.setProperty("class", "title")
+        page_layout.addWidget(title_label)
         
         # 当前提供商信息
-        try:
-            current_provider = get_current_provider_name()
-            provider_config = get_current_provider_config()
-            provider_display_name = provider_config.get('display_name', current_provider)
-            
-            provider_info_label = QLabel(f"当前API提供商: {provider_display_name}")
-            provider_info_label.setStyleSheet(
-                f"font-size: 14px; color: {palette['text_secondary']}; margin-bottom: 10px; "
-                f"background: {palette['card_bg']}; padding: 8px; border-radius: 4px;"
-            )
-            self.right_layout.addWidget(provider_info_label)
-        except Exception as e:
-            print(f"获取提供商信息失败: {e}")
-            current_provider = 'deepseek'  # 默认值
+        self.provider_info_label = QLabel()
+        self.provider_info_label.setObjectName("providerInfoLabel")
+        page_layout.addWidget(self.provider_info_label)
         
-        # API Key设置（根据提供商显示不同信息）
-        is_gemini = current_provider == 'gemini'
-        
-        if is_gemini:
-            api_key_label = QLabel("设置 Gemini API Key（回车确认）：")
-            hint_text = "Gemini API Key 将自动保存到系统环境变量 GEMINI_API_KEY"
-        else:
-            api_key_label = QLabel("设置您的API_Key（回车确认）：")
-            hint_text = "请输入您的API密钥"
-            
-        api_key_label.setStyleSheet(
-            f"font-size: 13px; color: {palette['text_primary']}; margin-bottom: 5px;"
-        )
-        self.right_layout.addWidget(api_key_label)
+        # API Key设置（文案随提供商变化，见 refresh_for_provider）
+        self.api_key_label = QLabel()
+        self.api_key_label.setProperty("class", "field")
+        page_layout.addWidget(self.api_key_label)
         
         # 添加提示信息
-        hint_label = QLabel(hint_text)
-        hint_label.setStyleSheet(
-            f"font-size: 11px; color: {palette['text_muted']}; margin-bottom: 5px;"
-        )
-        self.right_layout.addWidget(hint_label)
+        self.api_key_hint_label = QLabel()
+        self.api_key_hint_label.setProperty("class", "note")
+        page_layout.addWidget(self.api_key_hint_label)
         
         self.api_key_input = QLineEdit()
         self.api_key_input.setPlaceholderText("请输入API Key...")
-        self.api_key_input.setStyleSheet(
-            f"""
-            QLineEdit {{ 
-                background-color: {palette['input_bg']}; 
-                border: 1px solid {palette['input_border']}; 
-                padding: 8px; 
-                font-size: 12px; 
-                border-radius: 4px;
-                color: {palette['text_primary']};
-            }}
-            QLineEdit:focus {{
-                border: 1px solid {palette['highlight']};
-            }}
-        """
-        )
         self.api_key_input.setClearButtonEnabled(True)
-        self.api_key_input.returnPressed.connect(self.save_api_key)
+        # editingFinished 已涵盖回车与失去焦点，不再重复连接 returnPressed
         self.api_key_input.editingFinished.connect(self.save_api_key)
-        self.right_layout.addWidget(self.api_key_input)
+        page_layout.addWidget(self.api_key_input)
         
         # 间距
         spacer1 = QSpacerItem(0, 15, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Fixed)
-        self.right_layout.addItem(spacer1)
-        
-        # API URL设置（仅非Gemini提供商显示）
-        if not is_gemini:
-            api_url_label = QLabel("设置您的模型URL（回车确认）：")
-            api_url_label.setStyleSheet(
-                f"font-size: 13px; color: {palette['text_primary']}; margin-bottom: 5px;"
-            )
-            self.right_layout.addWidget(api_url_label)
-            
-            self.api_url_input = QLineEdit()
-            self.api_url_input.setPlaceholderText("请输入模型URL...")
-            self.api_url_input.setStyleSheet(
-                f"""
-                QLineEdit {{ 
-                    background-color: {palette['input_bg']}; 
-                    border: 1px solid {palette['input_border']}; 
-                    padding: 8px; 
-                    font-size: 12px; 
-                    border-radius: 4px;
-                    color: {palette['text_primary']};
-                }}
-                QLineEdit:focus {{
-                    border: 1px solid {palette['highlight']};
-                }}
-            """
-            )
-            self.api_url_input.setClearButtonEnabled(True)
-            self.api_url_input.returnPressed.connect(self.save_api_url)
-            self.api_url_input.editingFinished.connect(self.save_api_url)
-            self.right_layout.addWidget(self.api_url_input)
-        else:
-            # Gemini模式下，URL输入框不创建
-            self.api_url_input = None
+        page_layout.addItem(spacer1)
+        
+        # API URL设置：始终构建，Gemini 提供商下仅隐藏整行
+        self._api_url_row = QWidget()
+        url_row_layout = QVBoxLayout(self._api_url_row)
+        url_row_layout.setContentsMargins(0, 0, 0, 0)
+        api_url_label = QLabel("设置您的模型URL（回车确认）：")
+        api_url_label.setProperty("class", "field")
+        url_row_layout.addWidget(api_url_label)
+        
+        self.api_url_input = QLineEdit()
+        self.api_url_input.setPlaceholderText("请输入模型URL...")
+        self.api_url_input.setClearButtonEnabled(True)
+        self.api_url_input.editingFinished.connect(self.save_api_url)
+        url_row_layout.addWidget(self.api_url_input)
+        page_layout.addWidget(self._api_url_row)
 
         # 安全提示
         mask_hint = QLabel("提示：为了安全，仅显示前4位和末尾2位，其余部分会使用 * 掩码。")
         mask_hint.setWordWrap(True)
-        mask_hint.setStyleSheet(
-            f"font-size: 11px; color: {palette['text_muted']}; margin-top: 6px;"
-        )
-        self.right_layout.addWidget(mask_hint)
+        mask_hint.setProperty("class", "note")
+        page_layout.addWidget(mask_hint)
 
+        # 提供商信息来自异步读取的 API 配置（见 _on_api_config_loaded），读取完成前先按普通提供商显示
+        self.refresh_for_provider('')
         self._refresh_api_inputs()
         
         # 添加弹性空间
-        self.right_layout.addStretch()
+        page_layout.addStretch()
+        return page
+
+    def refresh_for_provider(self, provider_name, display_name=None):
+        """按提供商切换 API 页面的文案与 URL 行可见性，不重建控件"""
+        is_gemini = provider_name == 'gemini'
+        self.provider_info_label.setText(f"当前API提供商: {display_name or provider_name}")
+        self.provider_info_label.setVisible(display_name is not None)
+        if is_gemini:
+            self.api_key_label.setText("设置 Gemini API Key（回车确认）：")
+            self.api_key_hint_label.setText("Gemini API Key 将自动保存到系统环境变量 GEMINI_API_KEY")
+        else:
+            self.api_key_label.setText("设置您的API_Key（回车确认）：")
+            self.api_key_hint_label.setText("请输入您的API密钥")
+        self._api_url_row.setVisible(not is_gemini)
     
+    @pyqtSlot(bool)
     def on_dark_mode_toggled(self, checked):
         """深色模式开关切换 - 即时响应，无防抖"""
-        print(f"🔘 深色模式状态变化: {checked}")
-        
         if not self.theme_manager:
-            print("[ERROR] 警告: theme_manager 为 None")
+            logger.warning("[设置] theme_manager 为 None，忽略主题切换")
             return
         
         # 直接调用，无延迟
         self.theme_manager.enable_dark_mode(checked)
 
+    @pyqtSlot(bool)
     def on_auto_mode_toggled(self, enabled):
         """自动模式开关切换 - 即时响应，无防抖"""
-        print(f"🔘 自动模式状态变化: {enabled}")
-        
         if not self.theme_manager:
-            print("[ERROR] 警告: theme_manager 为 None")
+            logger.warning("[设置] theme_manager 为 None，忽略主题切换")
             return
         
         # 直接调用，无延迟
@@ -1281,25 +1421,16 @@ class SettingsDialog(QDialog):
         if enabled:
             self.show_auto_mode_prompt()
 
+    @pyqtSlot(bool)
     def on_theme_manager_dark_mode_changed(self, enabled):
-        """主题管理器回调，保持开关与全局状态同步并刷新当前面板"""
-        print(f"🎨 主题管理器回调: dark_mode={enabled}")
-        
+        """主题管理器回调，保持开关与全局状态同步并重新应用对话框样式表"""
         # 同步开关状态
-        if self.dark_mode_switch is not None:
-            self.dark_mode_switch.blockSignals(True)
+        with QSignalBlocker(self.dark_mode_switch):
             self.dark_mode_switch.setChecked(bool(enabled))
-            self.dark_mode_switch.blockSignals(False)
-
-        # 应用基础主题样式
-        self.apply_base_theme_styles()
 
-        # 刷新当前显示的面板内容
-        current_item = self.parent_list.currentItem() if self.parent_list else None
-        if current_item:
-            current_text = current_item.text()
-            print(f"🔄 刷新当前面板: {current_text}")
-            self.switch_to_parent_content(current_text)
+        # 面板控件的样式都由对话框样式表的选择器统一提供，换主题只需重设一次；
+        # 延迟合并后按主题管理器的最终状态重设，快速连续切换只重设一次
+        self._restyle_timer.start()
     
     def load_collapse_threshold(self):
         """加载文本折叠阈值"""
@@ -1308,24 +1439,15 @@ class SettingsDialog(QDialog):
             ui_settings = ((config.get('app') or {}).get('ui') or {})
             return ui_settings.get('collapse_threshold', 500)
         except Exception as e:
-            print(f"加载折叠阈值失败: {e}")
+            logger.warning("[设置] 加载折叠阈值失败: %s", e)
         return 500  # 默认值
     
+    @pyqtSlot(int)
     def save_collapse_threshold(self, value):
-        """保存文本折叠阈值"""
-        try:
-            config = self._read_config()
-            ui_settings = self._ensure_ui_section(config)
-            ui_settings['collapse_threshold'] = value
-            self._write_config(config)
-
-            # 更新 chat_area.py 中的阈值
-            from chat_area import CollapsibleBubbleLabel
-            CollapsibleBubbleLabel.COLLAPSE_THRESHOLD = value
-            
-            print(f"折叠阈值已保存: {value}")
-        except Exception as e:
-            print(f"保存折叠阈值失败: {e}")
+        """保存文本折叠阈值：立即生效，写盘延迟合并"""
+        # 更新 chat_area.py 中的阈值
+        CollapsibleBubbleLabel.COLLAPSE_THRESHOLD = value
+        self._schedule_ui_setting('collapse_threshold', value)
     
     def load_preview_length(self):
         """加载收起时显示的字符数"""
@@ -1334,77 +1456,68 @@ class SettingsDialog(QDialog):
             ui_settings = ((config.get('app') or {}).get('ui') or {})
             return ui_settings.get('preview_length', 300)
         except Exception as e:
-            print(f"加载预览长度失败: {e}")
+            logger.warning("[设置] 加载预览长度失败: %s", e)
         return 300  # 默认值
     
+    @pyqtSlot(int)
     def save_preview_length(self, value):
-        """保存收起时显示的字符数"""
+        """保存收起时显示的字符数：立即生效，写盘延迟合并"""
+        # 更新 chat_area.py 中的预览长度
+        CollapsibleBubbleLabel.PREVIEW_LENGTH = value
+        self._schedule_ui_setting('preview_length', value)
+
+    def _schedule_ui_setting(self, key, value):
+        """记录待保存的界面设置，短时间内的多次修改只写最后一次"""
+        self._pending_ui_settings[key] = value
+        self._ui_settings_save_timer.start()
+
+    @pyqtSlot()
+    def _flush_ui_settings(self):
+        """将待保存的界面设置一次性写入 config.json"""
+        self._ui_settings_save_timer.stop()
+        if not self._pending_ui_settings:
+            return
+        pending, self._pending_ui_settings = self._pending_ui_settings, {}
         try:
-            config = self._read_config()
-            ui_settings = self._ensure_ui_section(config)
-            ui_settings['preview_length'] = value
+            config = self._with_ui_settings(self._read_config(), pending)
             self._write_config(config)
-
-            # 更新 chat_area.py 中的预览长度
-            from chat_area import CollapsibleBubbleLabel
-            CollapsibleBubbleLabel.PREVIEW_LENGTH = value
-            
-            print(f"预览长度已保存: {value}")
+            logger.debug("[设置] 界面设置已保存: %s", pending)
         except Exception as e:
-            print(f"保存预览长度失败: {e}")
+            logger.exception("[设置] 保存界面设置失败: %s", e)
+
+    def done(self, result):
+        # 关闭对话框前确保最后一次修改落盘
+        self._flush_ui_settings()
+        super().done(result)
 
     def show_auto_mode_prompt(self):
-        """展示自动模式提示信息，使用浅色样式"""
+        """展示自动模式提示信息，样式跟随当前主题"""
         msg_box = QMessageBox(self)
         msg_box.setWindowTitle("自动模式")
         msg_box.setIcon(QMessageBox.Icon.Information)
         msg_box.setText("主题会根据系统时间自动切换深浅色模式。")
         msg_box.setStandardButtons(QMessageBox.StandardButton.Ok)
-        palette = self.get_theme_palette()
-        is_dark = self.is_dark_mode_enabled()
-        msg_box.setStyleSheet("""
-            QMessageBox {{
-                background-color: {bg};
-                color: {fg};
-            }}
-            QPushButton {{
-                background-color: {btn_bg};
-                color: {btn_fg};
-                border: 1px solid {btn_border};
-                padding: 5px 15px;
-                border-radius: 4px;
-                min-width: 60px;
-            }}
-            QPushButton:hover {{
-                background-color: {btn_hover};
-            }}
-        """.format(
-            bg=palette['card_bg'] if is_dark else "white",
-            fg=palette['text_primary'] if is_dark else "black",
-            btn_bg=palette['button_bg'] if is_dark else "#f0f0f0",
-            btn_fg=palette['button_text'] if is_dark else "black",
-            btn_border=palette['button_border'] if is_dark else "#cccccc",
-            btn_hover=palette['button_hover'] if is_dark else "#e0e0e0"
-        ))
+        msg_box.setStyleSheet(_SETTINGS_MESSAGE_QSS[self.is_dark_mode_enabled()])
         msg_box.exec()
         
+    @pyqtSlot()
     def choose_background(self):
         """选择背景图片或视频"""
         file_path, _ = QFileDialog.getOpenFileName(
             self, 
             "选择背景图片或视频", 
             "", 
-            "背景文件 (*.png *.jpg *.jpeg *.mp4 *.avi *.mov *.mkv);;图片文件 (*.png *.jpg *.jpeg);;视频文件 (*.mp4 *.avi *.mov *.mkv)"
+            _BG_FILE_FILTER
         )
         
         if file_path:
             # 判断文件类型
             ext = os.path.splitext(file_path)[1].lower()
-            is_video = ext in ['.mp4', '.avi', '.mov', '.mkv']
+            is_video = ext in _BG_VIDEO_EXTS
             file_type = "视频" if is_video else "图片"
             
             # 检查文件格式和分辨率
-            if self.validate_background_file(file_path):
+            if self.validate_background_file(file_path, ext):
                 self.bg_path_label.setText(f"已选择: {os.path.basename(file_path)} ({file_type})")
                 if self.theme_manager:
                     # 传递 is_video 参数
@@ -1412,37 +1525,39 @@ class SettingsDialog(QDialog):
                     # 立即应用背景并刷新UI
                     QTimer.singleShot(100, self.theme_manager.apply_background)
                 
-                print(f"✅ 背景{file_type}已设置: {file_path}")
+                logger.debug("[设置] 背景%s已设置: %s", file_type, file_path)
                 QMessageBox.information(self, "背景设置", f"✅ 背景{file_type}已更新\n\n文件: {os.path.basename(file_path)}\n类型: {file_type}文件")
             else:
-                print(f"❌ 背景{file_type}验证失败: {file_path}")
+                logger.warning("[设置] 背景%s验证失败: %s", file_type, file_path)
                 if is_video:
                     QMessageBox.warning(self, "格式错误", f"❌ 无法加载视频文件\n\n请确保:\n1. 视频文件未损坏\n2. 视频编码受支持（推荐 H.264）\n3. 文件路径正确")
                 else:
                     QMessageBox.warning(self, "格式错误", f"❌ 只支持1920×1080分辨率的图片文件\n\n支持格式: PNG, JPG, JPEG")
     
-    def validate_background_file(self, file_path):
-        """验证背景文件格式和分辨率（支持图片和视频）"""
+    def validate_background_file(self, file_path, ext=None):
+        """验证背景文件格式和分辨率（支持图片和视频），ext 为已知的小写扩展名"""
         try:
             # 检查文件扩展名
-            ext = os.path.splitext(file_path)[1].lower()
+            if ext is None:
+                ext = os.path.splitext(file_path)[1].lower()
             
             # 支持的图片格式
-            if ext in ['.png', '.jpg', '.jpeg']:
-                # 使用PIL检查分辨率（如果安装了PIL）
-                if PIL_AVAILABLE:
+            if ext in _BG_IMAGE_EXTS:
+                # 优先只读文件头取分辨率，无法识别时再交给PIL（如果安装了PIL）
+                dims = _read_image_dims(file_path)
+                if dims is None:
+                    if not PIL_AVAILABLE:
+                        # 如果PIL不可用，只检查扩展名
+                        return True
                     try:
                         with Image.open(file_path) as img:
-                            width, height = img.size
-                            return width == 1920 and height == 1080
+                            dims = img.size
                     except Exception:
                         return False
-                else:
-                    # 如果PIL不可用，只检查扩展名
-                    return True
+                return tuple(dims) == (1920, 1080)
             
             # 支持的视频格式
-            elif ext in ['.mp4', '.avi', '.mov', '.mkv']:
+            elif ext in _BG_VIDEO_EXTS:
                 # 视频文件暂不检查分辨率（需要额外依赖）
                 # 建议用户使用1920×1080的视频
                 return True
@@ -1452,6 +1567,7 @@ class SettingsDialog(QDialog):
         except Exception:
             return False
     
+    @pyqtSlot()
     def save_api_key(self):
         """保存API Key并持久化到配置文件"""
         raw_key = self.api_key_input.text().strip()
@@ -1461,32 +1577,92 @@ class SettingsDialog(QDialog):
                 if current_provider == 'gemini':
                     # 对于 Gemini，使用专门的设置函数
                     if set_gemini_api_key(raw_key):
-                        print(f"Gemini API Key已保存并设置为环境变量: {raw_key[:10]}...")
+                        logger.debug("[设置] Gemini API Key 已保存并设置为环境变量")
                     else:
-                        print("保存 Gemini API Key 失败")
+                        logger.warning("[设置] 保存 Gemini API Key 失败")
                 else:
                     # 对于其他提供商，使用标准方法
                     update_api_config(api_key=raw_key)
-                    print(f"API Key已保存: {raw_key}")
+                    logger.debug("[设置] API Key 已保存: %s", _mask(raw_key))
                 
+                _mask.cache_clear()
                 self._refresh_api_inputs()
             except Exception as e:
-                print(f"保存API Key失败: {e}")
+                logger.exception("[设置] 保存 API Key 失败: %s", e)
         
+    @pyqtSlot()
     def save_api_url(self):
         """保存API URL并持久化到配置文件"""
         raw_url = self.api_url_input.text().strip()
         if raw_url:
             update_api_config(api_url=raw_url)
-            print(f"API URL已保存: {raw_url}")
+            logger.debug("[设置] API URL 已保存: %s", _mask(raw_url))
+            _mask.cache_clear()
             self._refresh_api_inputs()
 
 
-class SearchDialog(QDialog):
+# 搜索结果提示文字样式：错误为红色，普通结果按主题取灰色
+_SEARCH_RESULT_ERROR_QSS = "color: red; font-size: 12px;"
+_SEARCH_RESULT_QSS = {
+    False: "color: #666666; font-size: 12px;",
+    True: "color: #999999; font-size: 12px;",
+}
+
+
+@lru_cache(maxsize=2)
+def _search_dialog_qss(is_dark):
+    """搜索对话框样式表"""
+    bg_color = "#2b2b2b" if is_dark else "white"
+    text_color = "white" if is_dark else "black"
+    gray_text = "#999999" if is_dark else "#666666"
+    
+    return f"""
+        QDialog {{
+            background-color: {bg_color};
+        }}
+        QLabel {{
+            color: {text_color};
+            font-size: 14px;
+        }}
+        QLabel#resultLabel {{
+            color: {gray_text};
+            font-size: 12px;
+        }}
+        QLineEdit {{
+            background-color: {'#3b3b3b' if is_dark else '#f0f0f0'};
+            color: {text_color};
+            border: 1px solid {'#555' if is_dark else '#ccc'};
+            border-radius: 5px;
+            padding: 8px;
+            font-size: 14px;
+        }}
+        QPushButton {{
+            background-color: {'#0078d4' if not is_dark else '#0d6efd'};
+            color: white;
+            border: none;
+            border-radius: 5px;
+            padding: 8px 16px;
+            font-size: 14px;
+        }}
+        QPushButton:hover {{
+            background-color: {'#106ebe' if not is_dark else '#0b5ed7'};
+        }}
+        QPushButton:disabled {{
+            background-color: {'#cccccc' if not is_dark else '#555555'};
+            color: {'#666666' if not is_dark else '#999999'};
+        }}
+    """
+
+
+class SearchDialog(ThemedDialogMixin, QDialog):
     """搜索对话框 - 用于在聊天记录中查找文本"""
+
+    _theme_qss = staticmethod(_search_dialog_qss)
+
     search_in_current_signal = pyqtSignal(str)  # 在当前对话中搜索
     search_globally_signal = pyqtSignal(str)    # 全局搜索
     navigate_signal = pyqtSignal(int)  # 导航到第N个结果 (index)
+    refine_in_current_signal = pyqtSignal(str)  # 新查询是上一次的延伸，只在已有结果中收窄
     
     def __init__(self, parent=None, has_bubbles=False, has_conversations=False):
         super().__init__(parent, Qt.WindowType.Window)
@@ -1498,57 +1674,25 @@ class SearchDialog(QDialog):
         self.result_label = None
         self.matches = []  # 存储搜索结果
         self.current_index = 0  # 当前显示的结果索引
+        self._last_query = ""  # 上一次在当前对话中搜索的文本
+        self._pending_update = False  # 隐藏期间收到结果，待显示时再刷新
+        self._result_qss = None  # 结果标签当前使用的样式表
+        
+        # 输入停顿后再搜索，避免每个字符都触发一次
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self._search_timer.timeout.connect(self._search_as_you_type)
         
         self.init_ui()
-        self.apply_theme()
+        self.init_theme()
     
-    def apply_theme(self):
-        """应用主题"""
-        is_dark = False
-        parent = self.parent()
-        if parent and hasattr(parent, 'theme_manager'):
-            is_dark = getattr(parent.theme_manager, 'dark_mode_enabled', False)
-        
-        bg_color = "#2b2b2b" if is_dark else "white"
-        text_color = "white" if is_dark else "black"
-        gray_text = "#999999" if is_dark else "#666666"
-        
-        self.setStyleSheet(f"""
-            QDialog {{
-                background-color: {bg_color};
-            }}
-            QLabel {{
-                color: {text_color};
-                font-size: 14px;
-            }}
-            QLabel#resultLabel {{
-                color: {gray_text};
-                font-size: 12px;
-            }}
-            QLineEdit {{
-                background-color: {'#3b3b3b' if is_dark else '#f0f0f0'};
-                color: {text_color};
-                border: 1px solid {'#555' if is_dark else '#ccc'};
-                border-radius: 5px;
-                padding: 8px;
-                font-size: 14px;
-            }}
-            QPushButton {{
-                background-color: {'#0078d4' if not is_dark else '#0d6efd'};
-                color: white;
-                border: none;
-                border-radius: 5px;
-                padding: 8px 16px;
-                font-size: 14px;
-            }}
-            QPushButton:hover {{
-                background-color: {'#106ebe' if not is_dark else '#0b5ed7'};
-            }}
-            QPushButton:disabled {{
-                background-color: {'#cccccc' if not is_dark else '#555555'};
-                color: {'#666666' if not is_dark else '#999999'};
-            }}
-        """)
+    def apply_theme(self, *_):
+        super().apply_theme()
+        # 普通结果的灰色随主题变化，错误提示的红色不变
+        if self._result_qss is not None and self._result_qss is not _SEARCH_RESULT_ERROR_QSS:
+            self._result_qss = _SEARCH_RESULT_QSS[self._is_dark]
+            self.result_label.setStyleSheet(self._result_qss)
     
     def init_ui(self):
         """初始化UI"""
@@ -1564,6 +1708,8 @@ class SearchDialog(QDialog):
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("请输入搜索内容...")
         self.search_input.returnPressed.connect(self.on_search_current)
+        if self.has_bubbles:
+            self.search_input.textChanged.connect(self._schedule_search)
         layout.addWidget(self.search_input)
         
         # 结果提示和导航按钮的水平布局
@@ -1638,6 +1784,32 @@ class SearchDialog(QDialog):
             self.show_result("当前对话中没有消息", is_error=True)
             return
         
+        self._run_current_search(search_text)
+    
+    @pyqtSlot()
+    def _schedule_search(self):
+        self._search_timer.start()
+    
+    @pyqtSlot()
+    def _search_as_you_type(self):
+        """输入停顿后在当前对话中搜索，清空输入时同时清除结果"""
+        search_text = self.search_input.text().strip()
+        if not search_text:
+            self._last_query = ""
+            self.clear_result()
+            return
+        self._run_current_search(search_text)
+    
+    def _run_current_search(self, search_text):
+        """在当前对话中搜索；新查询延伸自上一次查询时只在已有结果中收窄"""
+        self._search_timer.stop()
+        last_query, self._last_query = self._last_query, search_text
+        if (last_query and search_text != last_query
+                and search_text.lower().startswith(last_query.lower())):
+            # 延伸查询的结果必然是上一次结果的子集，上一次无结果时无需再搜
+            if self.matches:
+                self.refine_in_current_signal.emit(search_text)
+            return
         self.search_in_current_signal.emit(search_text)
     
     def on_search_globally(self):
@@ -1651,6 +1823,9 @@ class SearchDialog(QDialog):
             self.show_result("没有可搜索的对话", is_error=True)
             return
         
+        # 全局搜索可能切换对话，之后的输入需要重新完整搜索
+        self._search_timer.stop()
+        self._last_query = ""
         self.search_globally_signal.emit(search_text)
     
     def on_previous(self):
@@ -1668,45 +1843,49 @@ class SearchDialog(QDialog):
             self.update_result_display()
     
     def set_search_results(self, matches, current_index=0):
-        """设置搜索结果"""
+        """设置搜索结果；对话框隐藏时只记录结果，显示时再刷新界面"""
         self.matches = matches
         self.current_index = current_index
+        if not self.isVisible():
+            self._pending_update = True
+            return
         self.update_result_display()
-        
-        # 显示/隐藏导航按钮
-        show_nav = len(matches) >= 2
-        self.prev_btn.setVisible(show_nav)
-        self.next_btn.setVisible(show_nav)
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._pending_update:
+            self._pending_update = False
+            self.update_result_display()
     
     def update_result_display(self):
-        """更新结果显示"""
-        if not self.matches:
-            self.show_result("没有找到匹配内容", is_error=True)
-            self.prev_btn.setVisible(False)
-            self.next_btn.setVisible(False)
-            return
-        
+        """更新结果显示及导航按钮状态"""
         total = len(self.matches)
-        current = self.current_index + 1
-        self.show_result(f"已查找到 {total} 处内容，现在显示的是 {current}/{total} 处", is_error=False)
-        
-        # 更新按钮状态
-        self.prev_btn.setEnabled(self.current_index > 0)
-        self.next_btn.setEnabled(self.current_index < total - 1)
+        # 导航按钮的显隐与启用状态合并为一次重绘
+        self.setUpdatesEnabled(False)
+        try:
+            if not total:
+                self.show_result("没有找到匹配内容", is_error=True)
+            else:
+                current = self.current_index + 1
+                self.show_result(f"已查找到 {total} 处内容，现在显示的是 {current}/{total} 处", is_error=False)
+                self.prev_btn.setEnabled(self.current_index > 0)
+                self.next_btn.setEnabled(self.current_index < total - 1)
+            
+            # 显示/隐藏导航按钮
+            show_nav = total >= 2
+            self.prev_btn.setVisible(show_nav)
+            self.next_btn.setVisible(show_nav)
+        finally:
+            self.setUpdatesEnabled(True)
     
     def show_result(self, message, is_error=False):
         """显示搜索结果消息"""
         if self.result_label:
-            if is_error:
-                self.result_label.setStyleSheet("color: red; font-size: 12px;")
-            else:
-                # 使用灰色字体
-                parent = self.parent()
-                is_dark = False
-                if parent and hasattr(parent, 'theme_manager'):
-                    is_dark = getattr(parent.theme_manager, 'dark_mode_enabled', False)
-                gray_color = "#999999" if is_dark else "#666666"
-                self.result_label.setStyleSheet(f"color: {gray_color}; font-size: 12px;")
+            # 错误用红色，否则用主题灰色；样式未变时只更新文字，避免重新解析样式表
+            qss = _SEARCH_RESULT_ERROR_QSS if is_error else _SEARCH_RESULT_QSS[self._is_dark]
+            if qss is not self._result_qss:
+                self.result_label.setStyleSheet(qss)
+                self._result_qss = qss
             
             self.result_label.setText(message)
     
@@ -1720,15 +1899,36 @@ class SearchDialog(QDialog):
         self.next_btn.setVisible(False)
 
 
-class FileModeDialog(QDialog):
+@lru_cache(maxsize=2)
+def _file_mode_dialog_qss(is_dark):
+    """文件模式选择对话框样式表"""
+    bg_color = "#2b2b2b" if is_dark else "white"
+    text_color = "white" if is_dark else "black"
+    border_color = "#555" if is_dark else "#ccc"
+    
+    return f"""
+        QDialog {{
+            background-color: {bg_color};
+            border: 2px solid {border_color};
+            border-radius: 10px;
+        }}
+        QLabel {{
+            color: {text_color};
+        }}
+    """
+
+
+class FileModeDialog(ThemedDialogMixin, QDialog):
     """文件上传模式选择对话框"""
+
+    _theme_qss = staticmethod(_file_mode_dialog_qss)
     
     def __init__(self, parent=None):
         super().__init__(parent, Qt.WindowType.Dialog | Qt.WindowType.FramelessWindowHint)
         self.selected_mode = None  # 'temporary' or 'persistent'
         self.setFixedSize(300, 300)
         self.init_ui()
-        self.apply_theme()
+        self.init_theme()
     
     def init_ui(self):
         """初始化UI"""
@@ -1764,7 +1964,7 @@ class FileModeDialog(QDialog):
                 background-color: #2A5F8F;
             }
         """)
-        self.temp_btn.clicked.connect(lambda: self.select_mode('temporary'))
+        self.temp_btn.clicked.connect(self.select_temporary)
         button_layout.addWidget(self.temp_btn)
         
         # 后续引用按钮
@@ -1785,7 +1985,7 @@ class FileModeDialog(QDialog):
                 background-color: #2F8350;
             }
         """)
-        self.persist_btn.clicked.connect(lambda: self.select_mode('persistent'))
+        self.persist_btn.clicked.connect(self.select_persistent)
         button_layout.addWidget(self.persist_btn)
         
         layout.addLayout(button_layout)
@@ -1807,40 +2007,99 @@ class FileModeDialog(QDialog):
         cancel_btn.clicked.connect(self.reject)
         layout.addWidget(cancel_btn)
     
-    def apply_theme(self):
-        """应用主题"""
-        is_dark = False
-        parent = self.parent()
-        if parent and hasattr(parent, 'theme_manager'):
-            is_dark = getattr(parent.theme_manager, 'dark_mode_enabled', False)
-        
-        bg_color = "#2b2b2b" if is_dark else "white"
-        text_color = "white" if is_dark else "black"
-        border_color = "#555" if is_dark else "#ccc"
-        
-        self.setStyleSheet(f"""
-            QDialog {{
-                background-color: {bg_color};
-                border: 2px solid {border_color};
-                border-radius: 10px;
-            }}
-            QLabel {{
-                color: {text_color};
-            }}
-        """)
-    
     def select_mode(self, mode):
         """选择模式并关闭对话框"""
         self.selected_mode = mode
         self.accept()
+
+    @pyqtSlot()
+    def select_temporary(self):
+        self.select_mode('temporary')
+
+    @pyqtSlot()
+    def select_persistent(self):
+        self.select_mode('persistent')
     
     def get_selected_mode(self):
         """获取选择的模式"""
         return self.selected_mode
 
 
-class FilePreviewDialog(QDialog):
+@lru_cache(maxsize=2)
+def _file_preview_dialog_qss(is_dark):
+    """文件预览对话框样式表"""
+    bg_color = "#2b2b2b" if is_dark else "#f5f5f5"
+    text_color = "white" if is_dark else "black"
+    border_color = "#555" if is_dark else "#ccc"
+    btn_bg = "#3a3a3a" if is_dark else "#e0e0e0"
+    btn_hover = "#4a4a4a" if is_dark else "#d0d0d0"
+    
+    return f"""
+        QDialog {{
+            background-color: {bg_color};
+            border: 2px solid {border_color};
+            border-radius: 10px;
+        }}
+        QLabel {{
+            color: {text_color};
+        }}
+        QPushButton {{
+            background-color: {btn_bg};
+            color: {text_color};
+            border: 1px solid {border_color};
+            border-radius: 5px;
+            padding: 8px 15px;
+            font-size: 12px;
+        }}
+        QPushButton:hover {{
+            background-color: {btn_hover};
+        }}
+    """
+
+
+# 文件预览中图片的最大显示尺寸
+_IMAGE_PREVIEW_MAX_SIZE = QSize(800, 600)
+
+
+class _ImagePreviewLoaderSignals(QObject):
+    loaded = pyqtSignal(QImage)
+
+
+class _ImagePreviewLoader(QRunnable):
+    """在线程池中解码并缩放预览图片，以 QImage 交回界面线程后再转为 QPixmap"""
+
+    def __init__(self, path, max_size):
+        super().__init__()
+        self.path = path
+        self.max_size = max_size
+        self.signals = _ImagePreviewLoaderSignals()
+
+    def _fits(self, size):
+        return size.width() <= self.max_size.width() and size.height() <= self.max_size.height()
+
+    def run(self):
+        try:
+            reader = QImageReader(self.path)
+            reader.setAutoTransform(True)
+            size = reader.size()
+            if size.isValid() and not self._fits(size):
+                # JPEG 等格式可直接按目标尺寸解码，省去全分辨率解码
+                reader.setScaledSize(size.scaled(self.max_size, Qt.AspectRatioMode.KeepAspectRatio))
+            image = reader.read()
+            if not image.isNull() and not self._fits(image.size()):
+                image = image.scaled(self.max_size,
+                                     Qt.AspectRatioMode.KeepAspectRatio,
+                                     Qt.TransformationMode.SmoothTransformation)
+        except Exception as e:
+            logger.warning("[文件预览] 加载图片失败: %s", e)
+            image = QImage()
+        self.signals.loaded.emit(image)
+
+
+class FilePreviewDialog(ThemedDialogMixin, QDialog):
     """文件预览对话框 - 支持图片、PDF、文本等文件预览"""
+
+    _theme_qss = staticmethod(_file_preview_dialog_qss)
     
     def __init__(self, file_path, parent=None):
         super().__init__(parent, Qt.WindowType.Window)
@@ -1849,7 +2108,7 @@ class FilePreviewDialog(QDialog):
         self.setWindowTitle(f"预览: {self.file_name}")
         self.setMinimumSize(600, 400)
         self.init_ui()
-        self.apply_theme()
+        self.init_theme()
     
     def init_ui(self):
         """初始化UI"""
@@ -1899,26 +2158,23 @@ class FilePreviewDialog(QDialog):
         layout.addWidget(close_btn, alignment=Qt.AlignmentFlag.AlignCenter)
     
     def show_image_preview(self, layout):
-        """显示图片预览"""
-        try:
-            pixmap = QPixmap(self.file_path)
-            if not pixmap.isNull():
-                # 限制最大显示尺寸
-                max_width = 800
-                max_height = 600
-                if pixmap.width() > max_width or pixmap.height() > max_height:
-                    pixmap = pixmap.scaled(max_width, max_height, 
-                                         Qt.AspectRatioMode.KeepAspectRatio,
-                                         Qt.TransformationMode.SmoothTransformation)
-                
-                label = QLabel()
-                label.setPixmap(pixmap)
-                label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                layout.addWidget(label)
-            else:
-                layout.addWidget(QLabel("无法加载图片"))
-        except Exception as e:
-            layout.addWidget(QLabel(f"加载图片失败: {str(e)}"))
+        """显示图片预览：先显示占位文字，解码与缩放在线程池中完成"""
+        self._image_label = QLabel("加载中…")
+        self._image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self._image_label)
+        
+        # 保留加载器引用，保证信号对象在回调前不被回收
+        self._image_loader = _ImagePreviewLoader(self.file_path, _IMAGE_PREVIEW_MAX_SIZE)
+        self._image_loader.signals.loaded.connect(self._on_image_loaded)
+        QThreadPool.globalInstance().start(self._image_loader)
+    
+    @pyqtSlot(QImage)
+    def _on_image_loaded(self, image):
+        self._image_loader = None
+        if image.isNull():
+            self._image_label.setText("无法加载图片")
+            return
+        self._image_label.setPixmap(QPixmap.fromImage(image))
     
     def show_text_preview(self, layout):
         """显示文本预览"""
@@ -1926,17 +2182,24 @@ class FilePreviewDialog(QDialog):
             with open(self.file_path, 'r', encoding='utf-8') as f:
                 content = f.read(10000)  # 最多读取10000字符
             
-            text_label = QLabel(content)
-            text_label.setWordWrap(True)
-            text_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
-            text_label.setStyleSheet("padding: 10px; background: rgba(0,0,0,0.05); border-radius: 5px;")
-            layout.addWidget(text_label)
+            # 只读纯文本编辑器只排版可见行，窗口缩放时不必对全文重新折行
+            text_view = QPlainTextEdit()
+            text_view.setReadOnly(True)
+            text_view.setLineWrapMode(QPlainTextEdit.LineWrapMode.WidgetWidth)
+            text_view.setPlainText(content)
+            text_view.setStyleSheet("padding: 10px; background: rgba(0,0,0,0.05); border-radius: 5px;")
+            layout.addWidget(text_view)
             
             if len(content) == 10000:
                 layout.addWidget(QLabel("（仅显示前10000字符）"))
         except Exception as e:
             layout.addWidget(QLabel(f"读取文件失败: {str(e)}"))
     
+    @pyqtSlot()
+    def open_with_system_app(self):
+        """用系统默认程序打开文件"""
+        os.startfile(self.file_path)
+
     def show_pdf_preview(self, layout):
         """显示PDF预览提示"""
         label = QLabel("📄 PDF文件\n\n此文件已上传，AI可以分析其内容。\n如需查看完整内容，请使用PDF阅读器打开。")
@@ -1946,7 +2209,7 @@ class FilePreviewDialog(QDialog):
         
         # 添加打开文件按钮
         open_btn = QPushButton("用系统默认程序打开")
-        open_btn.clicked.connect(lambda: os.startfile(self.file_path))
+        open_btn.clicked.connect(self.open_with_system_app)
         layout.addWidget(open_btn, alignment=Qt.AlignmentFlag.AlignCenter)
     
     def show_video_preview(self, layout):
@@ -1958,7 +2221,7 @@ class FilePreviewDialog(QDialog):
         
         # 添加打开文件按钮
         open_btn = QPushButton("用系统默认程序打开")
-        open_btn.clicked.connect(lambda: os.startfile(self.file_path))
+        open_btn.clicked.connect(self.open_with_system_app)
         layout.addWidget(open_btn, alignment=Qt.AlignmentFlag.AlignCenter)
     
     def show_unsupported_preview(self, layout):
@@ -1970,47 +2233,47 @@ class FilePreviewDialog(QDialog):
         
         # 添加打开文件按钮
         open_btn = QPushButton("用系统默认程序打开")
-        open_btn.clicked.connect(lambda: os.startfile(self.file_path))
+        open_btn.clicked.connect(self.open_with_system_app)
         layout.addWidget(open_btn, alignment=Qt.AlignmentFlag.AlignCenter)
-    
-    def apply_theme(self):
-        """应用主题"""
-        is_dark = False
-        parent = self.parent()
-        if parent and hasattr(parent, 'theme_manager'):
-            is_dark = getattr(parent.theme_manager, 'dark_mode_enabled', False)
-        
-        bg_color = "#2b2b2b" if is_dark else "#f5f5f5"
-        text_color = "white" if is_dark else "black"
-        border_color = "#555" if is_dark else "#ccc"
-        btn_bg = "#3a3a3a" if is_dark else "#e0e0e0"
-        btn_hover = "#4a4a4a" if is_dark else "#d0d0d0"
-        
-        self.setStyleSheet(f"""
-            QDialog {{
-                background-color: {bg_color};
-                border: 2px solid {border_color};
-                border-radius: 10px;
-            }}
-            QLabel {{
-                color: {text_color};
-            }}
-            QPushButton {{
-                background-color: {btn_bg};
-                color: {text_color};
-                border: 1px solid {border_color};
-                border-radius: 5px;
-                padding: 8px 15px;
-                font-size: 12px;
-            }}
-            QPushButton:hover {{
-                background-color: {btn_hover};
-            }}
-        """)
 
 
-class ImagePreviewDialog(QDialog):
+@lru_cache(maxsize=2)
+def _image_preview_dialog_qss(is_dark):
+    """图片预览对话框样式表"""
+    bg_color = "#1a1a1a" if is_dark else "#f5f5f5"
+    text_color = "white" if is_dark else "black"
+    btn_bg = "#3a3a3a" if is_dark else "#e0e0e0"
+    btn_hover = "#4a4a4a" if is_dark else "#d0d0d0"
+    
+    return f"""
+        QDialog {{
+            background-color: {bg_color};
+        }}
+        QLabel {{
+            color: {text_color};
+        }}
+        QPushButton {{
+            background-color: {btn_bg};
+            color: {text_color};
+            border: none;
+            border-radius: 5px;
+            padding: 8px 15px;
+            font-size: 12px;
+        }}
+        QPushButton:hover {{
+            background-color: {btn_hover};
+        }}
+        QScrollArea {{
+            border: none;
+            background-color: transparent;
+        }}
+    """
+
+
+class ImagePreviewDialog(ThemedDialogMixin, QDialog):
     """图片预览对话框 - 用于全分辨率预览生成的图片"""
+
+    _theme_qss = staticmethod(_image_preview_dialog_qss)
     
     def __init__(self, image_path, parent=None):
         super().__init__(parent, Qt.WindowType.Window)
@@ -2018,7 +2281,7 @@ class ImagePreviewDialog(QDialog):
         self.setWindowTitle(f"图片预览 - {os.path.basename(image_path)}")
         self.setMinimumSize(800, 600)
         self.init_ui()
-        self.apply_theme()
+        self.init_theme()
     
     def init_ui(self):
         """初始化UI"""
@@ -2049,46 +2312,67 @@ class ImagePreviewDialog(QDialog):
         close_btn.setFixedSize(100, 35)
         close_btn.clicked.connect(self.accept)
         layout.addWidget(close_btn, alignment=Qt.AlignmentFlag.AlignCenter)
+
+
+@lru_cache(maxsize=2)
+def _search_engine_dialog_qss(is_dark):
+    """搜索引擎对话框样式表"""
+    bg_color = "#1a1a1a" if is_dark else "#f5f5f5"
+    text_color = "white" if is_dark else "black"
+    btn_bg = "#3a3a3a" if is_dark else "#e0e0e0"
+    btn_hover = "#4a4a4a" if is_dark else "#d0d0d0"
     
-    def apply_theme(self):
-        """应用主题"""
-        is_dark = False
-        parent = self.parent()
-        if parent and hasattr(parent, 'theme_manager'):
-            is_dark = getattr(parent.theme_manager, 'dark_mode_enabled', False)
-        
-        bg_color = "#1a1a1a" if is_dark else "#f5f5f5"
-        text_color = "white" if is_dark else "black"
-        btn_bg = "#3a3a3a" if is_dark else "#e0e0e0"
-        btn_hover = "#4a4a4a" if is_dark else "#d0d0d0"
-        
-        self.setStyleSheet(f"""
-            QDialog {{
-                background-color: {bg_color};
-            }}
-            QLabel {{
-                color: {text_color};
-            }}
-            QPushButton {{
-                background-color: {btn_bg};
-                color: {text_color};
-                border: none;
-                border-radius: 5px;
-                padding: 8px 15px;
-                font-size: 12px;
-            }}
-            QPushButton:hover {{
-                background-color: {btn_hover};
-            }}
-            QScrollArea {{
-                border: none;
-                background-color: transparent;
-            }}
-        """)
+    return f"""
+        QDialog {{
+            background-color: {bg_color};
+        }}
+        QLabel {{
+            color: {text_color};
+        }}
+        QCheckBox {{
+            color: {text_color};
+            spacing: 5px;
+        }}
+        QCheckBox::indicator {{
+            width: 20px;
+            height: 20px;
+            border-radius: 4px;
+            border: 2px solid #999;
+            background-color: {"#2a2a2a" if is_dark else "white"};
+        }}
+        QCheckBox::indicator:hover {{
+            border-color: #0078d4;
+        }}
+        QCheckBox::indicator:checked {{
+            background-color: #10b981;
+            border-color: #10b981;
+            image: url(none);
+        }}
+        QCheckBox::indicator:checked::after {{
+            content: "✓";
+            color: white;
+            font-size: 14px;
+            font-weight: bold;
+        }}
+        QPushButton {{
+            background-color: {btn_bg};
+            color: {text_color};
+            border: none;
+            border-radius: 5px;
+            padding: 8px 15px;
+            font-size: 12px;
+        }}
+        QPushButton:hover {{
+            background-color: {btn_hover};
+        }}
+    """
 
 
-class SearchEngineDialog(QDialog):
+class SearchEngineDialog(ThemedDialogMixin, QDialog):
     """搜索引擎切换对话框"""
+
+    _theme_qss = staticmethod(_search_engine_dialog_qss)
+
     def __init__(self, parent=None):
         super().__init__(parent, Qt.WindowType.Window)
         self.setWindowTitle('切换搜索引擎')
@@ -2104,7 +2388,7 @@ class SearchEngineDialog(QDialog):
         self.checkboxes = {}
         
         self.init_ui()
-        self.apply_theme()
+        self.init_theme()
     
     def init_ui(self):
         """初始化 UI"""
@@ -2143,7 +2427,7 @@ class SearchEngineDialog(QDialog):
             header_layout = QHBoxLayout()
             checkbox = QCheckBox()
             checkbox.setChecked(engine_id in enabled_engines)
-            checkbox.stateChanged.connect(lambda state, eid=engine_id: self.on_engine_toggled(eid, state))
+            checkbox.stateChanged.connect(partial(self.on_engine_toggled, engine_id))
             self.checkboxes[engine_id] = checkbox
             
             icon = engine_info['icon']
@@ -2231,7 +2515,7 @@ class SearchEngineDialog(QDialog):
             executor._tool_schemas.clear()
             executor._register_default_tools()
         except Exception as e:
-            print(f"[搜索引擎对话框] 更新工具失败: {e}")
+            logger.warning("[搜索引擎对话框] 更新工具失败: %s", e)
     
     def update_status_label(self):
         """更新状态标签"""
@@ -2270,64 +2554,8 @@ class SearchEngineDialog(QDialog):
                 executor._tool_schemas.clear()
                 executor._register_default_tools()
             except Exception as e:
-                print(f"[搜索引擎对话框] 重置工具失败: {e}")
+                logger.warning("[搜索引擎对话框] 重置工具失败: %s", e)
     
-    def apply_theme(self):
-        """应用主题"""
-        is_dark = False
-        parent = self.parent()
-        if parent and hasattr(parent, 'theme_manager'):
-            is_dark = getattr(parent.theme_manager, 'dark_mode_enabled', False)
-        
-        bg_color = "#1a1a1a" if is_dark else "#f5f5f5"
-        text_color = "white" if is_dark else "black"
-        btn_bg = "#3a3a3a" if is_dark else "#e0e0e0"
-        btn_hover = "#4a4a4a" if is_dark else "#d0d0d0"
-        
-        self.setStyleSheet(f"""
-            QDialog {{
-                background-color: {bg_color};
-            }}
-            QLabel {{
-                color: {text_color};
-            }}
-            QCheckBox {{
-                color: {text_color};
-                spacing: 5px;
-            }}
-            QCheckBox::indicator {{
-                width: 20px;
-                height: 20px;
-                border-radius: 4px;
-                border: 2px solid #999;
-                background-color: {"#2a2a2a" if is_dark else "white"};
-            }}
-            QCheckBox::indicator:hover {{
-                border-color: #0078d4;
-            }}
-            QCheckBox::indicator:checked {{
-                background-color: #10b981;
-                border-color: #10b981;
-                image: url(none);
-            }}
-            QCheckBox::indicator:checked::after {{
-                content: "✓";
-                color: white;
-                font-size: 14px;
-                font-weight: bold;
-            }}
-            QPushButton {{
-                background-color: {btn_bg};
-                color: {text_color};
-                border: none;
-                border-radius: 5px;
-                padding: 8px 15px;
-                font-size: 12px;
-            }}
-            QPushButton:hover {{
-                background-color: {btn_hover};
-            }}
-        """)
 
 
 
@@ -27,6 +27,11 @@ class ImageGenerator:
         self.txt2img_endpoint = "/sdapi/v1/txt2img"
         self.progress_endpoint = "/sdapi/v1/progress"
         
+        # 🚨 复用同一个会话直连本地 SD WebUI：trust_env=False 忽略环境变量中的代理设置，
+        # 同时保持连接池常驻，避免每次请求重新扫描代理并建立 TCP 连接
+        # 该会话只在调用方线程使用；进度轮询线程使用自己的会话（requests.Session 不保证线程安全）
+        self._session = self._new_session()
+        
         # image_generator.py (使用SD控制台的真实成功配置)
 
         # 默认生成参数（基于SD控制台的成功案例）
@@ -55,6 +60,13 @@ class ImageGenerator:
         os.makedirs(self.art_folder, exist_ok=True)
         print(f"[OK] 艺术作品保存目录: {self.art_folder}")
     
+    @staticmethod
+    def _new_session() -> requests.Session:
+        """创建直连本地 SD WebUI 的会话（忽略环境变量中的代理设置）"""
+        session = requests.Session()
+        session.trust_env = False
+        return session
+    
     def check_connection(self) -> Tuple[bool, str]:
         """
         检查 SD WebUI API 连接状态
@@ -63,14 +75,10 @@ class ImageGenerator:
             (是否连接成功, 提示信息)
         """
         try:
-            # 🚨 关键：强制绕过代理，直连本地 SD WebUI
-            no_proxy = {'http': None, 'https': None}
-            
             # 使用简单的进度API检查连接（更轻量）
-            response = requests.get(
+            response = self._session.get(
                 f"{self.api_url}{self.progress_endpoint}", 
-                timeout=5,
-                proxies=no_proxy  # 🚨 绕过代理
+                timeout=5
             )
             
             if response.status_code == 200:
@@ -85,21 +93,20 @@ class ImageGenerator:
         except Exception as e:
             return False, f"❌ 连接错误: {str(e)}"
     
-    def get_progress(self) -> Tuple[float, str]:
+    def get_progress(self, session: Optional[requests.Session] = None) -> Tuple[float, str]:
         """
         获取当前生成进度
         
+        Args:
+            session: 发送请求使用的会话，默认使用实例会话（其他线程调用时应传入自己的会话）
+        
         Returns:
             (进度值 0.0-1.0, 当前状态描述)
         """
         try:
-            # 🚨 关键：强制绕过代理，直连本地 SD WebUI
-            no_proxy = {'http': None, 'https': None}
-            
-            response = requests.get(
+            response = (session or self._session).get(
                 f"{self.api_url}{self.progress_endpoint}",
-                timeout=3,
-                proxies=no_proxy  # 🚨 绕过代理
+                timeout=3
             )
             if response.status_code == 200:
                 data = response.json()
@@ -121,15 +128,11 @@ class ImageGenerator:
             是否切换成功
         """
         try:
-            # 🚨 绕过代理，直连本地 SD WebUI
-            no_proxy = {'http': None, 'https': None}
-            
             # 切换模型
-            response = requests.post(
+            response = self._session.post(
                 f"{self.api_url}/sdapi/v1/options",
                 json={"sd_model_checkpoint": model_name},
-                timeout=30,
-                proxies=no_proxy
+                timeout=30
             )
             
             if response.status_code == 200:
@@ -195,22 +198,27 @@ class ImageGenerator:
         def poll_progress():
             """轮询进度的内部函数"""
             last_progress = 0.0
-            while generating:
-                try:
-                    progress, status = self.get_progress()
-                    # 只在进度变化时回调
-                    if progress > last_progress and progress_callback:
-                        progress_callback(progress, status)
-                        last_progress = progress
-                    
-                    # 如果进度达到100%，等待主线程完成
-                    if progress >= 1.0:
-                        break
-                    
-                    time.sleep(0.5)  # 每0.5秒轮询一次
-                except Exception as e:
-                    print(f"[DEBUG] 进度轮询异常: {e}")
-                    time.sleep(0.5)
+            # 主线程正在用 self._session 发送生成请求，轮询线程使用独立会话
+            session = self._new_session()
+            try:
+                while generating:
+                    try:
+                        progress, status = self.get_progress(session)
+                        # 只在进度变化时回调
+                        if progress > last_progress and progress_callback:
+                            progress_callback(progress, status)
+                            last_progress = progress
+                        
+                        # 如果进度达到100%，等待主线程完成
+                        if progress >= 1.0:
+                            break
+                        
+                        time.sleep(0.5)  # 每0.5秒轮询一次
+                    except Exception as e:
+                        print(f"[DEBUG] 进度轮询异常: {e}")
+                        time.sleep(0.5)
+            finally:
+                session.close()
         
         # 启动进度轮询线程
         import threading
@@ -221,19 +229,12 @@ class ImageGenerator:
             # 🔍 发送请求（显式绕过代理）
             print(f"[INFO] 🚀 正在发送请求到 SD WebUI...")
             
-            # 🚨 关键修复：强制绕过代理，直连本地 SD WebUI
-            # 即使环境变量设置了 http_proxy（用于 Gemini），也不影响本地请求
-            no_proxy = {
-                'http': None,   # 不使用 HTTP 代理
-                'https': None,  # 不使用 HTTPS 代理
-            }
-            
+            # 🚨 会话已设置 trust_env=False，即使环境变量设置了 http_proxy（用于 Gemini），也不影响本地请求
             # 发送生成请求（完全复制 totally ok.py 的方式 + 代理绕过）
-            response = requests.post(
+            response = self._session.post(
                 url=f"{self.api_url}{self.txt2img_endpoint}",
                 json=payload,
-                timeout=300,  # 5分钟超时
-                proxies=no_proxy  # 🚨 强制不使用代理
+                timeout=300  # 5分钟超时
             )
             
             # 🔍 打印响应详情
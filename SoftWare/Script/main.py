@@ -169,21 +169,29 @@ class ChatManager:
         if hasattr(self.storage, 'file_manager') and self.storage.config["storage_type"] == "file":
             self.storage.file_manager.scan_and_rebuild_metadata()
         
-        conversations_data = self.storage.get_all_conversations()
-        
-        # 转换数据格式以适配UI
-        conversations = []
-        for conv_data in conversations_data:
-            if isinstance(conv_data, tuple):
-                # FileManager返回元组格式 (id, title, updated_at)
-                conversations.append({
-                    'id': conv_data[0],
-                    'title': conv_data[1],
-                    'updated_at': conv_data[2]
-                })
-            else:
-                # DatabaseManager返回字典格式
-                conversations.append(conv_data)
+        manager = self.storage.get_manager()
+        if hasattr(manager, 'get_all_conversations_fast'):
+            # DatabaseManager 按列返回 (ids, titles, created_ats)，直接组装为UI所需格式
+            ids, titles, created_ats = manager.get_all_conversations_fast()
+            conversations = [
+                {'id': conv_id, 'title': title, 'updated_at': created_at}
+                for conv_id, title, created_at in zip(ids, titles, created_ats)
+            ]
+        else:
+            conversations_data = self.storage.get_all_conversations()
+            
+            # 转换数据格式以适配UI
+            conversations = []
+            for conv_data in conversations_data:
+                if isinstance(conv_data, tuple):
+                    # FileManager返回元组格式 (id, title, updated_at)
+                    conversations.append({
+                        'id': conv_data[0],
+                        'title': conv_data[1],
+                        'updated_at': conv_data[2]
+                    })
+                else:
+                    conversations.append(conv_data)
         
         self.chat_window.sidebar.update_conversation_list(conversations)
 
@@ -643,9 +651,8 @@ class ChatManager:
         
         # 从数据库删除消息
         if has_pair:
-            # 删除两条消息（用户 + AI）
-            self.storage.delete_message_by_index(self.current_conversation_id, base_index)
-            self.storage.delete_message_by_index(self.current_conversation_id, base_index)  # 删除后索引会自动调整
+            # 删除两条消息（用户 + AI），一次调用完成
+            self.storage.delete_messages_by_indices(self.current_conversation_id, [base_index, base_index + 1])
         else:
             # 只删除一条消息
             self.storage.delete_message_by_index(self.current_conversation_id, base_index)
@@ -78,8 +78,11 @@ class SDConfig:
             bool: 是否成功保存
         """
         try:
-            with open(self.config_path, 'w', encoding='utf-8') as f:
+            # 先写临时文件再原子替换，避免写入中断导致配置文件损坏
+            tmp_path = self.config_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
                 json.dump(self._config, f, indent=4, ensure_ascii=False)
+            os.replace(tmp_path, self.config_path)
             
             print(f"[SD Config] ✅ 成功保存配置: {self.config_path}")
             return True
@@ -1,7 +1,7 @@
 import os
 import json
 from typing import Optional, List, Dict, Union
-from database_manager import DatabaseManager
+from database_manager import DatabaseManager, close_pool
 from file_manager import FileManager
 
 class StorageConfig:
@@ -58,11 +58,22 @@ class StorageConfig:
         except Exception as e:
             print(f"保存配置文件失败: {e}")
     
+    def _close_db_manager(self, keep_dsn=None):
+        """关闭并丢弃当前的数据库管理器（替换或放弃管理器前都应调用）
+
+        除非仍要使用同一 DSN（keep_dsn），否则一并关闭其连接池
+        """
+        if self.db_manager:
+            self.db_manager.close()
+            if self.db_manager.dsn_name != keep_dsn:
+                close_pool(self.db_manager.dsn_name)
+        self.db_manager = None
+    
     def _fallback_to_file(self):
         """回退到文件存储"""
         self.config["storage_type"] = "file"
         self.config["dsn_name"] = ""
-        self.db_manager = None
+        self._close_db_manager()
         self._save_config()
     
     def get_current_storage_type(self):
@@ -98,7 +109,7 @@ class StorageConfig:
         # 更新配置
         self.config["storage_type"] = "file"
         self.config["dsn_name"] = ""
-        self.db_manager = None
+        self._close_db_manager()
         self._save_config()
         
         print("已切换到文件存储")
@@ -115,12 +126,12 @@ class StorageConfig:
         # 如果当前是文件存储，需要迁移数据
         if self.config["storage_type"] == "file":
             # 先创建数据库管理器
+            self._close_db_manager()
             self.db_manager = DatabaseManager(dsn_name)
             self._migrate_file_to_dsn()
         else:
             # 如果已经是DSN存储，只是更换DSN
-            if self.db_manager:
-                self.db_manager.close()
+            self._close_db_manager(keep_dsn=dsn_name)
             self.db_manager = DatabaseManager(dsn_name)
         
         # 更新配置
@@ -137,17 +148,18 @@ class StorageConfig:
         # 获取所有文件中的对话
         conversations = self.file_manager.get_all_conversations()
         
-        for conv_id, title, updated_at in conversations:
-            # 在数据库中创建对话
-            new_conv_id = self.db_manager.create_new_conversation(title)
-            
+        # 在数据库中一次性批量创建全部对话
+        new_conv_ids = self.db_manager.create_new_conversations([title for _, title, _ in conversations])
+        
+        for (conv_id, title, updated_at), new_conv_id in zip(conversations, new_conv_ids):
             # 获取文件中的历史消息
             messages = self.file_manager.get_history(conv_id)
             
-            # 将消息添加到数据库（包含附件信息）
-            for message in messages:
-                file_paths = message.get('files', None)
-                self.db_manager.add_message(new_conv_id, message['role'], message['content'], file_paths)
+            # 将消息批量添加到数据库（包含附件信息）
+            self.db_manager.add_messages(new_conv_id, [
+                (message['role'], message['content'], message.get('files', None))
+                for message in messages
+            ])
             
             print(f"迁移对话: {title} ({len(messages)}条消息)")
         
@@ -242,17 +254,27 @@ class StorageConfig:
                 return self.file_manager.delete_message_by_index(conv_id, message_index)
             print("文件存储暂不支持删除指定索引的消息")
     
+    def delete_messages_by_indices(self, conv_id, indices):
+        """一次删除多条指定索引的消息（数据库存储单次往返；文件存储逐条删除）"""
+        if self.config["storage_type"] == "dsn" and self.db_manager:
+            return self.db_manager.delete_messages_by_indices(conv_id, indices)
+        else:
+            if hasattr(self.file_manager, "delete_message_by_index"):
+                # 从大到小删除，前面的删除不会改变后面要删除的索引
+                for index in sorted(set(indices), reverse=True):
+                    self.file_manager.delete_message_by_index(conv_id, index)
+                return
+            print("文件存储暂不支持删除指定索引的消息")
+    
     def clear_conversation_history(self, conv_id):
         """清空对话历史"""
         if self.config["storage_type"] == "dsn" and self.db_manager:
             # 删除所有消息但保留对话
-            self.db_manager.cursor.execute('DELETE FROM messages WHERE conversation_id = ?', (conv_id,))
-            self.db_manager.conn.commit()
+            self.db_manager.clear_messages(conv_id)
         else:
             # 文件管理器的清空方法
             self.file_manager.clear_conversation_history(conv_id)
     
     def close(self):
         """关闭连接"""
-        if self.db_manager:
-            self.db_manager.close()
\ No newline at end of file
+        self._close_db_manager()
\ No newline at end of file